@@ -0,0 +1,640 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for PyEpoc, run against the simulated engine in PyEpocSim"""
+
+from __future__ import print_function
+
+import ctypes
+import os
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+from PyEpoc import *
+from PyEpocData import EEGAcquisition
+from PyEpocDelta import DeltaDispatcher
+from PyEpocPump import EventPump, EventRecord
+from PyEpocRecord import ContactQualityHistory, RecordingReader, RecordingWriter
+from PyEpocSim import BuildSimulator, SimulatedEngine
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## Report calls/sec for function(iterations), best of repeat runs.
+def Measure(label, function, iterations, repeat=3):
+    elapsed = None
+    for run in range(repeat):
+        start = default_timer()
+        function(iterations)
+        runtime = default_timer() - start
+        if elapsed is None or runtime < elapsed:
+            elapsed = runtime
+    print("%-48s %12.0f calls/sec" % (label, iterations / elapsed))
+    return iterations / elapsed
+
+## Process CPU time (user + system) in seconds.
+def CPUTime():
+    times = os.times()
+    return times[0] + times[1]
+
+## Return the p-th percentile (0-100) of a sorted list.
+def Percentile(values, p):
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+## The EpocHandler call path before the prototype table: attribute lookup on every call.
+class LegacyHandler:
+    def __init__(self, enginedll):
+        self.EmotivEngineDLL = enginedll
+
+    def ES_AffectivGetMeditationScore(self, emostatehandle):
+        return self.EmotivEngineDLL.ES_AffectivGetMeditationScore(emostatehandle)
+
+## Per-call cost of a float getter: unprototyped attribute lookup vs. the prototype table.
+def BenchPrototypes(library, iterations):
+    EmotivEngine = EpocHandler(ctypes.CDLL(library))
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+    LegacyEngine = LegacyHandler(ctypes.CDLL(library))  # fresh library object, no prototypes applied
+    legacyhandle = ctypes.c_void_p(statehandle)  # an unprototyped call would truncate a bare int
+
+    def legacy(n):
+        for i in range(n):
+            LegacyEngine.ES_AffectivGetMeditationScore(legacyhandle)
+
+    def prebound(n):
+        for i in range(n):
+            EmotivEngine.ES_AffectivGetMeditationScore(statehandle)
+
+    print("ES_AffectivGetMeditationScore")
+    before = Measure("  before (attribute lookup, int restype)", legacy, iterations)
+    after = Measure("  after (prototype table)", prebound, iterations)
+    print("  speedup: %.2fx" % (after / before))
+    EmotivEngine.EE_EmoStateFree(statehandle)
+
+## Decode the fields Testing.py prints from an EmoState.
+def DecodeTesting(EmotivEngine, statehandle):
+    EmotivEngine.ES_GetBatteryChargeLevel(statehandle)
+    EmotivEngine.ES_GetWirelessSignalStatus(statehandle)
+    EmotivEngine.ES_GetTimeFromStart(statehandle)
+    EmotivEngine.ES_AffectivGetMeditationScore(statehandle)
+    EmotivEngine.ES_AffectivGetExcitementShortTermScore(statehandle)
+    EmotivEngine.ES_AffectivGetExcitementLongTermScore(statehandle)
+    EmotivEngine.ES_AffectivGetFrustrationScore(statehandle)
+    EmotivEngine.ES_CognitivGetCurrentAction(statehandle)
+    EmotivEngine.ES_CognitivGetCurrentActionPower(statehandle)
+
+## Throughput of the Testing.py event loop body, with the engine running flat out.
+def BenchEventLoop(library, iterations):
+    engine = SimulatedEngine(realtime=False, library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+    EmotivEngine.ES_Init(statehandle)
+
+    def loop(n):
+        for i in range(n):
+            if EmotivEngine.EE_EngineGetNextEvent(engineeventhandle) == ERRCODE['EDK_OK']:
+                event = EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle)
+                user = EmotivEngine.EE_EmoEngineEventGetUserId(engineeventhandle)[1]
+                if event == EVENT['EE_EmoStateUpdated']:
+                    EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+                    DecodeTesting(EmotivEngine, statehandle)
+
+    print("Testing.py event loop")
+    Measure("  events", loop, iterations)
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## Per-event decode cost: one getter per field vs. EpocHandler.snapshot().
+def BenchSnapshot(library, iterations):
+    engine = SimulatedEngine(realtime=False, library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+    while EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) != EVENT['EE_EmoStateUpdated']:
+        EmotivEngine.EE_EngineGetNextEvent(engineeventhandle)
+    EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+
+    def getters(n):
+        for i in range(n):
+            DecodeTesting(EmotivEngine, statehandle)
+
+    def snapshot(n):
+        for i in range(n):
+            EmotivEngine.snapshot(statehandle)
+
+    fields = len(EmoStateSnapshot._fields_) - 1 + len(INPUTCHANNELS) - 1  # UserId is not decoded
+    print("EmoState decode")
+    getterrate = Measure("  Testing.py getters (10 fields)", getters, iterations)
+    snapshotrate = Measure("  snapshot() (%d fields)" % fields, snapshot, iterations)
+    print("  per field: getters %.0f ns, snapshot %.0f ns" % (1e9 / getterrate / 10, 1e9 / snapshotrate / fields))
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## Contact quality readout: ES_GetContactQuality() per channel versus one bulk call.
+def BenchContactQuality(library, iterations):
+    EmotivEngine = SimulatedEngine(realtime=False, library=library).Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+    while EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) != EVENT['EE_EmoStateUpdated']:
+        EmotivEngine.EE_EngineGetNextEvent(engineeventhandle)
+    EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+    history = ContactQualityHistory()
+
+    def perchannel(n):
+        for i in range(n):
+            [EmotivEngine.ES_GetContactQuality(statehandle, channel) for channel in range(EmotivEngine.ES_GetNumContactQualityChannels(statehandle))]
+
+    def bulk(n):
+        for i in range(n):
+            EmotivEngine.ES_GetContactQualityFromAllChannels(statehandle)
+
+    def rolling(n):
+        for i in range(n):
+            history.Record(EmotivEngine, statehandle)
+
+    print("Contact quality (%d channels)" % len(INPUTCHANNELS))
+    Measure("  ES_GetContactQuality per channel", perchannel, iterations)
+    Measure("  ES_GetContactQualityFromAllChannels", bulk, iterations)
+    Measure("  ContactQualityHistory.Record", rolling, iterations)
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## EmoState consumption with full decoding versus DeltaDispatcher.
+def BenchDelta(library, iterations):
+    engine = SimulatedEngine(realtime=False, library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+
+    def states(n, consume):
+        while n:
+            if EmotivEngine.EE_EngineGetNextEvent(engineeventhandle) == ERRCODE['EDK_OK'] and \
+               EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) == EVENT['EE_EmoStateUpdated']:
+                EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+                consume(statehandle)
+                n -= 1
+
+    def subscriber(userid, snapshot, changed):
+        pass
+
+    print("EmoState consumption")
+    Measure("  snapshot() every EmoState", lambda n: states(n, EmotivEngine.snapshot), iterations)
+    for label, parts in (("all parts", SNAPSHOTPART['ALL']), ("Cognitiv only", SNAPSHOTPART['COGNITIV'])):
+        dispatcher = DeltaDispatcher(EmotivEngine)
+        dispatcher.Subscribe(subscriber, parts)
+        Measure("  DeltaDispatcher, %s" % label, lambda n: states(n, dispatcher.Dispatch), iterations)
+        print("    suppressed %.1f%%" % (100.0 * dispatcher.Suppressed / dispatcher.States))
+        dispatcher.Close()
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## EmoState handle churn: create/free versus a HandlePool.
+def BenchHandles(library, iterations):
+    EmotivEngine = SimulatedEngine(realtime=False, library=library).Handler()
+    pool = EmotivEngine.EmoStatePool(16)
+
+    def churn(n):
+        for i in range(n):
+            EmotivEngine.EE_EmoStateFree(EmotivEngine.EE_EmoStateCreate())
+
+    def pooled(n):
+        for i in range(n):
+            pool.Return(pool.Checkout())
+
+    def scoped(n):
+        for i in range(n):
+            with pool.handle() as statehandle:
+                pass
+
+    print("EmoState handles")
+    Measure("  EE_EmoStateCreate/EE_EmoStateFree", churn, iterations)
+    Measure("  HandlePool Checkout/Return", pooled, iterations)
+    Measure("  HandlePool with handle()", scoped, iterations)
+    EmotivEngine.Close()
+
+## Delivered rate and latency (due time to decoded) of a polling loop at real-time rates.
+def BenchRates(library, seconds):
+    engine = SimulatedEngine(library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+
+    print("Real-time polling (%.1f s each)" % seconds)
+    for rate, users in ((128.0, 1), (1000.0, 1), (128.0, 4), (1000.0, 4)):
+        engine.Configure(rate, users, realtime=True)
+        latencies = []
+        end = engine.Now() + seconds
+        while engine.Now() < end:
+            if EmotivEngine.EE_EngineGetNextEvent(engineeventhandle) != ERRCODE['EDK_OK']:
+                continue
+            if EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) == EVENT['EE_EmoStateUpdated']:
+                EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+                DecodeTesting(EmotivEngine, statehandle)
+                latencies.append(engine.Now() - engine.EventDueTime(engineeventhandle))
+        latencies.sort()
+        print("  %6.0f Hz x %d users: %8.0f events/sec  latency p50 %6.1f us  p99 %6.1f us" % (
+            rate, users, len(latencies) / seconds,
+            Percentile(latencies, 50) * 1e6, Percentile(latencies, 99) * 1e6))
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## CPU cost of consuming a 128 Hz stream: the Testing.py busy loop vs. EventPump vs. get_events().
+def BenchPump(library, seconds):
+    engine = SimulatedEngine(library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    statehandle = EmotivEngine.EE_EmoStateCreate()
+
+    print("128 Hz consumption (%.1f s each)" % seconds)
+    engine.Configure(128.0, 1, realtime=True)
+    events, cpu, end = 0, CPUTime(), engine.Now() + seconds
+    while engine.Now() < end:
+        if EmotivEngine.EE_EngineGetNextEvent(engineeventhandle) == ERRCODE['EDK_OK']:
+            if EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) == EVENT['EE_EmoStateUpdated']:
+                EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+                EmotivEngine.snapshot(statehandle)
+                events += 1
+    print("  busy loop: %5d events  CPU %5.1f%%" % (events, 100.0 * (CPUTime() - cpu) / seconds))
+
+    engine.Configure(128.0, 1, realtime=True)
+    pump = EventPump(EmotivEngine)
+    events, cpu, end = 0, CPUTime(), engine.Now() + seconds
+    pump.Start()
+    while engine.Now() < end:
+        if pump.Wait(0.1):
+            events += len(pump.Drain())
+    pump.Stop()
+    print("  EventPump: %5d events  CPU %5.1f%%  overflows %d" % (events, 100.0 * (CPUTime() - cpu) / seconds, pump.Overflows))
+
+    # EpocHandler.get_events() polling backoff; latency from the EmoState's due time
+    engine.Configure(128.0, 1, realtime=True)
+    latencies, cpu, start = [], CPUTime(), engine.Now()
+    end = start + seconds
+    while engine.Now() < end:
+        for record in EmotivEngine.get_events(timeout=0.1):
+            if record.EventType == EVENT['EE_EmoStateUpdated']:
+                latencies.append(engine.Now() - start - record.State.Time)
+    latencies.sort()
+    print("  get_events: %4d states  CPU %5.1f%%  latency p50 %.2f ms  p99 %.2f ms  (PollMaxSleep %.1f ms)" % (
+        len(latencies), 100.0 * (CPUTime() - cpu) / seconds, Percentile(latencies, 50) * 1e3,
+        Percentile(latencies, 99) * 1e3, EmotivEngine.PollMaxSleep * 1e3))
+    EmotivEngine.EE_EmoStateFree(statehandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## Recording file write rate, open time and time-range lookup.
+def BenchRecording(records):
+    path = os.path.join(tempfile.mkdtemp(), "bench.pyepoc")
+    record = EventRecord()
+    start = default_timer()
+    with RecordingWriter(path) as writer:
+        for i in range(records):
+            record.Sequence = i
+            writer.Write(record, i / 128.0)
+    elapsed = default_timer() - start
+    print("Recording (%d records, %.1f MB)" % (records, os.path.getsize(path) / 1e6))
+    print("  write: %12.0f records/sec" % (records / elapsed))
+    start = default_timer()
+    reader = RecordingReader(path)
+    print("  open:  %12.1f us" % ((default_timer() - start) * 1e6))
+    start = default_timer()
+    count = sum(1 for r in reader.Range(records / 256.0, records / 256.0 + 1.0))
+    print("  1 s range from the middle: %d records in %.1f us" % (count, (default_timer() - start) * 1e6))
+    reader.Close()
+    os.remove(path)
+
+## Loopback StreamServer/StreamClient: delivered rate and end-to-end latency (due time to received).
+def BenchNetwork(library, seconds):
+    from PyEpocNet import StreamClient, StreamServer
+    print("Loopback streaming (%.1f s each)" % seconds)
+    for label, udp, compress in (("TCP", False, 0), ("TCP zlib", False, 6), ("UDP", True, 0)):
+        for rate, users, realtime in ((1000.0, 4, True), (128.0, 1, False)):
+            engine = SimulatedEngine(rate, users, realtime, library=library)
+            server = StreamServer(engine.Handler(), "127.0.0.1", 0, udp=udp, compress=compress)
+            engine.Configure(rate, users, realtime)
+            start = engine.Now()
+            server.Start()
+            client = StreamClient("127.0.0.1", server.Port, udp=udp)
+            while not server.Clients():
+                time.sleep(0.001)
+            latencies, end = [], engine.Now() + seconds
+            while engine.Now() < end:
+                for record in client.Receive(0.1):
+                    if record.EventType == EVENT['EE_EmoStateUpdated']:
+                        latencies.append(engine.Now() - start - record.State.Time)
+            server.Stop()
+            client.Close()
+            if realtime:
+                latencies.sort()
+                print("  %-8s %6.0f Hz x %d users: %8.0f events/sec  latency p50 %6.2f ms  p99 %6.2f ms  %5.0f bytes/record" % (
+                    label, rate, users, client.Received / seconds, Percentile(latencies, 50) * 1e3,
+                    Percentile(latencies, 99) * 1e3, float(server.Bytes) / max(1, client.Received)))
+            else:
+                print("  %-8s flat out:           %8.0f events/sec  lost %d" % (label, client.Received / seconds, client.Lost))
+
+## SharedPublisher publish rate and SharedSubscriber read rates (Python 3.8 or later).
+def BenchShared(library, records):
+    from PyEpocShared import SharedPublisher, SharedSubscriber
+    publisher = SharedPublisher(SimulatedEngine(realtime=False, library=library).Handler(), capacity=records + 1)
+    subscribers = [SharedSubscriber(publisher.Name) for i in range(4)]
+    record = EventRecord()
+    print("Shared memory publish/subscribe (%d records)" % records)
+    start = default_timer()
+    for i in range(records):
+        publisher.Publish(record)
+    print("  publish:            %12.0f records/sec" % (records / (default_timer() - start)))
+    start = default_timer()
+    slots = subscribers[0].Peek()
+    subscribers[0].Release(len(slots))
+    print("  Peek (in place):    %12.0f records/sec" % (records / (default_timer() - start)))
+    del slots
+    start = default_timer()
+    for subscriber in subscribers[1:]:
+        subscriber.Read()
+    print("  Read (copies), 3 subscribers: %6.0f records/sec each" % (3 * records / (default_timer() - start)))
+    for subscriber in subscribers:
+        subscriber.Close()
+    publisher.Close()
+
+## Raw EEG ingest: per-channel EE_DataGet() into Python lists versus EEGAcquisition.Update().
+def BenchData(library, blocks, blocksize=16):
+    engine = SimulatedEngine(realtime=False, library=library)
+    EmotivEngine = engine.Handler()
+    engineeventhandle = EmotivEngine.EE_EmoEngineEventCreate()
+    acquisition = EEGAcquisition(EmotivEngine)
+    datahandle = EmotivEngine.EE_DataCreate()
+    channels = acquisition.Channels
+
+    def advance():
+        for i in range(blocksize):
+            EmotivEngine._EE_EngineGetNextEvent(engineeventhandle)
+
+    def lists(n):
+        for i in range(n):
+            advance()
+            EmotivEngine.EE_DataUpdateHandle(0, datahandle)
+            samples = EmotivEngine.EE_DataGetNumberOfSample(datahandle)[1]
+            [EmotivEngine.EE_DataGet(datahandle, channel, samples)[1].tolist() for channel in channels]
+
+    def buffer(n):
+        for i in range(n):
+            advance()
+            acquisition.Update()
+
+    print("Raw EEG (%d channels, %d-sample blocks)" % (len(channels), blocksize))
+    for label, function in (("  EE_DataGet per channel to lists", lists), ("  EEGAcquisition.Update", buffer)):
+        rate = Measure(label, function, blocks)
+        print("  %-46s %12.0f channel-samples/sec" % ("", rate * blocksize * len(channels)))
+    acquisition.Close()
+    EmotivEngine.EE_DataFree(datahandle)
+    EmotivEngine.EE_EmoEngineEventFree(engineeventhandle)
+
+## Band power of 14 channels fed in 16-sample blocks: channel-seconds of EEG per CPU-second (needs NumPy).
+def BenchFeatures(seconds, rate=128, blocksize=16):
+    from PyEpocData import EEGCHANNELS
+    from PyEpocFeatures import BandPower
+    labels = ["C%d" % channel for channel in EEGCHANNELS]
+    samples = numpy.random.RandomState(0).normal(4200.0, 40.0, (len(labels), int(seconds * rate)))
+    blocks = [samples[:, i:i + blocksize] for i in range(0, samples.shape[1], blocksize)]
+
+    def vectorized():
+        bandpower = BandPower(labels, rate)
+        for block in blocks:
+            bandpower.Push(block)
+        return bandpower.Frames
+
+    def perchannel():
+        bandpowers = [BandPower(labels[:1], rate) for label in labels]
+        for block in blocks:
+            for row, bandpower in enumerate(bandpowers):
+                bandpower.Push(block[row:row + 1])
+        return bandpowers[0].Frames
+
+    print("Band power (%d channels, %.0f s at %d Hz, 2 s window, 0.25 s hop)" % (len(labels), seconds, rate))
+    for label, function in (("  one BandPower per channel", perchannel), ("  all channels at once", vectorized)):
+        start = CPUTime()
+        frames = function()
+        elapsed = max(CPUTime() - start, 1e-6)
+        print("  %-46s %12.0f channel-seconds/CPU-second  (%d frames)" % (label.strip(), len(labels) * seconds / elapsed, frames))
+
+## FilterChain (50 Hz notch, 1-45 Hz band-pass) on 14 channels: state kept across 16-sample blocks
+# versus refiltering the latest 2 s window for every block; channel-seconds per CPU-second (needs NumPy).
+def BenchFilters(seconds, rate=128, blocksize=16):
+    import PyEpocFilter
+    samples = numpy.random.RandomState(0).normal(4200.0, 40.0, (14, int(seconds * rate)))
+    blocks = [samples[:, i:i + blocksize] for i in range(0, samples.shape[1], blocksize)]
+    window = 2 * rate
+
+    def incremental():
+        chain = PyEpocFilter.FilterChain(len(samples), rate)
+        for block in blocks:
+            chain.Filter(block)
+
+    def refiltered():
+        chain = PyEpocFilter.FilterChain(len(samples), rate)
+        for i in range(len(blocks)):
+            chain.Reset()
+            end = (i + 1) * blocksize
+            chain.Filter(samples[:, max(0, end - window):end])
+
+    print("Filter chain (14 channels, %.0f s at %d Hz, %d-sample blocks)" % (seconds, rate, blocksize))
+    native = PyEpocFilter.signal
+    runs = [("incremental, NumPy only", incremental, None)]
+    if native is not None:
+        runs = [("refilter 2 s window, scipy", refiltered, native), ("incremental, scipy", incremental, native)] + runs
+    for label, function, backend in runs:
+        PyEpocFilter.signal = backend
+        start = CPUTime()
+        function()
+        elapsed = max(CPUTime() - start, 1e-6)
+        print("  %-46s %12.0f channel-seconds/CPU-second" % (label, len(samples) * seconds / elapsed))
+    PyEpocFilter.signal = native
+
+## ProfileCache.Apply() when the engine already holds the profile versus uploading it every time.
+def BenchProfiles(library, iterations):
+    from PyEpocProfiles import ProfileCache
+    engine = SimulatedEngine(users=2, realtime=False, library=library)
+    cache = ProfileCache(engine.Handler())
+    cache.Fetch(0, "subject")
+
+    def upload(n):
+        for i in range(n):
+            cache.Apply(1, "subject", force=True)
+
+    def cached(n):
+        for i in range(n):
+            cache.Apply(1, "subject")
+
+    print("User profiles (%d bytes)" % cache.Bytes)
+    Measure("  EE_SetUserProfile every switch", upload, iterations)
+    Measure("  ProfileCache.Apply, unchanged profile", cached, iterations)
+    cache.Close()
+
+## Save latency of profiles written in place with fsync() versus queued on a ProfileRepository, and
+# reading a directory of profiles with one and with several threads.
+def BenchRepository(profiles):
+    from PyEpocProfiles import ProfileRepository
+    directory = tempfile.mkdtemp()
+    data = os.urandom(16384)
+    names = ["subject-%03d" % i for i in range(profiles)]
+
+    def direct(n):
+        for i in range(n):
+            with open(os.path.join(directory, names[i % profiles] + ".direct"), "wb") as profilefile:
+                profilefile.write(data)
+                profilefile.flush()
+                os.fsync(profilefile.fileno())
+
+    repository = ProfileRepository(directory)
+
+    def queued(n):
+        for i in range(n):
+            repository.Save(names[i % profiles], data)
+
+    print("Profile repository (%d profiles of %d bytes)" % (profiles, len(data)))
+    Measure("  open/write/fsync per save", direct, profiles, 1)
+    Measure("  ProfileRepository.Save", queued, profiles, 1)
+    start = default_timer()
+    repository.Flush()
+    print("  %-46s %12.3f sec" % ("background write of the batch", default_timer() - start))
+    for threads in (1, 4):
+        Measure("  Preload, %d thread(s)" % threads, lambda n: repository.Preload(threads=threads), profiles, 1)
+    repository.Close()
+
+## Training every user in turn with a blocking script versus all users at once with a
+# TrainingOrchestrator, simulated training sessions of trainingtime seconds.
+def BenchTraining(library, users=4, actions=("COG_NEUTRAL", "COG_PUSH", "COG_PULL"), trainingtime=0.1):
+    from PyEpocTraining import TrainingOrchestrator
+    engine = SimulatedEngine(rate=32.0, users=users, realtime=True, library=library)
+    engine.SetTraining(trainingtime, 0)
+    handler = engine.Handler()
+
+    def WaitFor(userid, event):
+        while True:
+            for record in handler.get_events(timeout=1.0):
+                if record.EventType == EVENT['EE_CognitivEvent'] and record.UserId == userid and record.CognitivEvent == event:
+                    return
+
+    start = default_timer()
+    for userid in range(users):
+        for action in actions:
+            handler.EE_CognitivSetTrainingAction(userid, COGACTION[action])
+            handler.EE_CognitivSetTrainingControl(userid, COGTRAININGCONTROL['COG_START'])
+            WaitFor(userid, COGEVENT['EE_CognitivTrainingSucceeded'])
+            handler.EE_CognitivSetTrainingControl(userid, COGTRAININGCONTROL['COG_ACCEPT'])
+            WaitFor(userid, COGEVENT['EE_CognitivTrainingCompleted'])
+    blocking = default_timer() - start
+
+    trainer = TrainingOrchestrator(handler)
+    start = default_timer()
+    for userid in range(users):
+        for action in actions:
+            trainer.Queue(userid, action)
+    while not trainer.Idle():
+        trainer.Feed(handler.get_events(timeout=1.0))
+    orchestrated = default_timer() - start
+    print("Training (%d users x %d actions, %.2f s per session)" % (users, len(actions), trainingtime))
+    print("  %-46s %12.3f sec" % ("blocking script, one user after another", blocking))
+    print("  %-46s %12.3f sec" % ("TrainingOrchestrator, all users at once", orchestrated))
+
+## Reading and re-applying a user's full tuning with the EpocHandler wrappers versus a TuningCache.
+def BenchTuning(library, iterations):
+    from PyEpocTuning import TuningCache, UserTuning
+    engine = SimulatedEngine(users=1, realtime=False, library=library)
+    handler = engine.Handler()
+    algos = sorted(EXPRESSIVALGO.values())
+    settings = UserTuning(ActiveActions=COGACTION['COG_PUSH'] | COGACTION['COG_LIFT'], ActivationLevel=4,
+                          ActionSensitivity=(5, 6, 7, 5), SignatureCaching=1, SignatureCacheSize=10,
+                          Thresholds=dict((name, 600) for name in EXPRESSIVALGO), SignatureType=0)
+
+    def read(n):
+        for i in range(n):
+            handler.EE_CognitivGetActiveActions(0)
+            handler.EE_CognitivGetActivationLevel(0)
+            handler.EE_CognitivGetActionSensitivity(0)
+            handler.EE_CognitivGetSignatureCaching(0)
+            handler.EE_CognitivGetSignatureCacheSize(0)
+            for algo in algos:
+                handler.EE_ExpressivGetThreshold(0, algo, EXPRTHRESHOLD['EXP_SENSITIVITY'])
+            handler.EE_ExpressivGetSignatureType(0)
+
+    def write(n):
+        for i in range(n):
+            handler.EE_CognitivSetActiveActions(0, settings.ActiveActions)
+            handler.EE_CognitivSetActivationLevel(0, settings.ActivationLevel)
+            handler.EE_CognitivSetActionSensitivity(0, *settings.ActionSensitivity)
+            handler.EE_CognitivSetSignatureCaching(0, settings.SignatureCaching)
+            handler.EE_CognitivSetSignatureCacheSize(0, settings.SignatureCacheSize)
+            for name, threshold in settings.Thresholds.items():
+                handler.EE_ExpressivSetThreshold(0, EXPRESSIVALGO[name], EXPRTHRESHOLD['EXP_SENSITIVITY'], threshold)
+            handler.EE_ExpressivSetSignatureType(0, settings.SignatureType)
+
+    tuning = TuningCache(handler)
+    tuning.Apply(0, settings)
+
+    def cachedread(n):
+        for i in range(n):
+            tuning.Read(0, refresh=True)
+
+    def cachedapply(n):
+        for i in range(n):
+            tuning.Apply(0, settings)
+
+    print("User tuning (%d parameters)" % (5 + len(algos) + 1))
+    Measure("  EpocHandler getters, full tuning", read, iterations)
+    Measure("  TuningCache.Read(refresh=True)", cachedread, iterations)
+    Measure("  EpocHandler setters, full tuning", write, iterations)
+    before = engine.SetCount()
+    Measure("  TuningCache.Apply, unchanged tuning", cachedapply, iterations)
+    print("  %-46s %12d" % ("setter calls made by TuningCache.Apply", engine.SetCount() - before))
+
+## Handler factory for EngineSupervisor workers (module level, so it can be pickled).
+def SimulatedWorker(library, maxevents):
+    return SimulatedEngine(realtime=False, maxevents=maxevents, library=library).Handler()
+
+## Aggregate throughput of 1, 2 and 4 EngineSupervisor worker processes (Python 3.8 or later).
+def BenchPool(library, events):
+    from PyEpocPool import EngineSupervisor
+    print("EngineSupervisor (%d events per engine, %d CPUs)" % (events, os.cpu_count()))
+    for engines in (1, 2, 4):
+        supervisor = EngineSupervisor(capacity=8192)
+        for i in range(engines):
+            supervisor.Add(SimulatedWorker, (library, events))
+        start = default_timer()
+        supervisor.Start()
+        received = 0
+        while received < engines * (events + 1) and supervisor.Wait(5.0):
+            for index, records in supervisor.DrainAll():
+                received += len(records)
+        elapsed = default_timer() - start
+        overflows = sum(supervisor.Counters(i)[1] for i in range(engines))
+        print("  %d engine(s): %12.0f events/sec  overflows %d" % (engines, received / elapsed, overflows))
+        supervisor.Close()
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    library = BuildSimulator()
+    BenchPrototypes(library, iterations)
+    BenchEventLoop(library, iterations // 10)
+    BenchSnapshot(library, iterations // 10)
+    BenchContactQuality(library, iterations // 10)
+    BenchDelta(library, iterations // 10)
+    BenchHandles(library, iterations)
+    BenchRates(library, 1.0)
+    BenchPump(library, 1.0)
+    BenchRecording(iterations)
+    BenchData(library, iterations // 100)
+    BenchProfiles(library, iterations // 10)
+    BenchRepository(max(iterations // 1000, 50))
+    BenchTraining(library)
+    BenchTuning(library, iterations // 100)
+    if numpy is not None:
+        BenchFeatures(600.0)
+        BenchFilters(600.0)
+    BenchNetwork(library, 1.0)
+    if sys.version_info >= (3, 8):
+        BenchShared(library, iterations)
+        BenchPool(library, iterations // 4)
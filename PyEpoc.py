@@ -7,9 +7,13 @@
 # @summary This module enables Python to communicate with the Emotiv Epoc head-set and Emotiv's EmoComposer, using Emotiv's dynamic link libraries. Although some functions return data in a way that differs from the Emotiv SDK, PyEpoc functions should be familiar to those using the Emotiv SDK.\n\n
 # \b Classes:\n
 # \li EpocHandler
+# \li HandlePool
+# \li SensorMontage
 #
 # \b Structs:\n
 # \li InputSensorDescriptor
+# \li EmoStateSnapshot
+# \li EventRecord
 #
 # \b Dictionaries:\n
 # \li #ERRCODE
@@ -27,6 +31,9 @@
 # \li #COGEVENT
 # \li #INPUTCHANNELS
 # \li #CONTACTQUALITY
+# \li #DATACHANNEL
+# \li #SNAPSHOTPART
+# \li #PROTOTYPES
 #
 # 
 # @version \b PyEpoc 1.2
@@ -36,12 +43,24 @@
 # @contact http://www.mortenblog.net \n
 #
 # @note \li This module requires <a href="http://www.emotiv.com">Emotiv</a>'s SDK - Copyright 2009 , Emotiv Systems, Inc.
-# \li This module requires <a href="http://www.python.org/download/releases/2.6.4/">Python 2.6.4</a> (or later) - Copyright 1990-2009 , Python Software Foundation.\n
+# \li This module requires <a href="http://www.python.org/download/releases/2.7/">Python 2.7</a> or Python 3 - Copyright 1990-2010 , Python Software Foundation.\n
 
+import array
+import collections
 import ctypes
-#import time
+import sys
+import time
 #import decimal
 
+try:
+    _oldbuffer = buffer    # Python 2
+except NameError:
+    _oldbuffer = None
+
+## \internal
+# Clock for timeouts (time.monotonic() is not in Python 2).
+_monotonic = getattr(time, "monotonic", time.time)
+
 ## Emotiv Engine's Return Codes.
 #
 # This dictionary contains the EmoEngine return codes.
@@ -386,6 +405,63 @@ CONTACTQUALITY = {'EEG_CQ_NO_SIGNAL'    : 0,
                   'EEG_CQ_FAIR'         : 4,
                   'EEG_CQ_GOOD'         : 5}
 
+## Raw Data Channels.
+#
+# Channels of the raw EEG data returned by EpocHandler::EE_DataGet() (research SDK only).
+# ED_AF3 to ED_AF4 are the 14 EEG channels, in microvolts.
+#
+# ED_COUNTER      : \b 0 \n sample counter, 0-128
+# ED_INTERPOLATED : \b 1 \n
+# ED_RAW_CQ       : \b 2 \n
+# ED_AF3          : \b 3 \n
+# ED_F7           : \b 4 \n
+# ED_F3           : \b 5 \n
+# ED_FC5          : \b 6 \n
+# ED_T7           : \b 7 \n
+# ED_P7           : \b 8 \n
+# ED_O1           : \b 9 \n
+# ED_O2           : \b 10 \n
+# ED_P8           : \b 11 \n
+# ED_T8           : \b 12 \n
+# ED_FC6          : \b 13 \n
+# ED_F4           : \b 14 \n
+# ED_F8           : \b 15 \n
+# ED_AF4          : \b 16 \n
+# ED_GYROX        : \b 17 \n
+# ED_GYROY        : \b 18 \n
+# ED_TIMESTAMP    : \b 19 \n
+# ED_ES_TIMESTAMP : \b 20 \n
+# ED_FUNC_ID      : \b 21 \n
+# ED_FUNC_VALUE   : \b 22 \n
+# ED_MARKER       : \b 23 \n
+# ED_SYNC_SIGNAL  : \b 24 \n
+# @see EE_DataChannels_enum (edk.h)
+DATACHANNEL = {'ED_COUNTER'      : 0,
+               'ED_INTERPOLATED' : 1,
+               'ED_RAW_CQ'       : 2,
+               'ED_AF3'          : 3,
+               'ED_F7'           : 4,
+               'ED_F3'           : 5,
+               'ED_FC5'          : 6,
+               'ED_T7'           : 7,
+               'ED_P7'           : 8,
+               'ED_O1'           : 9,
+               'ED_O2'           : 10,
+               'ED_P8'           : 11,
+               'ED_T8'           : 12,
+               'ED_FC6'          : 13,
+               'ED_F4'           : 14,
+               'ED_F8'           : 15,
+               'ED_AF4'          : 16,
+               'ED_GYROX'        : 17,
+               'ED_GYROY'        : 18,
+               'ED_TIMESTAMP'    : 19,
+               'ED_ES_TIMESTAMP' : 20,
+               'ED_FUNC_ID'      : 21,
+               'ED_FUNC_VALUE'   : 22,
+               'ED_MARKER'       : 23,
+               'ED_SYNC_SIGNAL'  : 24}
+
 ## @struct InputSensorDescriptor
 # \brief Input sensor description struct.
 #
@@ -406,14 +482,467 @@ class InputSensorDescriptor(ctypes.Structure):
                 ("yLoc", ctypes.c_double), ## y coordinate from center of head towards ears
                 ("zLoc", ctypes.c_double)]  ## z coordinate from center of head toward top of skull
 
+## @struct EmoStateSnapshot
+# \brief Decoded EmoState record.
+#
+# Holds every status, Expressiv, Affectiv and Cognitiv value of an EmoState, as filled in
+# by EpocHandler::snapshot(). The record is a fixed-size struct, so it can be copied with
+# EmoStateSnapshot.from_buffer_copy() or written out as raw bytes.
+# @note The per-algorithm ES_ExpressivIsActive() / ES_AffectivIsActive() queries are not part of the record.
+class EmoStateSnapshot(ctypes.Structure):
+    """.Time                     - seconds since EmoEngine connected to the headset
+    .UserId                   - user ID, set by the caller (snapshot() leaves it alone)
+    .HeadsetOn                - 1/0, headset is on the head
+    .WirelessSignal           - SIGNALSTRENGTH
+    .BatteryLevel             - battery charge level
+    .BatteryMaxLevel          - maximum battery charge level
+    .NumContactQualityChannels - number of valid entries in ContactQuality
+    .ContactQuality           - CONTACTQUALITY per INPUTCHANNELS entry
+    .Blink .LeftWink .RightWink .EyesOpen .LookingUp .LookingDown .LookingLeft .LookingRight - 1/0
+    .LeftEyelid .RightEyelid  - 0.0 (open) to 1.0 (closed)
+    .EyeX .EyeY               - -1.0 to 1.0
+    .UpperFaceAction .LowerFaceAction - EXPRESSIVALGO
+    .UpperFaceActionPower .LowerFaceActionPower - 0.0 to 1.0
+    .ExcitementShortTerm .ExcitementLongTerm .Meditation .Frustration .EngagementBoredom - 0.0 to 1.0
+    .CognitivAction           - COGACTION
+    .CognitivActionPower      - 0.0 to 1.0
+    .CognitivIsActive         - 1/0"""
+
+    _fields_ = [("Time", ctypes.c_float),
+                ("UserId", ctypes.c_int),
+                ("HeadsetOn", ctypes.c_int),
+                ("WirelessSignal", ctypes.c_int),
+                ("BatteryLevel", ctypes.c_int),
+                ("BatteryMaxLevel", ctypes.c_int),
+                ("NumContactQualityChannels", ctypes.c_int),
+                ("ContactQuality", ctypes.c_int * len(INPUTCHANNELS)),
+                ("Blink", ctypes.c_int),
+                ("LeftWink", ctypes.c_int),
+                ("RightWink", ctypes.c_int),
+                ("EyesOpen", ctypes.c_int),
+                ("LookingUp", ctypes.c_int),
+                ("LookingDown", ctypes.c_int),
+                ("LookingLeft", ctypes.c_int),
+                ("LookingRight", ctypes.c_int),
+                ("LeftEyelid", ctypes.c_float),
+                ("RightEyelid", ctypes.c_float),
+                ("EyeX", ctypes.c_float),
+                ("EyeY", ctypes.c_float),
+                ("UpperFaceAction", ctypes.c_int),
+                ("UpperFaceActionPower", ctypes.c_float),
+                ("LowerFaceAction", ctypes.c_int),
+                ("LowerFaceActionPower", ctypes.c_float),
+                ("ExcitementShortTerm", ctypes.c_float),
+                ("ExcitementLongTerm", ctypes.c_float),
+                ("Meditation", ctypes.c_float),
+                ("Frustration", ctypes.c_float),
+                ("EngagementBoredom", ctypes.c_float),
+                ("CognitivAction", ctypes.c_int),
+                ("CognitivActionPower", ctypes.c_float),
+                ("CognitivIsActive", ctypes.c_int)]
+
+## @struct EventRecord
+# \brief Decoded EmoEngine event.
+#
+# Returned by EpocHandler::get_events() and held in the PyEpocPump::EventPump ring. State is only
+# filled in for EE_EmoStateUpdated events; CognitivEvent / ExpressivEvent only for
+# EE_CognitivEvent / EE_ExpressivEvent.
+class EventRecord(ctypes.Structure):
+    """.Sequence       - running event number, starting at 0
+    .EventType      - EVENT
+    .UserId         - user ID
+    .CognitivEvent  - COGEVENT
+    .ExpressivEvent - EXPEVENT
+    .State          - EmoStateSnapshot"""
+
+    _fields_ = [("Sequence", ctypes.c_ulonglong),
+                ("EventType", ctypes.c_int),
+                ("UserId", ctypes.c_int),
+                ("CognitivEvent", ctypes.c_int),
+                ("ExpressivEvent", ctypes.c_int),
+                ("State", EmoStateSnapshot)]
+
+## EmoStateSnapshot Parts.
+#
+# Bit flags selecting the parts of an EmoState decoded by EpocHandler::snapshot().
+#
+# EMOENGINE : \b 0x1 \n (time, headset, wireless, battery and contact quality)
+# EXPRESSIV : \b 0x2 \n
+# AFFECTIV  : \b 0x4 \n
+# COGNITIV  : \b 0x8 \n
+# ALL       : \b 0xF \n
+SNAPSHOTPART = {'EMOENGINE' : 0x1,
+                'EXPRESSIV' : 0x2,
+                'AFFECTIV'  : 0x4,
+                'COGNITIV'  : 0x8,
+                'ALL'       : 0xF}
+
+## \internal
+# Argument for a c_char_p parameter: str (unicode) is encoded, bytes pass unchanged.
+def _CString(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    return value.encode(sys.getfilesystemencoding() or "utf-8")
+
+## \internal
+# Size in bytes of a buffer. Python 2 has no memoryview.nbytes, and its mmap and array.array only
+# offer the old buffer interface.
+def _BufferSize(data):
+    try:
+        view = memoryview(data)
+    except TypeError:
+        if _oldbuffer is None:
+            raise
+        return len(_oldbuffer(data))
+    size = view.itemsize
+    for extent in view.shape or ():
+        size *= extent
+    return size
+
+## \internal
+# (struct format, item size) of a buffer; array.array also on Python 2.
+def _BufferFormat(data):
+    try:
+        view = memoryview(data)
+    except TypeError:
+        if _oldbuffer is None or not isinstance(data, array.array):
+            raise
+        return (data.typecode, data.itemsize)
+    return (view.format, view.itemsize)
+
+## \internal
+# Event types _DecodeEvent() decodes further.
+_EMOSTATEUPDATED, _COGNITIVEVENT, _EXPRESSIVEVENT = EVENT['EE_EmoStateUpdated'], EVENT['EE_CognitivEvent'], EVENT['EE_ExpressivEvent']
+_SNAPSHOTSIZE = ctypes.sizeof(EmoStateSnapshot)
+
+## Function prototypes.
+#
+# This dictionary maps every EmoEngine / EmoState function used by EpocHandler to its
+# (restype, argtypes) pair. EpocHandler resolves each function once when it is created,
+# applies the prototype and keeps the function pointer, so no name lookup or default int
+# conversion happens when the functions are called.
+#
+# Handles (EmoEngineEventHandle, EmoStateHandle, OptimizationParamHandle) are declared as
+# c_void_p so they are not truncated on 64-bit platforms. Wrappers of the c_char_p functions
+# accept str and pass it encoded.
+# @see edk.h, EmoStateDLL.h
+PROTOTYPES = {'EE_EngineConnect'                        : (ctypes.c_int, []),
+              'EE_EngineRemoteConnect'                  : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_ushort]),
+              'EE_EngineDisconnect'                     : (ctypes.c_int, []),
+              'EE_EnableDiagnostics'                    : (ctypes.c_int, [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]),
+              'EE_EmoEngineEventCreate'                 : (ctypes.c_void_p, []),
+              'EE_ProfileEventCreate'                   : (ctypes.c_void_p, []),
+              'EE_EmoEngineEventFree'                   : (None, [ctypes.c_void_p]),
+              'EE_EmoStateCreate'                       : (ctypes.c_void_p, []),
+              'EE_EmoStateFree'                         : (None, [ctypes.c_void_p]),
+              'EE_EmoEngineEventGetType'                : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_CognitivEventGetType'                 : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_ExpressivEventGetType'                : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_EmoEngineEventGetUserId'              : (ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]),
+              'EE_EmoEngineEventGetEmoState'            : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'EE_EngineGetNextEvent'                   : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_EngineClearEventQueue'                : (ctypes.c_int, [ctypes.c_int]),
+              'EE_EngineGetNumUser'                     : (ctypes.c_int, [ctypes.POINTER(ctypes.c_int)]),
+              'EE_SetHardwarePlayerDisplay'             : (ctypes.c_int, [ctypes.c_uint, ctypes.c_uint]),
+              'EE_SetUserProfile'                       : (ctypes.c_int, [ctypes.c_uint, ctypes.c_void_p, ctypes.c_uint]),
+              'EE_GetUserProfile'                       : (ctypes.c_int, [ctypes.c_uint, ctypes.c_void_p]),
+              'EE_GetBaseProfile'                       : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_GetUserProfileSize'                   : (ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint)]),
+              'EE_GetUserProfileBytes'                  : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint]),
+              'EE_LoadUserProfile'                      : (ctypes.c_int, [ctypes.c_uint, ctypes.c_char_p]),
+              'EE_SaveUserProfile'                      : (ctypes.c_int, [ctypes.c_uint, ctypes.c_char_p]),
+              'EE_ExpressivSetThreshold'                : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int, ctypes.c_int, ctypes.c_int]),
+              'EE_ExpressivGetThreshold'                : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]),
+              'EE_ExpressivSetTrainingAction'           : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_ExpressivSetTrainingControl'          : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_ExpressivGetTrainingAction'           : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_ExpressivGetTrainingTime'             : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_ExpressivGetTrainedSignatureActions'  : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_ulong)]),
+              'EE_ExpressivGetTrainedSignatureAvailable': (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_ExpressivSetSignatureType'            : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_ExpressivGetSignatureType'            : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_CognitivSetActiveActions'             : (ctypes.c_int, [ctypes.c_uint, ctypes.c_ulong]),
+              'EE_CognitivGetActiveActions'             : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_ulong)]),
+              'EE_CognitivGetTrainingTime'              : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_CognitivSetTrainingControl'           : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_CognitivSetTrainingAction'            : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_CognitivGetTrainingAction'            : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_CognitivGetTrainedSignatureActions'   : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_ulong)]),
+              'EE_CognitivGetOverallSkillRating'        : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_float)]),
+              'EE_CognitivGetActionSkillRating'         : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int, ctypes.POINTER(ctypes.c_float)]),
+              'EE_CognitivSetActivationLevel'           : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'EE_CognitivSetActionSensitivity'         : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]),
+              'EE_CognitivGetActivationLevel'           : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_CognitivGetActionSensitivity'         : (ctypes.c_int, [ctypes.c_uint] + [ctypes.POINTER(ctypes.c_int)] * 4),
+              'EE_CognitivStartSamplingNeutral'         : (ctypes.c_int, [ctypes.c_uint]),
+              'EE_CognitivStopSamplingNeutral'          : (ctypes.c_int, [ctypes.c_uint]),
+              'EE_CognitivSetSignatureCaching'          : (ctypes.c_int, [ctypes.c_uint, ctypes.c_uint]),
+              'EE_CognitivGetSignatureCaching'          : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_CognitivSetSignatureCacheSize'        : (ctypes.c_int, [ctypes.c_uint, ctypes.c_uint]),
+              'EE_CognitivGetSignatureCacheSize'        : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int)]),
+              'EE_HeadsetGetSensorDetails'              : (ctypes.c_int, [ctypes.c_int, ctypes.POINTER(InputSensorDescriptor)]),
+              'EE_HardwareGetVersion'                   : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_ulong)]),
+              'EE_SoftwareGetVersion'                   : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_uint, ctypes.POINTER(ctypes.c_ulong)]),
+              'EE_HeadsetGetGyroDelta'                  : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]),
+              'EE_HeadsetGyroRezero'                    : (ctypes.c_int, [ctypes.c_uint]),
+              'EE_OptimizationParamCreate'              : (ctypes.c_void_p, []),
+              'EE_OptimizationParamFree'                : (None, [ctypes.c_void_p]),
+              'EE_OptimizationEnable'                   : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_OptimizationIsEnabled'                : (ctypes.c_int, [ctypes.POINTER(ctypes.c_bool)]),
+              'EE_OptimizationDisable'                  : (ctypes.c_int, []),
+              'EE_OptimizationGetParam'                 : (ctypes.c_int, [ctypes.c_void_p]),
+              'EE_OptimizationGetVitalAlgorithm'        : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(ctypes.c_uint)]),
+              'EE_OptimizationSetVitalAlgorithm'        : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int, ctypes.c_uint]),
+              'EE_ResetDetection'                       : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int, ctypes.c_uint]),
+              'EE_DataCreate'                           : (ctypes.c_void_p, []),
+              'EE_DataFree'                             : (None, [ctypes.c_void_p]),
+              'EE_DataUpdateHandle'                     : (ctypes.c_int, [ctypes.c_uint, ctypes.c_void_p]),
+              'EE_DataGetNumberOfSample'                : (ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint)]),
+              'EE_DataGet'                              : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(ctypes.c_double), ctypes.c_uint]),
+              'EE_DataSetBufferSizeInSec'               : (ctypes.c_int, [ctypes.c_float]),
+              'EE_DataGetBufferSizeInSec'               : (ctypes.c_int, [ctypes.POINTER(ctypes.c_float)]),
+              'EE_DataAcquisitionEnable'                : (ctypes.c_int, [ctypes.c_uint, ctypes.c_bool]),
+              'EE_DataAcquisitionIsEnabled'             : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_bool)]),
+              'EE_DataGetSamplingRate'                  : (ctypes.c_int, [ctypes.c_uint, ctypes.POINTER(ctypes.c_uint)]),
+              'EE_DataSetMarker'                        : (ctypes.c_int, [ctypes.c_uint, ctypes.c_int]),
+              'ES_GetTimeFromStart'                     : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_GetHeadsetOn'                         : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_GetNumContactQualityChannels'         : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_GetContactQuality'                    : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int]),
+              'ES_GetContactQualityFromAllChannels'     : (ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.c_size_t]),
+              'ES_ExpressivIsBlink'                     : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsLeftWink'                  : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsRightWink'                 : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsEyesOpen'                  : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsLookingUp'                 : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsLookingDown'               : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsLookingLeft'               : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivIsLookingRight'              : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivGetEyelidState'              : (None, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_float), ctypes.POINTER(ctypes.c_float)]),
+              'ES_ExpressivGetEyeLocation'              : (None, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_float), ctypes.POINTER(ctypes.c_float)]),
+              'ES_ExpressivGetEyebrowExtent'            : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_ExpressivGetSmileExtent'              : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_ExpressivGetClenchExtent'             : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_ExpressivGetUpperFaceAction'          : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivGetUpperFaceActionPower'     : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_ExpressivGetLowerFaceAction'          : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_ExpressivGetLowerFaceActionPower'     : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_ExpressivIsActive'                    : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int]),
+              'ES_AffectivGetExcitementLongTermScore'   : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_AffectivGetExcitementShortTermScore'  : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_AffectivIsActive'                     : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_int]),
+              'ES_AffectivGetMeditationScore'           : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_AffectivGetFrustrationScore'          : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_AffectivGetEngagementBoredomScore'    : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_CognitivGetCurrentAction'             : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_CognitivGetCurrentActionPower'        : (ctypes.c_float, [ctypes.c_void_p]),
+              'ES_CognitivIsActive'                     : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_GetWirelessSignalStatus'              : (ctypes.c_int, [ctypes.c_void_p]),
+              'ES_Copy'                                 : (None, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_AffectivEqual'                        : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_ExpressivEqual'                       : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_CognitivEqual'                        : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_EmoEngineEqual'                       : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_Equal'                                : (ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p]),
+              'ES_GetBatteryChargeLevel'                : (None, [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]),
+              'ES_Init'                                 : (None, [ctypes.c_void_p])}
+
+## @class HandlePool
+# \brief Bounded pool of pre-created native handles.
+#
+# Created by EpocHandler::EmoStatePool() and EpocHandler::EmoEngineEventPool(). All handles are created
+# up front, so checking one out never allocates. Handles are freed by Close(), which EpocHandler::Close()
+# calls for every pool of the handler.
+#
+# Checkout() and Return() are a deque pop and append, which are atomic, so the pool needs no lock. In
+# debug mode the pool also tracks the checked-out handles and rejects foreign or double returns.
+# @code
+# with EmotivEngine.EmoStatePool(64).handle() as statehandle:
+#     EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+# @endcode
+class HandlePool:
+    ## \internal
+    # @param create function() returning a new handle
+    # @param free function(handle)
+    # @param size int, number of handles
+    # @param debug bool, check every Return()
+    def __init__(self, create, free, size, debug=False):
+        self.Size = size
+        self.Debug = debug
+        self._free = free
+        self._handles = collections.deque(create() for i in range(size))
+        self._all = list(self._handles)
+        self._out = set() if debug else None
+        self._closed = False
+
+    ## Number of handles available for checkout.
+    def Available(self):
+        return len(self._handles)
+
+    ## Take a handle from the pool.
+    #
+    # Safe to call from several threads. The handle keeps its previous contents; call
+    # EpocHandler::ES_Init() on EmoState handles that must start out empty.
+    # @return handle
+    # @exception IndexError the pool is exhausted or closed
+    def Checkout(self):
+        try:
+            handle = self._handles.pop()
+        except IndexError:
+            raise IndexError("handle pool closed" if self._closed else "handle pool exhausted (%d handles)" % self.Size)
+        if self._out is not None:
+            self._out.add(handle)
+        return handle
+
+    ## Give a handle back to the pool.
+    #
+    # After Close() the handle is already freed and is dropped.
+    # @param handle handle, from Checkout()
+    # @exception ValueError debug mode only: the handle is not checked out from this pool (e.g. returned twice)
+    def Return(self, handle):
+        if self._closed:
+            return
+        if self._out is not None:
+            try:
+                self._out.remove(handle)
+            except KeyError:
+                raise ValueError("handle %r is not checked out from this pool" % (handle,))
+        self._handles.append(handle)
+
+    ## Check out a handle for the duration of a with block.
+    # @return context manager yielding a handle
+    def handle(self):
+        return _PooledHandle(self)
+
+    ## Free every handle of the pool.
+    #
+    # Handles still checked out are freed as well and must not be used afterwards.
+    def Close(self):
+        self._closed = True
+        handles, self._all, self._handles = self._all, [], collections.deque()
+        if self._out is not None:
+            self._out.clear()
+        for handle in handles:
+            self._free(handle)
+
+## \internal
+# Context manager returned by HandlePool::handle().
+class _PooledHandle(object):
+    __slots__ = ('pool', 'handle')
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        self.handle = self.pool.Checkout()
+        return self.handle
+
+    def __exit__(self, *exc):
+        self.pool.Return(self.handle)
+
+## @class SensorMontage
+# \brief Immutable sensor geometry of a headset.
+#
+# Loaded once per hardware version by EpocHandler::sensor_montage() from EE_HeadsetGetSensorDetails(),
+# so lookups never call into the engine. Rows follow #INPUTCHANNELS order; X, Y and Z are contiguous
+# double arrays (numpy.frombuffer() views them without copying). Montages are shared between
+# lookups, so do not modify them.
+class SensorMontage:
+    """.Version    - EE_HardwareGetVersion() value the montage was loaded for (None if unknown)
+    .ChannelIds - tuple of INPUTCHANNELS ids
+    .Exists     - tuple of bool, sensor exists on this headset model
+    .Labels     - tuple of str
+    .X .Y .Z    - array.array of double, sensor coordinates"""
+
+    ## \internal
+    # @param version int, hardware version
+    # @param sensors list of (channelid, exist, label, x, y, z)
+    def __init__(self, version, sensors):
+        self.Version = version
+        self.ChannelIds = tuple(sensor[0] for sensor in sensors)
+        self.Exists = tuple(bool(sensor[1]) for sensor in sensors)
+        self.Labels = tuple(sensor[2] for sensor in sensors)
+        self.X, self.Y, self.Z = [array.array('d', [sensor[axis] for sensor in sensors]) for axis in (3, 4, 5)]
+        self._rows = dict((channelid, row) for row, channelid in enumerate(self.ChannelIds))
+        self._rows.update((label, row) for row, label in enumerate(self.Labels) if label)
+
+    def __len__(self):
+        return len(self.ChannelIds)
+
+    ## Row of a sensor.
+    # @param channel int or str, #INPUTCHANNELS id or sensor label
+    # @return int
+    # @exception KeyError unknown channel
+    def Index(self, channel):
+        return self._rows[channel]
+
+    ## Position of a sensor.
+    # @param channel int or str, #INPUTCHANNELS id or sensor label
+    # @return (x, y, z)
+    def Position(self, channel):
+        row = self._rows[channel]
+        return (self.X[row], self.Y[row], self.Z[row])
+
+    ## Sensor table as tuples.
+    # @return list of (channelid, exist, label, x, y, z)
+    def Sensors(self):
+        return [(self.ChannelIds[row], int(self.Exists[row]), self.Labels[row], self.X[row], self.Y[row], self.Z[row])
+                for row in range(len(self))]
+
+## \internal
+# SensorMontage per hardware version, shared by every handler.
+_sensormontages = {}
+
 ## @class EpocHandler
 # \brief The wrapper class.
 #
 # This class creates a link to Emotiv's DLL and it's functions.
 class EpocHandler:
     ## \internal
-    def __init__(self):
-        self.EmotivEngineDLL = ctypes.cdll.edk  # link the edk.dll
+    # @param enginedll library or str, an already loaded edk library or the path to one (default: ctypes.cdll.edk).
+    # Any object with the edk functions as attributes works, such as PyEpocReplay::ReplayEngine.
+    # @sa PyEpocSim::SimulatedEngine
+    def __init__(self, enginedll=None):
+        if enginedll is None:
+            enginedll = ctypes.cdll.edk  # link the edk.dll
+        elif isinstance(enginedll, str):
+            enginedll = ctypes.CDLL(enginedll)
+        self.EmotivEngineDLL = enginedll
+        self._BindPrototypes()
+        # reusable out-parameters, record for snapshot() and contact quality buffer
+        self._outint1, self._outint2 = ctypes.c_int(), ctypes.c_int()
+        self._outfloat1, self._outfloat2 = ctypes.c_float(), ctypes.c_float()
+        self._outint1ref, self._outint2ref = ctypes.byref(self._outint1), ctypes.byref(self._outint2)
+        self._outfloat1ref, self._outfloat2ref = ctypes.byref(self._outfloat1), ctypes.byref(self._outfloat2)
+        self._snapshot = EmoStateSnapshot()
+        self._contactquality = array.array('i', [0]) * len(INPUTCHANNELS)
+        self._contactqualityc = (ctypes.c_int * len(INPUTCHANNELS)).from_buffer(self._contactquality)
+        self._pools = []
+        ## running PyEpocPump::EventPump attached to this handler, if any (set by the pump)
+        self.Pump = None
+        ## first and longest sleep of get_events() while the engine has no events, in seconds;
+        # PollMaxSleep bounds the latency the backoff adds
+        self.PollMinSleep, self.PollMaxSleep = 0.0005, 0.008
+        self._waithandles = None
+        self._sequence = 0
+        # profile event handle and grow-only scratch buffer of get_user_profile()
+        self._profilehandle = None
+        self._profilescratch = bytearray()
+
+    ## \internal
+    # Resolves every function in #PROTOTYPES once, applies restype/argtypes and stores the
+    # function pointer on the instance as _<name>. Functions missing from older SDK versions are skipped.
+    # Python engines (e.g. PyEpocReplay::ReplayEngine) are bound the same way, without prototypes.
+    def _BindPrototypes(self):
+        for name, (restype, argtypes) in PROTOTYPES.items():
+            try:
+                function = getattr(self.EmotivEngineDLL, name)
+            except AttributeError:
+                continue
+            if isinstance(function, ctypes._CFuncPtr):
+                function.restype = restype
+                function.argtypes = argtypes
+            setattr(self, "_" + name, function)
         
     ## Initializes a connection to EmoEngine.
     #
@@ -422,7 +951,7 @@ class EpocHandler:
     # @sa EpocHandler::EE_EngineRemoteConnect()
     # @see edkErrorCode.h
     def EE_EngineConnect(self):
-        return self.EmotivEngineDLL.EE_EngineConnect()
+        return self._EE_EngineConnect()
 
     ## Initializes a connection to EmoComposer.
     #
@@ -434,7 +963,7 @@ class EpocHandler:
     # @see edkErrorCode.h
     # @note For Emotiv Control Panel use port 3008. For EmoComposer use port 1726.
     def EE_EngineRemoteConnect(self, ip, port):
-        return self.EmotivEngineDLL.EE_EngineRemoteConnect(ip, port)
+        return self._EE_EngineRemoteConnect(_CString(ip), port)
     
     ## Ends the connection to EmoEngine.
     #
@@ -442,7 +971,7 @@ class EpocHandler:
     # @return #ERRCODE    
     # @see edkErrorCode.h
     def EE_EngineDisconnect(self):
-        return self.EmotivEngineDLL.EE_EngineDisconnect()
+        return self._EE_EngineDisconnect()
     
     ## Enables diagnostics logging.
     #
@@ -455,16 +984,16 @@ class EpocHandler:
     def EE_EnableDiagnostics(self, emotivlogfile, enabled):
         if (enabled != 0):
             emotivlogfile = """logs\emotiv.log""" # set the default log file
-            return self.EmotivEngineDLL.EE_EnableDiagnostics(emotivlogfile, 1)
+            return self._EE_EnableDiagnostics(_CString(emotivlogfile), 1, 0)
         else:
-            return self.EmotivEngineDLL.EE_EnableDiagnostics(emotivlogfile, 0)
+            return self._EE_EnableDiagnostics(_CString(emotivlogfile), 0, 0)
     
     ## Create a handle for EmoEngine event.
     #
     # This handle can be reused by the caller to retrieve events.
     # @return handle, EmoEngineEventHandle
     def EE_EmoEngineEventCreate(self):        
-        return self.EmotivEngineDLL.EE_EmoEngineEventCreate()
+        return self._EE_EmoEngineEventCreate()
     
     ## Create a handle to EmoEngine profile event.
     #
@@ -472,14 +1001,14 @@ class EpocHandler:
     # This handle can be reused by the caller to retrieve subsequent profile bytes.
     # @return handle, EmoEngineEventHandle
     def EE_ProfileEventCreate(self):
-        return self.EmotivEngineDLL.EE_ProfileEventCreate()
+        return self._EE_ProfileEventCreate()
     
     ## Free an event handle.
     # 
     # This frees memory referenced by event handle.
     # @param emoengineeventhandle handle, created by EE_EmoEngineEventCreate()
     def EE_EmoEngineEventFree(self, emoengineeventhandle):
-        self.EmotivEngineDLL.EE_EmoEngineEventFree(emoengineeventhandle)
+        self._EE_EmoEngineEventFree(emoengineeventhandle)
     
     ## Create a handle to EmoState.
     #
@@ -487,14 +1016,14 @@ class EpocHandler:
     # This handle can be reused by the caller to retrieve subsequent EmoStates.
     # @return handle
     def EE_EmoStateCreate(self):
-        return self.EmotivEngineDLL.EE_EmoStateCreate()
+        return self._EE_EmoStateCreate()
     
     ## Free EmoState.
     #
     # Frees memory referenced by an EmoState handle.
     # @param emostatehandle handle, created by EE_EmoStateCreate()
     def EE_EmoStateFree(self, emostatehandle):
-        self.EmotivEngineDLL.EE_EmoStateFree(emostatehandle)
+        self._EE_EmoStateFree(emostatehandle)
         
     ## Get EmoEngine event type.
     #
@@ -502,7 +1031,7 @@ class EpocHandler:
     # @param emoengineeventhandle handle
     # @return #EVENT
     def EE_EmoEngineEventGetType(self, emoengineeventhandle):
-         return self.EmotivEngineDLL.EE_EmoEngineEventGetType(emoengineeventhandle)
+         return self._EE_EmoEngineEventGetType(emoengineeventhandle)
     
     ## Get Cognitiv event type.
     #
@@ -511,7 +1040,7 @@ class EpocHandler:
     # @param emoengineeventhandle handle, created by EE_EmoEngineEventCreate()
     # @return #COGEVENT
     def EE_CognitivEventGetType(self, emoengineeventhandle):
-        return self.EmotivEngineDLL.EE_CognitivEventGetType(emoengineeventhandle)
+        return self._EE_CognitivEventGetType(emoengineeventhandle)
     
     ## Get Expressiv event type.
     #
@@ -520,7 +1049,7 @@ class EpocHandler:
     # @param emoengineeventhandle handle, created by EE_EmoEngineEventCreate()
     # @return #EXPEVENT
     def EE_ExpressivEventGetType(self, emoengineeventhandle):
-        return self.EmotivEngineDLL.EE_ExpressivEventGetType(emoengineeventhandle)
+        return self._EE_ExpressivEventGetType(emoengineeventhandle)
     
     ## Get user ID.
     #
@@ -529,7 +1058,7 @@ class EpocHandler:
     # @return (#ERRCODE, userID)
     def EE_EmoEngineEventGetUserId(self, emoengineeventhandle):
         userid = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_EmoEngineEventGetUserId(emoengineeventhandle, ctypes.byref(userid))
+        code = self._EE_EmoEngineEventGetUserId(emoengineeventhandle, ctypes.byref(userid))
         returnid = userid.value
         del userid
         return (code, returnid)
@@ -541,7 +1070,7 @@ class EpocHandler:
     # @param emostatehandle handle, returned by EE_EmoStateCreate()
     # @return #ERRCODE    
     def EE_EmoEngineEventGetEmoState(self, emoengineeventhandle, emostatehandle):
-        return self.EmotivEngineDLL.EE_EmoEngineEventGetEmoState(emoengineeventhandle, emostatehandle)
+        return self._EE_EmoEngineEventGetEmoState(emoengineeventhandle, emostatehandle)
     
     ## Retrieves the next EmoEngine event.
     #
@@ -551,7 +1080,7 @@ class EpocHandler:
     # @param emoengineeventhandle handle created by EE_EmoEngineEventCreate()
     # @return #ERRCODE
     def EE_EngineGetNextEvent(self, emoengineeventhandle):
-        return self.EmotivEngineDLL.EE_EngineGetNextEvent(emoengineeventhandle)
+        return self._EE_EngineGetNextEvent(emoengineeventhandle)
     
     ## Clear EmoEngine event.
     #
@@ -562,7 +1091,7 @@ class EpocHandler:
     # @param eventtypes list, EmoEngine event types (#EVENT)
     # @return #ERRCODE
     def EE_EngineClearEventQueue(self, eventtypes):    
-        return self.EmotivEngineDLL.EE_EngineClearEventQueue(eventtypes)
+        return self._EE_EngineClearEventQueue(eventtypes)
     
     ## Get number of users.
     #
@@ -570,7 +1099,7 @@ class EpocHandler:
     # @return (#ERRCODE, numberofusers)
     def EE_EngineGetNumUser(self):
         numusers = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_EngineGetNumUser(ctypes.byref(numusers))
+        code = self._EE_EngineGetNumUser(ctypes.byref(numusers))
         returnnum = numusers.value
         del numusers
         return (code, returnnum)
@@ -583,21 +1112,85 @@ class EpocHandler:
     # @param playernum int, application assigned player number displayed on input device hardware (must be in the range 1-4)
     # @return #ERRCODE
     def EE_SetHardwarePlayerDisplay(self, userid, playernum):
-        return self.EmotivEngineDLL.EE_SetHardwarePlayerDisplay(userid, playernum)
+        return self._EE_SetHardwarePlayerDisplay(userid, playernum)
 
     ## Set User Profile.
     #
-    # Loads an EmoEngine profile for the specified user.
+    # Loads an EmoEngine profile for the specified user. The profile is passed to the engine as it is,
+    # NUL bytes included; bytes and writable buffers are not copied.
+    # @param userid int, User ID
+    # @param profilebuffer bytes, bytearray, memoryview, mmap or other buffer containing a serialized user profile previously returned from EmoEngine.
+    # @param length int, buffer size (number of bytes, default: the whole buffer)
+    # @return #ERRCODE
+    # @sa EpocHandler::set_user_profile()
+    def EE_SetUserProfile(self, userid, profilebuffer, length=None):
+        return self.set_user_profile(userid, profilebuffer, length)
+
+    ## Give a user a serialized profile without copying it.
+    #
+    # bytes objects are passed by pointer to their own storage; writable buffers (bytearray, mmap,
+    # array.array, numpy arrays) through a ctypes array over their memory. Read-only buffers of
+    # other types are copied once.
     # @param userid int, User ID
-    # @param profilebuffer pointer, to buffer containing a serialized user profile previously returned from EmoEngine.
-    # @param length int, buffer size (number of bytes)
-    # @todo Make it work!!  
-    def EE_SetUserProfile(self, userid, profilebuffer, length):
-        buffer = ctypes.create_string_buffer(length)
-        buffer.value = profilebuffer
-        code = self.EmotivEngineDLL.EE_SetUserProfile(userid, buffer, length)
+    # @param profile buffer, serialized user profile
+    # @param length int, number of bytes (default: the whole buffer)
+    # @return #ERRCODE
+    def set_user_profile(self, userid, profile, length=None):
+        if isinstance(profile, bytes):
+            if length is None:
+                length = len(profile)
+            return self._EE_SetUserProfile(userid, profile, length)
+        if length is None:
+            length = _BufferSize(profile)
+        try:
+            pointer = (ctypes.c_char * length).from_buffer(profile)
+        except TypeError:    # read-only
+            profile = memoryview(profile).tobytes()
+            return self._EE_SetUserProfile(userid, profile, min(length, len(profile)))
+        code = self._EE_SetUserProfile(userid, pointer, length)
+        del pointer
         return code
-        
+
+    ## Read a user's serialized profile without allocating.
+    #
+    # Runs EE_GetUserProfile(), EE_GetUserProfileSize() and EE_GetUserProfileBytes() on a profile event
+    # handle kept by the handler, and has the engine write the profile straight into the buffer.
+    # @param userid int, User ID
+    # @param buffer writable byte buffer to fill, e.g. a bytearray or an mmap (default: the handler's scratch buffer, grown as needed)
+    # @return (#ERRCODE, memoryview of the profile bytes), the view is None on errors
+    # @warning Without a buffer, the view shares the scratch buffer and is only valid until the next call;
+    # copy it with bytes() to keep it.
+    def get_user_profile(self, userid, buffer=None):
+        if self._profilehandle is None:
+            self._profilehandle = self._EE_ProfileEventCreate()
+        code = self._EE_GetUserProfile(userid, self._profilehandle)
+        if code != ERRCODE['EDK_OK']:
+            return (code, None)
+        sizeout = ctypes.c_uint()
+        code = self._EE_GetUserProfileSize(self._profilehandle, ctypes.byref(sizeout))
+        if code != ERRCODE['EDK_OK']:
+            return (code, None)
+        size = sizeout.value
+        if buffer is None:
+            buffer = self._ProfileScratch(size)
+        if _BufferSize(buffer) < size:
+            return (ERRCODE['EDK_BUFFER_TOO_SMALL'], None)
+        pointer = (ctypes.c_ubyte * size).from_buffer(buffer)
+        code = self._EE_GetUserProfileBytes(self._profilehandle, pointer, size)
+        if code != ERRCODE['EDK_OK']:
+            return (code, None)
+        try:
+            return (code, memoryview(buffer)[:size])
+        except TypeError:    # Python 2 mmap
+            return (code, memoryview(pointer))
+
+    ## \internal
+    # Scratch buffer of at least size bytes. Grows by replacement, so views of the old buffer stay valid.
+    def _ProfileScratch(self, size):
+        if len(self._profilescratch) < size:
+            self._profilescratch = bytearray(max(size, 2 * len(self._profilescratch)))
+        return self._profilescratch
+
 
     ## Get User Profile.
     #
@@ -607,7 +1200,7 @@ class EpocHandler:
     # @param emoengineeventhan handle,returned by EE_EmoEngineEventCreate()
     # @return #ERRCODE
     def EE_GetUserProfile(self, userid, emoengineeventhandle):
-        return self.EmotivEngineDLL.EE_GetUserProfile(userid, emoengineeventhandle)
+        return self._EE_GetUserProfile(userid, emoengineeventhandle)
     
     ## Get Base Profile.
     #
@@ -616,7 +1209,7 @@ class EpocHandler:
     # @param emoengineeventhandle handle, returned by EE_EmoEngineEventCreate()
     # @return #ERRCODE 
     def EE_GetBaseProfile(self, emoengineeventhandle):
-        return self.EmotivEngineDLL.EE_GetBaseProfile(emoengineeventhandle)
+        return self._EE_GetBaseProfile(emoengineeventhandle)
     
     ## Get User Profile Size.
     #
@@ -626,7 +1219,7 @@ class EpocHandler:
     # @todo figure out why it gives EDK_INVALID_PARAMETER
     def EE_GetUserProfileSize(self, emoengineeventhandle):        
         profilesizeout = ctypes.c_uint()
-        code = self.EmotivEngineDLL.EE_GetUserProfileSize(emoengineeventhandle, ctypes.byref(profilesizeout))
+        code = self._EE_GetUserProfileSize(emoengineeventhandle, ctypes.byref(profilesizeout))
         sizeinbytes = profilesizeout.value
         del profilesizeout
         return (code, int(sizeinbytes))
@@ -634,16 +1227,18 @@ class EpocHandler:
     ## Get User Profile Bytes.
     #
     # Returns a serialized version of the requested user profile.
-    # @param emoengineeventhandle handle, something something
+    # @param emoengineeventhandle handle, filled by EpocHandler::EE_GetUserProfile() or EpocHandler::EE_GetBaseProfile()
     # @param bufferlength int, size of buffer in bytes
-    # @todo make it work!!
-    # @sa EpocHandler::EE_GetUserProfileSize()
-    def EE_GetUserProfileBytes(self, emoengineeventhandle, bufferlength):
-        buffer = ctypes.create_string_buffer(bufferlength)        
-        code = self.EmotivEngineDLL.EE_GetUserProfileBytes(emoengineeventhandle, ctypes.byref(buffer), bufferlength)
-        returnbuffer = buffer.raw
-        del buffer
-        return (code, returnbuffer)
+    # @param buffer writable buffer of at least bufferlength bytes to fill in place (default: return a new bytes object)
+    # @return (#ERRCODE, bytes), or (#ERRCODE, buffer) if a buffer was given
+    # @sa EpocHandler::EE_GetUserProfileSize(), EpocHandler::get_user_profile()
+    def EE_GetUserProfileBytes(self, emoengineeventhandle, bufferlength, buffer=None):
+        target = buffer if buffer is not None else self._ProfileScratch(bufferlength)
+        pointer = (ctypes.c_char * bufferlength).from_buffer(target)
+        code = self._EE_GetUserProfileBytes(emoengineeventhandle, pointer, bufferlength)
+        if buffer is not None:
+            return (code, buffer)
+        return (code, pointer.raw)
     
     ## Load User Profile.
     #
@@ -653,7 +1248,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_SaveUserProfile()
     def EE_LoadUserProfile(self, userid, inputfilename):
-        return self.EmotivEngineDLL.EE_LoadUserProfile(userid, inputfilename)
+        return self._EE_LoadUserProfile(userid, _CString(inputfilename))
     
     ## Save User Profile.
     #
@@ -663,7 +1258,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_LoadUserProfile()
     def EE_SaveUserProfile(self, userid, outputfilename):
-        return self.EmotivEngineDLL.EE_SaveUserProfile(userid, outputfilename)
+        return self._EE_SaveUserProfile(userid, _CString(outputfilename))
     
     ## Set Expressiv Alghorithms Threshold.
     #
@@ -674,7 +1269,7 @@ class EpocHandler:
     # @param value int, threshold value (min: 0 max: 1000)
     # @return #ERRCODE 
     def EE_ExpressivSetThreshold(self, userid, expressivalgoname, thresholdname, value):
-        return self.EmotivEngineDLL.EE_ExpressivSetThreshold(userid, expressivalgoname, thresholdname, value)
+        return self._EE_ExpressivSetThreshold(userid, expressivalgoname, thresholdname, value)
     
     ## Get Expressiv Threshold.
     #
@@ -685,7 +1280,7 @@ class EpocHandler:
     # @return (#ERRCODE , int value)
     def EE_ExpressivGetThreshold(self, userid, expressivalgoname, thresholdname):
         valueout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_ExpressivGetThreshold(userid, expressivalgoname, thresholdname, ctypes.byref(valueout))
+        code = self._EE_ExpressivGetThreshold(userid, expressivalgoname, thresholdname, ctypes.byref(valueout))
         returnvalue = valueout.value
         del valueout
         return (code, returnvalue)
@@ -697,7 +1292,7 @@ class EpocHandler:
     # @param expressivalgoname #EXPRESSIVALGO
     # @return #ERRCODE
     def EE_ExpressivSetTrainingAction(self, userid, expressivalgoname):
-        return self.EmotivEngineDLL.EE_ExpressivSetTrainingAction(userid, expressivalgoname)
+        return self._EE_ExpressivSetTrainingAction(userid, expressivalgoname)
     
     ## Set Expressiv Training Control.
     #
@@ -706,7 +1301,7 @@ class EpocHandler:
     # @param control #EXPRTRAININGCONTROL
     # @return #ERRCODE - current status of EmoEngine. If the query is successful, returns EDK_OK.
     def EE_ExpressivSetTrainingControl(self, userid, control):
-        return self.EmotivEngineDLL.EE_ExpressivSetTrainingControl(userid, control)
+        return self._EE_ExpressivSetTrainingControl(userid, control)
     
     ## Get Expressiv Training Action.
     #
@@ -717,7 +1312,7 @@ class EpocHandler:
     # @todo check return value [1]
     def EE_ExpressivGetTrainingAction(self, userid):
         actionout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_ExpressivGetTrainingAction(userid, ctypes.byref(actionout))
+        code = self._EE_ExpressivGetTrainingAction(userid, ctypes.byref(actionout))
         returnaction = actionout.value
         del actionout
         return (code, returnaction)
@@ -729,7 +1324,7 @@ class EpocHandler:
     # @return (#ERRCODE, int time)
     def EE_ExpressivGetTrainingTime(self, userid):
         timeout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_ExpressivGetTrainingTime(userid, ctypes.byref(timeout))
+        code = self._EE_ExpressivGetTrainingTime(userid, ctypes.byref(timeout))
         returntime = timeout.value
         del timeout
         return (code, returntime)
@@ -742,7 +1337,7 @@ class EpocHandler:
     # @todo make it work!! figure out bitvector 
     def EE_ExpressivGetTrainedSignatureActions(self, userid):
         trainedactionsout = ctypes.c_ulong()
-        code = self.EmotivEngineDLL.EE_ExpressivGetTrainedSignatureActions(userid, ctypes.byref(trainedactionsout))
+        code = self._EE_ExpressivGetTrainedSignatureActions(userid, ctypes.byref(trainedactionsout))
         returntrainedactions = trainedactionsout.value
         del trainedactionsout
         return (code, returntrainedactions)
@@ -757,7 +1352,7 @@ class EpocHandler:
     # @see #EXPRESSIVALGO
     def EE_ExpressivGetTrainedSignatureAvailable(self, userid):
         availableout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_ExpressivGetTrainedSignatureAvailable(userid, ctypes.byref(availableout))
+        code = self._EE_ExpressivGetTrainedSignatureAvailable(userid, ctypes.byref(availableout))
         returnavailable = availableout.value
         del availableout
         return (code, returnavailable)
@@ -771,7 +1366,7 @@ class EpocHandler:
     # @param expsigtype #EXPRSIGNATURE
     # @return #ERRCODE
     def EE_ExpressivSetSignatureType(self, userid, expsigtype):
-        return self.EmotivEngineDLL.EE_ExpressivSetSignatureType(userid, expsigtype)
+        return self._EE_ExpressivSetSignatureType(userid, expsigtype)
     
     ## Get Expressiv Signature Type.
     #
@@ -783,7 +1378,7 @@ class EpocHandler:
     # @see #EXPRSIGNATURE
     def EE_ExpressivGetSignatureType(self, userid):
         sigtypeout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_ExpressivGetSignatureType(userid, ctypes.byref(sigtypeout))
+        code = self._EE_ExpressivGetSignatureType(userid, ctypes.byref(sigtypeout))
         returnsigtype = sigtypeout.value
         del sigtypeout
         return (code, returnsigtype)
@@ -792,11 +1387,11 @@ class EpocHandler:
     #
     # Set the current Cognitiv active action types.
     # @param userid int, User ID
-    # @param activeactions  bitvector, a bit vector composed of #COGACTION contants
-    # @todo Make it work! Find out what bitvectors are.
+    # @param activeactions int, bit vector of #COGACTION values, e.g. COGACTION['COG_PUSH'] | COGACTION['COG_LIFT']
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_CognitivGetActiveActions()
     def EE_CognitivSetActiveActions(self, userid, activeactions):
-        #return self.EmotivEngineDLL.EE_CognitivSetActiveActions(userid, activeactions)
-        pass
+        return self._EE_CognitivSetActiveActions(userid, activeactions)
     
     ## Get Cognitiv Active Actions
     #
@@ -808,7 +1403,7 @@ class EpocHandler:
     # @see #COGACTION
     def EE_CognitivGetActiveActions(self, userid):
         activeactionsout = ctypes.c_ulong()
-        code = self.EmotivEngineDLL.EE_CognitivGetActiveActions(userid, ctypes.byref(activeactionsout))
+        code = self._EE_CognitivGetActiveActions(userid, ctypes.byref(activeactionsout))
         returnactions = activeactionsout.value
         del activeactionsout
         return (code, returnactions)
@@ -821,7 +1416,7 @@ class EpocHandler:
     # @see #ERRCODE
     def EE_CognitivGetTrainingTime(self, userid):
         trainingtimeout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetTrainingTime(userid, ctypes.byref(trainingtimeout))
+        code = self._EE_CognitivGetTrainingTime(userid, ctypes.byref(trainingtimeout))
         returntrainingtime = trainingtimeout.value
         del trainingtimeout
         return (code, returntrainingtime)
@@ -833,7 +1428,7 @@ class EpocHandler:
     # @return  #ERRCODE
     # @see #COGTRAININGCONTROL
     def EE_CognitivSetTrainingControl(self, userid, trainingcontrol):
-        return self.EmotivEngineDLL.EE_CognitivSetTrainingControl(userid, trainingcontrol)
+        return self._EE_CognitivSetTrainingControl(userid, trainingcontrol)
     
     ## Set Cognitiv Training Action
     #
@@ -842,7 +1437,7 @@ class EpocHandler:
     # @param action int, #COGACTION
     # @return #ERRCODE
     def EE_CognitivSetTrainingAction(self, userid, action):
-        return self.EmotivEngineDLL.EE_CognitivSetTrainingAction(userid, action)
+        return self._EE_CognitivSetTrainingAction(userid, action)
     
     ## Get Cognitiv Training Action
     #
@@ -851,7 +1446,7 @@ class EpocHandler:
     # @return (#ERRCODE, #COGACTION)
     def EE_CognitivGetTrainingAction(self, userid):
         trainingactionout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetTrainingAction(userid, ctypes.byref(trainingactionout))
+        code = self._EE_CognitivGetTrainingAction(userid, ctypes.byref(trainingactionout))
         returntrainingaction = trainingactionout.value
         del trainingactionout
         return (code, returntrainingaction)
@@ -865,7 +1460,7 @@ class EpocHandler:
     # @test Test it!
     def EE_CognitivGetTrainedSignatureActions(self, userid):
         trainedactionsout = ctypes.c_ulong()
-        code = self.EmotivEngineDLL.EE_CognitivGetTrainedSignatureActions(userid, ctypes.byref(trainedactionsout))
+        code = self._EE_CognitivGetTrainedSignatureActions(userid, ctypes.byref(trainedactionsout))
         returntrainedactions = trainedactionsout.value
         del trainedactionsout
         return (code, returntrainedactions)
@@ -878,7 +1473,7 @@ class EpocHandler:
     # @note Representation error (0.70 in EmoComposer returned 0.69999998807907104)
     def EE_CognitivGetOverallSkillRating(self, userid):
         skillratingout = ctypes.c_float()
-        code = self.EmotivEngineDLL.EE_CognitivGetOverallSkillRating(userid, ctypes.byref(skillratingout))
+        code = self._EE_CognitivGetOverallSkillRating(userid, ctypes.byref(skillratingout))
         returnoverallskillrating = skillratingout.value
         del skillratingout
         return (code, returnoverallskillrating)
@@ -891,7 +1486,7 @@ class EpocHandler:
     # @return (#ERRCODE, float skillrating)
     def EE_CognitivGetActionSkillRating(self, userid, action):
         skillratingout = ctypes.c_float()
-        code = self.EmotivEngineDLL.EE_CognitivGetActionSkillRating(userid, action, ctypes.byref(skillratingout))
+        code = self._EE_CognitivGetActionSkillRating(userid, action, ctypes.byref(skillratingout))
         returnskillrating = skillratingout.value
         del skillratingout
         return (code, returnskillrating)
@@ -904,7 +1499,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_CognitivGetActivationLevel()
     def EE_CognitivSetActivationLevel(self, userid, level):
-        return self.EmotivEngineDLL.EE_CognitivSetActivationLevel(userid, level)
+        return self._EE_CognitivSetActivationLevel(userid, level)
     
     ## Set Cognitiv Action Sensitivity
     #
@@ -919,7 +1514,7 @@ class EpocHandler:
     # @todo Find out what this does.
     # @sa EpocHandler::EE_CognitivGetActionSensitivity()
     def EE_CognitivSetActionSensitivity(self, userid, action1sens, action2sens, action3sens, action4sens):
-        return self.EmotivEngineDLL.EE_CognitivSetActionSensitivity(userid, action1sens, action2sens, action3sens, action4sens)
+        return self._EE_CognitivSetActionSensitivity(userid, action1sens, action2sens, action3sens, action4sens)
     
     ## Get Cognitiv Activation Level
     #
@@ -929,7 +1524,7 @@ class EpocHandler:
     # @sa EpocHandler::EE_CognitivSetActivationLevel()
     def EE_CognitivGetActivationLevel(self, userid):
         levelout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetActivationLevel(userid, ctypes.byref(levelout))
+        code = self._EE_CognitivGetActivationLevel(userid, ctypes.byref(levelout))
         returnlevel = levelout.value
         del levelout
         return (code, returnlevel)
@@ -945,7 +1540,7 @@ class EpocHandler:
         action2sensout = ctypes.c_int()
         action3sensout = ctypes.c_int()
         action4sensout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetActionSensitivity(userid, ctypes.byref(action1sensout), ctypes.byref(action2sensout), ctypes.byref(action3sensout), ctypes.byref(action4sensout))
+        code = self._EE_CognitivGetActionSensitivity(userid, ctypes.byref(action1sensout), ctypes.byref(action2sensout), ctypes.byref(action3sensout), ctypes.byref(action4sensout))
         action1sens = action1sensout.value
         action2sens = action2sensout.value
         action3sens = action3sensout.value
@@ -960,7 +1555,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_CognitivStopSamplingNeutral()
     def EE_CognitivStartSamplingNeutral(self, userid):
-        return self.EmotivEngineDLL.EE_CognitivStartSamplingNeutral(userid)
+        return self._EE_CognitivStartSamplingNeutral(userid)
     
     ## Stop Sampling Cognitiv Neutral
     #
@@ -969,7 +1564,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_CognitivStartSamplingNeutral()
     def EE_CognitivStopSamplingNeutral(self, userid):
-        return self.EmotivEngineDLL.EE_CognitivStopSamplingNeutral(userid)
+        return self._EE_CognitivStopSamplingNeutral(userid)
     
     ## Set Cognitiv Signature Caching
     #
@@ -979,7 +1574,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_CognitivGetSignatureCaching()
     def EE_CognitivSetSignatureCaching(self, userid, enable):
-        return self.EmotivEngineDLL.EE_CognitivSetSignatureCaching(userid, enable)
+        return self._EE_CognitivSetSignatureCaching(userid, enable)
     
     ## Get Cognitiv Signature Caching
     #
@@ -989,7 +1584,7 @@ class EpocHandler:
     # @sa EpocHandler::EE_CognitivSetSignatureCaching()
     def EE_CognitivGetSignatureCaching(self, userid):
         flag = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetSignatureCaching(userid, ctypes.byref(flag))
+        code = self._EE_CognitivGetSignatureCaching(userid, ctypes.byref(flag))
         returnflag = flag.value
         del flag
         return (code, returnflag)
@@ -1002,7 +1597,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_CognitivGetSignatureCacheSize()
     def EE_CognitivSetSignatureCacheSize(self, userid, size):
-        return self.EmotivEngineDLL.EE_CognitivSetSignatureCacheSize(userid, size)
+        return self._EE_CognitivSetSignatureCacheSize(userid, size)
     
     ## Get Cognitiv Signature Cache Size
     #
@@ -1012,7 +1607,7 @@ class EpocHandler:
     # @sa EpocHandler::EE_CognitivSetSignatureCacheSize()
     def EE_CognitivGetSignatureCacheSize(self, userid):
         sizeout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_CognitivGetSignatureCacheSize(userid, ctypes.byref(sizeout))
+        code = self._EE_CognitivGetSignatureCacheSize(userid, ctypes.byref(sizeout))
         returnsize = sizeout.value
         del sizeout
         return (code, returnsize)
@@ -1025,9 +1620,39 @@ class EpocHandler:
     # @sa http://docs.python.org/library/ctypes.html#structured-data-types
     def EE_HeadsetGetSensorDetails(self, channelid):
         inputsensordescriptor = InputSensorDescriptor()
-        code = self.EmotivEngineDLL.EE_HeadsetGetSensorDetails(channelid, ctypes.byref(inputsensordescriptor))
+        code = self._EE_HeadsetGetSensorDetails(channelid, ctypes.byref(inputsensordescriptor))
         return (code, inputsensordescriptor)
     
+    ## Get Sensor Montage
+    #
+    # Returns the geometry of every #INPUTCHANNELS sensor as a SensorMontage. The table is read from
+    # EE_HeadsetGetSensorDetails() the first time a hardware version is seen and cached for every
+    # handler; later calls cost one EE_HardwareGetVersion() call. Keep the returned object for
+    # per-channel lookups.
+    # @param userid int, user whose headset to describe
+    # @return SensorMontage
+    # @sa EpocHandler::EE_HeadsetGetSensorDetails()
+    def sensor_montage(self, userid=0):
+        version = ctypes.c_ulong()
+        if self._EE_HardwareGetVersion(userid, ctypes.byref(version)) == ERRCODE['EDK_OK']:
+            version = version.value
+        else:
+            version = None
+        montage = _sensormontages.get(version)
+        if montage is None:
+            sensors = []
+            descriptor = InputSensorDescriptor()
+            for channel in sorted(INPUTCHANNELS.values()):
+                if self._EE_HeadsetGetSensorDetails(channel, ctypes.byref(descriptor)) == ERRCODE['EDK_OK']:
+                    label = descriptor.Label or b""
+                    if not isinstance(label, str):
+                        label = label.decode("ascii", "replace")
+                    sensors.append((descriptor.ChannelId, descriptor.Exist, label, descriptor.xLoc, descriptor.yLoc, descriptor.zLoc))
+            montage = SensorMontage(version, sensors)
+            if version is not None:
+                _sensormontages[version] = montage
+        return montage
+
     ## Get Emotiv hardware versions.
     #
     # This returns the Emotiv hardware version numbers (as hex)
@@ -1036,7 +1661,7 @@ class EpocHandler:
     # @todo Get rid if the "invalid literal for int() with base 10" error that occurs when trying to int() the versions.
     def EE_HardwareGetVersion(self, userid):
         versionout = ctypes.c_ulong()
-        code = self.EmotivEngineDLL.EE_HardwareGetVersion(userid, ctypes.byref(versionout))
+        code = self._EE_HardwareGetVersion(userid, ctypes.byref(versionout))
         version = hex(versionout.value)
         # Get hibyte and lowbyte version numbers
         version = str(version).replace("0x", "0").strip("L")
@@ -1056,7 +1681,7 @@ class EpocHandler:
         versionout = ctypes.create_string_buffer(16)
         versionchars = ctypes.sizeof(versionout)
         buildnrout = ctypes.c_ulong()
-        code = self.EmotivEngineDLL.EE_SoftwareGetVersion(ctypes.byref(versionout), versionchars, ctypes.byref(buildnrout))
+        code = self._EE_SoftwareGetVersion(ctypes.byref(versionout), versionchars, ctypes.byref(buildnrout))
         returnversion = versionout.value
         returnbuildnr = buildnrout.value
         del versionout, buildnrout
@@ -1071,7 +1696,7 @@ class EpocHandler:
     def EE_HeadsetGetGyroDelta(self, userid):
         xposout = ctypes.c_int()
         yposout = ctypes.c_int()
-        code = self.EmotivEngineDLL.EE_HeadsetGetGyroDelta(userid, ctypes.byref(xposout), ctypes.byref(yposout))
+        code = self._EE_HeadsetGetGyroDelta(userid, ctypes.byref(xposout), ctypes.byref(yposout))
         returnxpos = xposout.value
         returnypos = yposout.value
         del xposout , yposout
@@ -1084,7 +1709,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @sa EpocHandler::EE_HeadsetGetGyroDelta() 
     def EE_HeadsetGyroRezero(self, userid):
-        code = self.EmotivEngineDLL.EE_HeadsetGyroRezero(userid)
+        code = self._EE_HeadsetGyroRezero(userid)
         return code
     
     ## Create Optimization Parameter Handle
@@ -1093,14 +1718,14 @@ class EpocHandler:
     # @return optparam handle, Optimization parameter handle
     # @sa EpocHandler::EE_OptimizationParamFree()
     def EE_OptimizationParamCreate(self):
-        return self.EmotivEngineDLL.EE_OptimizationParamCreate()
+        return self._EE_OptimizationParamCreate()
     
     ## Free Optimization Parameter Handle
     #
     # Frees memory referenced by an optimization parameter handle.
     # @param optparamhandle handle, Handle created by EpocHandler::EE_OptimizationParamCreate()
     def EE_OptimizationParamFree(self, optimizationparamhandle):
-        self.EmotivEngineDLL.EE_OptimizationParamFree(optimizationparamhandle)
+        self._EE_OptimizationParamFree(optimizationparamhandle)
     
     ## Enable Optimization
     #
@@ -1110,7 +1735,7 @@ class EpocHandler:
     # @param optparamhandle handle, Handle created by EpocHandler::EE_OptimizationParamCreate()
     # @return #ERRCODE
     def EE_OptimizationEnable(self, optimizationparamhandle):
-        code = self.EmotivEngineDLL.EE_OptimizationEnable(optimizationparamhandle)
+        code = self._EE_OptimizationEnable(optimizationparamhandle)
         return code
     
     ## Is Optimization Enabled
@@ -1120,7 +1745,7 @@ class EpocHandler:
     # @todo check that it can become True
     def EE_OptimizationIsEnabled(self):        
         enabledout = ctypes.c_bool()
-        code = self.EmotivEngineDLL.EE_OptimizationIsEnabled(ctypes.byref(enabledout))
+        code = self._EE_OptimizationIsEnabled(ctypes.byref(enabledout))
         returnenabled = enabledout.value
         del enabledout
         return (code, returnenabled)
@@ -1130,7 +1755,7 @@ class EpocHandler:
     # Disable optimization.
     # @return #ERRCODE
     def EE_OptimizationDisable(self):
-        return self.EmotivEngineDLL.EE_OptimizationDisable()
+        return self._EE_OptimizationDisable()
     
     ## Get Optimization Parameter
     #
@@ -1139,7 +1764,7 @@ class EpocHandler:
     # @param optparamhandle handle, Handle returned by EpocHandler::EE_OptimizationParamCreate()
     # @return #ERRCODE
     def EE_OptimizationGetParam(self, optimizationparamhandle):
-        return self.EmotivEngineDLL.EE_OptimizationGetParam(optimizationparamhandle)
+        return self._EE_OptimizationGetParam(optimizationparamhandle)
     
     ## Get Vital Optimization Algorithm
     #
@@ -1150,7 +1775,7 @@ class EpocHandler:
     # @todo make sure it works!!
     def EE_OptimizationGetVitalAlgorithm(self, optimizationparamhandle, suite):        
         alghorithbitvectorout = ctypes.c_uint()
-        code = self.EmotivEngineDLL.EE_OptimizationGetVitalAlgorithm(optimizationparamhandle, suite, ctypes.byref(alghorithbitvectorout))
+        code = self._EE_OptimizationGetVitalAlgorithm(optimizationparamhandle, suite, ctypes.byref(alghorithbitvectorout))
         returnalgbitvector = alghorithbitvectorout.value
         del alghorithbitvectorout
         return (code, returnalgbitvector)
@@ -1164,7 +1789,7 @@ class EpocHandler:
     # @return #ERRCODE
     # @todo make sure it works!!
     def EE_OptimizationSetVitalAlgorithm(self, optimizationparamhandle, suite, algbitvector):        
-        code = self.EmotivEngineDLL.EE_OptimizationSetVitalAlgorithm(optimizationparamhandle, suite, algbitvector)
+        code = self._EE_OptimizationSetVitalAlgorithm(optimizationparamhandle, suite, algbitvector)
         return code
     
     ## Reset Detection
@@ -1176,9 +1801,143 @@ class EpocHandler:
     # @return #ERRCODE
     # @todo make sure it works!!
     def EE_ResetDetection(self, userid, suite, detectionbitvector):
-        code = self.EmotivEngineDLL.EE_ResetDetection(userid, suite, detectionbitvector)
+        code = self._EE_ResetDetection(userid, suite, detectionbitvector)
         return code
     
+    ##################################[ EEG Data ]########################################
+    # Raw EEG acquisition (research SDK). Enable acquisition for a user, then call
+    # EE_DataUpdateHandle() periodically; each update moves the samples received since the
+    # previous one into the data handle. The engine keeps EE_DataSetBufferSizeInSec() seconds.
+    ######################################################################################
+
+    ## Create Data Handle
+    #
+    # @return data handle
+    # @sa EpocHandler::EE_DataFree()
+    def EE_DataCreate(self):
+        return self._EE_DataCreate()
+
+    ## Free Data Handle
+    #
+    # @param datahandle handle, created by EpocHandler::EE_DataCreate()
+    def EE_DataFree(self, datahandle):
+        self._EE_DataFree(datahandle)
+
+    ## Update Data Handle
+    #
+    # Moves the samples the engine received for a user since the previous update into the data handle.
+    # @param userid int, user ID
+    # @param datahandle handle, created by EpocHandler::EE_DataCreate()
+    # @return #ERRCODE
+    def EE_DataUpdateHandle(self, userid, datahandle):
+        return self._EE_DataUpdateHandle(userid, datahandle)
+
+    ## Get Number Of Samples
+    #
+    # @param datahandle handle, updated by EpocHandler::EE_DataUpdateHandle()
+    # @return (#ERRCODE, samples)
+    def EE_DataGetNumberOfSample(self, datahandle):
+        samplesout = ctypes.c_uint()
+        code = self._EE_DataGetNumberOfSample(datahandle, ctypes.byref(samplesout))
+        return (code, samplesout.value)
+
+    ## Get Channel Data
+    #
+    # Copies the samples of one channel out of the data handle.
+    # @param datahandle handle, updated by EpocHandler::EE_DataUpdateHandle()
+    # @param channel int, #DATACHANNEL
+    # @param buffersizeinsample int, number of samples to copy, normally from EpocHandler::EE_DataGetNumberOfSample()
+    # @return (#ERRCODE, array.array of double)
+    # @sa EpocHandler::data_get() copies several channels without allocating
+    def EE_DataGet(self, datahandle, channel, buffersizeinsample):
+        samples = array.array('d', [0.0]) * buffersizeinsample
+        samplesc = (ctypes.c_double * buffersizeinsample).from_buffer(samples)
+        code = self._EE_DataGet(datahandle, channel, samplesc, buffersizeinsample)
+        del samplesc
+        return (code, samples)
+
+    ## Copy several channels into one buffer.
+    #
+    # Fills a caller-provided contiguous double buffer row by row: row i holds the samples of
+    # channels[i], rows are stride doubles apart. EE_DataGet() writes straight into the buffer, so no
+    # Python object is created per sample; with a numpy.float64 buffer of shape (channels, stride) the
+    # result is already in place. When more samples are waiting than fit in a row, the first stride
+    # samples are copied.
+    # @param datahandle handle, updated by EpocHandler::EE_DataUpdateHandle()
+    # @param channels sequence of #DATACHANNEL
+    # @param buffer writable buffer of at least len(channels) * stride doubles, e.g. array.array('d') or a numpy.float64 array
+    # @param stride int, doubles per row (default: the number of samples waiting)
+    # @return (#ERRCODE, samples copied per channel)
+    # @exception ValueError the buffer is too small
+    # @sa PyEpocData::EEGAcquisition keeps the buffer and the row pointers between updates
+    def data_get(self, datahandle, channels, buffer, stride=None):
+        samplesout = ctypes.c_uint()
+        code = self._EE_DataGetNumberOfSample(datahandle, ctypes.byref(samplesout))
+        if code != ERRCODE['EDK_OK']:
+            return (code, 0)
+        count = samplesout.value
+        if stride is None:
+            stride = count
+        count = min(count, stride)
+        if _BufferSize(buffer) < stride * len(channels) * ctypes.sizeof(ctypes.c_double):
+            raise ValueError("buffer holds less than %d x %d doubles" % (len(channels), stride))
+        rowtype, rowbytes = ctypes.c_double * stride, stride * ctypes.sizeof(ctypes.c_double)
+        for row, channel in enumerate(channels):
+            code = self._EE_DataGet(datahandle, channel, rowtype.from_buffer(buffer, row * rowbytes), count)
+            if code != ERRCODE['EDK_OK']:
+                break
+        return (code, count)
+
+    ## Set Data Buffer Size
+    #
+    # @param seconds float, samples the engine keeps between updates, in seconds
+    # @return #ERRCODE
+    def EE_DataSetBufferSizeInSec(self, seconds):
+        return self._EE_DataSetBufferSizeInSec(seconds)
+
+    ## Get Data Buffer Size
+    #
+    # @return (#ERRCODE, seconds)
+    def EE_DataGetBufferSizeInSec(self):
+        secondsout = ctypes.c_float()
+        code = self._EE_DataGetBufferSizeInSec(ctypes.byref(secondsout))
+        return (code, secondsout.value)
+
+    ## Enable Data Acquisition
+    #
+    # @param userid int, user ID
+    # @param enable bool
+    # @return #ERRCODE
+    def EE_DataAcquisitionEnable(self, userid, enable):
+        return self._EE_DataAcquisitionEnable(userid, enable)
+
+    ## Is Data Acquisition Enabled
+    #
+    # @param userid int, user ID
+    # @return (#ERRCODE, enabled)
+    def EE_DataAcquisitionIsEnabled(self, userid):
+        enabledout = ctypes.c_bool()
+        code = self._EE_DataAcquisitionIsEnabled(userid, ctypes.byref(enabledout))
+        return (code, enabledout.value)
+
+    ## Get Sampling Rate
+    #
+    # @param userid int, user ID
+    # @return (#ERRCODE, samples per second)
+    def EE_DataGetSamplingRate(self, userid):
+        rateout = ctypes.c_uint()
+        code = self._EE_DataGetSamplingRate(userid, ctypes.byref(rateout))
+        return (code, rateout.value)
+
+    ## Set Marker
+    #
+    # Marks the next sample of a user in the #DATACHANNEL ED_MARKER channel.
+    # @param userid int, user ID
+    # @param marker int, marker value
+    # @return #ERRCODE
+    def EE_DataSetMarker(self, userid, marker):
+        return self._EE_DataSetMarker(userid, marker)
+
     ##################################[ EmoState ]########################################
     # EmoStates are generated by the Emotiv detection engine (EmoEngine) and
     # represent the emotional status of the user at a given time.
@@ -1196,7 +1955,7 @@ class EpocHandler:
     # @sa EpocHandler::EE_EmoStateCreate()
     # @bug It will start returning "nan"
     def ES_GetTimeFromStart(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_GetTimeFromStart(emostatehandle)
+        return self._ES_GetTimeFromStart(emostatehandle)
     
     ## Get Headset On/Off
     #
@@ -1206,7 +1965,7 @@ class EpocHandler:
     # @return 1/0 (on or off)
     # @sa EpocHandler::EE_EmoStateCreate()
     def ES_GetHeadsetOn(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_GetHeadsetOn(emostatehandle)
+        return self._ES_GetHeadsetOn(emostatehandle)
     
     ## Get Number Of Channels With Contact Quality Data
     #
@@ -1215,7 +1974,7 @@ class EpocHandler:
     # @return int, number of channels with contact quality data available.
     # @sa EpocHandler::EE_EmoStateCreate()
     def ES_GetNumContactQualityChannels(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_GetNumContactQualityChannels(emostatehandle)
+        return self._ES_GetNumContactQualityChannels(emostatehandle)
     
     ## Get Contact Quality
     #
@@ -1224,15 +1983,31 @@ class EpocHandler:
     # @param sensorid int, id of the sensor to check
     # @return #CONTACTQUALITY
     def ES_GetContactQuality(self, emostatehandle, sensorid):
-        return self.EmotivEngineDLL.ES_GetContactQuality(emostatehandle, sensorid)
+        return self._ES_GetContactQuality(emostatehandle, sensorid)
     
     ## Get Contact Quality From All Channels
     #
     # Query the contact quality of all the electrodes in one single call.
     # @note The contact quality will be stored in the array, contactQuality, passed to the function. The value stored in contactQuality[0] is identical to the result returned by ES_GetContactQuality(state, 0) The value stored in contactQuality[1] is identical to the result returned by ES_GetContactQuality(state, 1). etc. The ordering of the array is consistent with the ordering of the logical input channels in PyEpoc::INPUTCHANNELS .
-    # @todo Make it work!
-    def ES_GetContactQualityFromAllChannels(self, emostatehandle):
-        pass
+    # @param emostatehandle
+    # @param contactquality writable int buffer to fill, e.g. array.array('i') or a numpy.intc array (default: a buffer owned by the handler, one entry per #INPUTCHANNELS)
+    # @return memoryview of int, one #CONTACTQUALITY per channel with data; numpy.frombuffer() views it without copying
+    # (Python 2: a list, as its memoryview cannot view array.array)
+    # @warning The default buffer is overwritten by the next call.
+    # @exception TypeError contactquality is not a buffer of native C int
+    # @sa PyEpocRecord::ContactQualityHistory
+    def ES_GetContactQualityFromAllChannels(self, emostatehandle, contactquality=None):
+        if contactquality is None:
+            contactquality, channels = self._contactquality, self._contactqualityc
+        else:
+            itemformat, itemsize = _BufferFormat(contactquality)
+            if itemsize != ctypes.sizeof(ctypes.c_int) or itemformat.lstrip('@=<') not in ('i', 'l'):
+                raise TypeError("contact quality buffer must hold C int, not format %r of %d bytes" % (itemformat, itemsize))
+            channels = (ctypes.c_int * (_BufferSize(contactquality) // itemsize)).from_buffer(contactquality)
+        count = self._ES_GetContactQualityFromAllChannels(emostatehandle, channels, len(channels))
+        if _oldbuffer is not None:
+            return channels[:count]
+        return memoryview(contactquality)[:count]
     
     ## Expression Blinking
     #
@@ -1241,7 +2016,7 @@ class EpocHandler:
     # @return 1/0 (blink/no blink)
     # @sa EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsEyesOpen()
     def ES_ExpressivIsBlink(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsBlink(emostatehandle)
+        return self._ES_ExpressivIsBlink(emostatehandle)
     
     ## Expression Left Winking
     #
@@ -1250,7 +2025,7 @@ class EpocHandler:
     # @return 1/0 (left wink/no left wink)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsEyesOpen() , EpocHandler::ES_ExpressivIsBlink()
     def ES_ExpressivIsLeftWink(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsLeftWink(emostatehandle)
+        return self._ES_ExpressivIsLeftWink(emostatehandle)
     
     ## Expression Right Winking
     #
@@ -1259,7 +2034,7 @@ class EpocHandler:
     # @return 1/0 (right wink/no right wink)
     # @sa EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink() , EpocHandler::ES_ExpressivIsEyesOpen()
     def ES_ExpressivIsRightWink(self, emostatehandle):        
-        return self.EmotivEngineDLL.ES_ExpressivIsRightWink(emostatehandle)
+        return self._ES_ExpressivIsRightWink(emostatehandle)
     
     ## Expression Eyes Open
     #
@@ -1268,7 +2043,7 @@ class EpocHandler:
     # @return 1/0 (eyes open/closed)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink()
     def ES_ExpressivIsEyesOpen(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsEyesOpen(emostatehandle)
+        return self._ES_ExpressivIsEyesOpen(emostatehandle)
     
     ## Expression Looking Up
     #
@@ -1277,7 +2052,7 @@ class EpocHandler:
     # @return 1/0 (looking up/not looking up)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink() , EpocHandler::ES_ExpressivIsEyesOpen()
     def ES_ExpressivIsLookingUp(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsLookingUp(emostatehandle)
+        return self._ES_ExpressivIsLookingUp(emostatehandle)
     
     ## Expression Looking Down
     #
@@ -1286,7 +2061,7 @@ class EpocHandler:
     # @return 1/0 (looking down/not looking down)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink() , EpocHandler::ES_ExpressivIsEyesOpen() , EpocHandler::ES_ExpressivIsLookingUp()
     def ES_ExpressivIsLookingDown(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsLookingDown(emostatehandle)
+        return self._ES_ExpressivIsLookingDown(emostatehandle)
     
     ## Expression Looking Left
     #
@@ -1295,7 +2070,7 @@ class EpocHandler:
     # @return 1/0 (looking left/not looking left)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink() , EpocHandler::ES_ExpressivIsEyesOpen() , EpocHandler::ES_ExpressivIsLookingUp() , EpocHandler::ES_ExpressivIsLookingDown()
     def ES_ExpressivIsLookingLeft(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsLookingLeft(emostatehandle)
+        return self._ES_ExpressivIsLookingLeft(emostatehandle)
     
     ## Expression Looking Right
     #
@@ -1304,7 +2079,7 @@ class EpocHandler:
     # @return 1/0 (looking right/not looking right)
     # @sa EpocHandler::ES_ExpressivIsRightWink() , EpocHandler::ES_ExpressivIsLeftWink() , EpocHandler::ES_ExpressivIsBlink() , EpocHandler::ES_ExpressivIsEyesOpen() , EpocHandler::ES_ExpressivIsLookingUp() , EpocHandler::ES_ExpressivIsLookingDown() , EpocHandler::ES_ExpressivIsLookingLeft()
     def ES_ExpressivIsLookingRight(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivIsLookingRight(emostatehandle)
+        return self._ES_ExpressivIsLookingRight(emostatehandle)
     
     ## Get Eyelid State
     #
@@ -1316,7 +2091,7 @@ class EpocHandler:
     def ES_ExpressivGetEyelidState(self, emostatehandle):
         lefteye = ctypes.c_float()
         righteye = ctypes.c_float()
-        self.EmotivEngineDLL.ES_ExpressivGetEyelidState(emostatehandle, ctypes.byref(lefteye), ctypes.byref(righteye))
+        self._ES_ExpressivGetEyelidState(emostatehandle, ctypes.byref(lefteye), ctypes.byref(righteye))
         lefteyereturn , righteyereturn = lefteye.value , righteye.value
         del lefteye, righteye
         return (lefteyereturn, righteyereturn)
@@ -1334,7 +2109,7 @@ class EpocHandler:
     def ES_ExpressivGetEyeLocation(self, emostatehandle):
         x = ctypes.c_float()
         y = ctypes.c_float()
-        self.EmotivEngineDLL.ES_ExpressivGetEyeLocation(emostatehandle, ctypes.byref(x), ctypes.byref(y))
+        self._ES_ExpressivGetEyeLocation(emostatehandle, ctypes.byref(x), ctypes.byref(y))
         xreturn , yreturn = x.value , y.value
         del x, y
         return (xreturn, yreturn)
@@ -1346,7 +2121,7 @@ class EpocHandler:
     # @return extent float, eyebrow extent value (0.0 to 1.0)  
     # @sa EpocHandler::ES_ExpressivGetUpperFaceAction(), EpocHandler::ES_ExpressivGetUpperFaceActionPower()
     def ES_ExpressivGetEyebrowExtent(self,emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetEyebrowExtent(emostatehandle)
+        return self._ES_ExpressivGetEyebrowExtent(emostatehandle)
     
     ## Get Smile Extent
     #
@@ -1355,7 +2130,7 @@ class EpocHandler:
     # @return extent float, smile extent value (0.0 to 1.0)
     # @sa EpocHandler::ES_ExpressivGetUpperFaceAction(), EpocHandler::ES_ExpressivGetUpperFaceActionPower()
     def ES_ExpressivGetSmileExtent(self,emostatehandle):
-        return self.EmotivEngineDLL(emostatehandle)
+        return self._ES_ExpressivGetSmileExtent(emostatehandle)
     
     ## Get Clench Extent
     #
@@ -1364,7 +2139,7 @@ class EpocHandler:
     # @return extent float, clench extent value (0.0 to 1.0)
     # @sa EpocHandler::ES_ExpressivGetUpperFaceAction(), EpocHandler::ES_ExpressivGetUpperFaceActionPower()
     def ES_ExpressivGetClenchExtent(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetClenchExtent(emostatehandle)
+        return self._ES_ExpressivGetClenchExtent(emostatehandle)
 
     ## Get Upper Face Action
     #
@@ -1373,7 +2148,7 @@ class EpocHandler:
     # @return #EXPRESSIVALGO
     # @sa EpocHandler::ES_ExpressivGetUpperFaceActionPower()
     def ES_ExpressivGetUpperFaceAction(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetUpperFaceAction(emostatehandle)
+        return self._ES_ExpressivGetUpperFaceAction(emostatehandle)
     
     ## Get Upper Face Action Power
     #
@@ -1382,7 +2157,7 @@ class EpocHandler:
     # @return power float, power of the action (0.0 to 1.0)
     # @sa EpocHandler::ES_ExpressivGetUpperFaceAction()
     def ES_ExpressivGetUpperFaceActionPower(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetUpperFaceActionPower(emostatehandle)
+        return self._ES_ExpressivGetUpperFaceActionPower(emostatehandle)
     
     ## Get Lower Face Action
     #
@@ -1391,7 +2166,7 @@ class EpocHandler:
     # @return #EXPRESSIVALGO
     # @sa EpocHandler::ES_ExpressivGetLowerFaceActionPower() , EpocHandler::ES_ExpressivGetUpperFaceAction()
     def ES_ExpressivGetLowerFaceAction(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetLowerFaceAction(emostatehandle)
+        return self._ES_ExpressivGetLowerFaceAction(emostatehandle)
     
     ## Get Lower Face Action Power
     #
@@ -1400,7 +2175,7 @@ class EpocHandler:
     # @return power float, action power (0.0 to 1.0)
     # @sa EpocHandler::ES_ExpressivGetLowerFaceAction()
     def ES_ExpressivGetLowerFaceActionPower(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_ExpressivGetLowerFaceActionPower(emostatehandle)
+        return self._ES_ExpressivGetLowerFaceActionPower(emostatehandle)
     
     ## Is Expressiv Active
     #
@@ -1409,7 +2184,7 @@ class EpocHandler:
     # @param #EXPRESSIVALGO , expression type
     # @return 1/0, (active / not active)
     def ES_ExpressivIsActive(self, emostatehandle, type):
-        return self.EmotivEngineDLL.ES_ExpressivIsActive(emostatehandle, type)
+        return self._ES_ExpressivIsActive(emostatehandle, type)
     
     ## Get Long Term Affectiv Excitement Score
     #
@@ -1418,7 +2193,7 @@ class EpocHandler:
     # @return score float, (0.0 to 1.0)
     # @sa EpocHandler::ES_AffectivGetExcitementShortTermScore()
     def ES_AffectivGetExcitementLongTermScore(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_AffectivGetExcitementLongTermScore(emostatehandle)
+        return self._ES_AffectivGetExcitementLongTermScore(emostatehandle)
     
     ## Get Short Term Affectiv Excitement Score
     #
@@ -1427,9 +2202,7 @@ class EpocHandler:
     # @return score float, (0.0 to 1.0)
     # @sa EpocHandler::ES_AffectivGetExcitementLongTermScore()
     def ES_AffectivGetExcitementShortTermScore(self, emostatehandle):
-        score = ctypes.c_float
-        score.value = self.EmotivEngineDLL.ES_AffectivGetExcitementShortTermScore(emostatehandle)
-        return score.value
+        return self._ES_AffectivGetExcitementShortTermScore(emostatehandle)
     
     ## Is Affectiv Active
     #
@@ -1438,7 +2211,7 @@ class EpocHandler:
     # @param #AFFECTIVALGO , affectiv type
     # @return 1/0, (active / not active)
     def ES_AffectivIsActive(self, emostatehandle, type):
-        return self.EmotivEngineDLL.ES_AffectivIsActive(emostatehandle, type)
+        return self._ES_AffectivIsActive(emostatehandle, type)
     
     ## Get Affectiv Meditation Score
     #
@@ -1446,7 +2219,7 @@ class EpocHandler:
     # @param emostatehandle
     # @return score float, (0.0 to 1.0)
     def ES_AffectivGetMeditationScore(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_AffectivGetMeditationScore(emostatehandle)
+        return self._ES_AffectivGetMeditationScore(emostatehandle)
     
     ## Get Affectiv Frustration Score
     #
@@ -1454,7 +2227,7 @@ class EpocHandler:
     # @param emostatehandle
     # @return score float, (0.0 to 1.0) 
     def ES_AffectivGetFrustrationScore(self,emostatehandle):
-        return self.EmotivEngineDLL.ES_AffectivGetFrustrationScore(emostatehandle)
+        return self._ES_AffectivGetFrustrationScore(emostatehandle)
     
     ## Get Affectiv Engagement/Boredom Score
     #
@@ -1462,7 +2235,7 @@ class EpocHandler:
     # @param emostatehandle
     # @return score float, (0.0 to 1.0) 
     def ES_AffectivGetEngagementBoredomScore(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_AffectivGetEngagementBoredomScore(emostatehandle)
+        return self._ES_AffectivGetEngagementBoredomScore(emostatehandle)
     
     ## Get Current Cognitiv Action
     #
@@ -1471,7 +2244,7 @@ class EpocHandler:
     # @return type , #COGACTION
     # @sa EpocHandler::ES_CognitivGetCurrentActionPower()
     def ES_CognitivGetCurrentAction(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_CognitivGetCurrentAction(emostatehandle)
+        return self._ES_CognitivGetCurrentAction(emostatehandle)
     
     ## Get Current Cognitiv Action Power
     #
@@ -1480,7 +2253,7 @@ class EpocHandler:
     # @return value float, (0.0 to 1.0)
     # @sa EpocHandler::ES_CognitivGetCurrentAction()
     def ES_CognitivGetCurrentActionPower(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_CognitivGetCurrentActionPower(emostatehandle)
+        return self._ES_CognitivGetCurrentActionPower(emostatehandle)
     
     ## Is Cognitiv Active
     #
@@ -1488,7 +2261,7 @@ class EpocHandler:
     # @param emostatehandle 
     # @param 1/0 , (active / not active) 
     def ES_CognitivIsActive(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_CognitivIsActive(emostatehandle)
+        return self._ES_CognitivIsActive(emostatehandle)
     
     ## Get Wireless Signal Status
     #
@@ -1496,7 +2269,7 @@ class EpocHandler:
     # @param emostatehandle
     # @return signalstrength, #SIGNALSTRENGTH
     def ES_GetWirelessSignalStatus(self, emostatehandle):
-        return self.EmotivEngineDLL.ES_GetWirelessSignalStatus(emostatehandle)
+        return self._ES_GetWirelessSignalStatus(emostatehandle)
     
     ## Clone EmoStateHandle
     #
@@ -1505,7 +2278,7 @@ class EpocHandler:
     # @param srcemostatehandle handle , Source EmoState handle
     # @sa EpocHandler::EE_EmoStateCreate()
     def ES_Copy(self, destemostatehandle, srcemostatehandle): 
-        self.EmotivEngineDLL.ES_Copy(destemostatehandle, srcemostatehandle)
+        self._ES_Copy(destemostatehandle, srcemostatehandle)
         return
     
     ## Is Affectiv EmoStates Equal
@@ -1516,7 +2289,7 @@ class EpocHandler:
     # @return 1/0 , (equal / no equal)
     # @sa EpocHandler::ES_ExpressivEqual(), EpocHandler::ES_CognitivEqual(), EpocHandler::ES_EmoEngineEqual(), EpocHandler::ES_Equal() 
     def ES_AffectivEqual(self, handlea, handleb):
-        return self.EmotivEngineDLL.ES_AffectivEqual(handlea, handleb)
+        return self._ES_AffectivEqual(handlea, handleb)
     
     ## Is Expressiv EmoStates Equal
     #
@@ -1526,7 +2299,7 @@ class EpocHandler:
     # @return 1/0 , (equal / no equal)
     # @sa EpocHandler::ES_AffectivEqual(), EpocHandler::ES_CognitivEqual(), EpocHandler::ES_EmoEngineEqual(), EpocHandler::ES_Equal() 
     def ES_ExpressivEqual(self, handlea, handleb):
-        return self.EmotivEngineDLL.ES_ExpressivEqual(handlea, handleb)
+        return self._ES_ExpressivEqual(handlea, handleb)
     
     ## Is Cognitiv EmoStates Equal
     #
@@ -1536,7 +2309,7 @@ class EpocHandler:
     # @return 1/0 , (equal / no equal)
     # @sa EpocHandler::ES_AffectivEqual(), EpocHandler::ES_ExpressivEqual(), EpocHandler::ES_EmoEngineEqual(), EpocHandler::ES_Equal() 
     def ES_CognitivEqual(self, handlea, handleb):
-        return self.EmotivEngineDLL.ES_CognitivEqual(handlea, handleb)
+        return self._ES_CognitivEqual(handlea, handleb)
     
     ## Is EmoEngine States Equal
     #
@@ -1547,7 +2320,7 @@ class EpocHandler:
     # \return 1/0 , (equal / no equal)
     # \sa EpocHandler::ES_AffectivEqual(), EpocHandler::ES_ExpressivEqual(), EpocHandler::ES_CognitivEqual(), EpocHandler::ES_Equal() 
     def ES_EmoEngineEqual(self, handlea, handleb):
-        return self.EmotivEngineDLL.ES_EmoEngineEqual(handlea, handleb)
+        return self._ES_EmoEngineEqual(handlea, handleb)
     
     ## Is EmoStateHandles Identical
     #
@@ -1557,7 +2330,7 @@ class EpocHandler:
     # \return 1/0 , (equal / no equal)
     # \sa EpocHandler::ES_AffectivEqual(), EpocHandler::ES_ExpressivEqual(), EpocHandler::ES_EmoEngineEqual()
     def ES_Equal(self, handlea, handleb):
-        return self.EmotivEngineDLL.ES_Equal(handlea, handleb)
+        return self._ES_Equal(handlea, handleb)
     
     ## Get Battery Charge Level
     #
@@ -1567,7 +2340,7 @@ class EpocHandler:
     def ES_GetBatteryChargeLevel(self,emostatehandle):
         chrglvl     = ctypes.c_int()
         maxchrglvl  = ctypes.c_int()
-        self.EmotivEngineDLL.ES_GetBatteryChargeLevel(emostatehandle,ctypes.byref(chrglvl),ctypes.byref(maxchrglvl))
+        self._ES_GetBatteryChargeLevel(emostatehandle,ctypes.byref(chrglvl),ctypes.byref(maxchrglvl))
         returnchrglvl, returnmaxlvl = chrglvl.value , maxchrglvl.value
         return (returnchrglvl, returnmaxlvl)
     
@@ -1576,4 +2349,198 @@ class EpocHandler:
     # Initialize the EmoState into neutral state.
     # \param emostatehandle
     def ES_Init(self,emostatehandle):
-        self.EmotivEngineDLL.ES_Init(emostatehandle)
\ No newline at end of file
+        self._ES_Init(emostatehandle)
+
+    ##################################[ Snapshot ]########################################
+    # Decodes a whole EmoState into an EmoStateSnapshot record in one pass.
+    ######################################################################################
+
+    ## Snapshot EmoState
+    #
+    # Reads every status, Expressiv, Affectiv and Cognitiv value of an EmoState into an EmoStateSnapshot.
+    # The out-parameter buffers are allocated once per handler and reused, and contact quality is read
+    # for all channels in one call.
+    # @param emostatehandle handle, populated by EE_EmoEngineEventGetEmoState()
+    # @param snapshot EmoStateSnapshot, record to fill (default: a record owned by the handler)
+    # @param parts int, #SNAPSHOTPART flags to decode; fields of other parts are left untouched (default: all)
+    # @return EmoStateSnapshot
+    # @warning The default record is overwritten by the next call. Pass your own record, or copy it with
+    # EmoStateSnapshot.from_buffer_copy(), to keep it.
+    def snapshot(self, emostatehandle, snapshot=None, parts=SNAPSHOTPART['ALL']):
+        if snapshot is None:
+            snapshot = self._snapshot
+        # status
+        if parts & SNAPSHOTPART['EMOENGINE']:
+            snapshot.Time = self._ES_GetTimeFromStart(emostatehandle)
+            snapshot.HeadsetOn = self._ES_GetHeadsetOn(emostatehandle)
+            snapshot.WirelessSignal = self._ES_GetWirelessSignalStatus(emostatehandle)
+            self._ES_GetBatteryChargeLevel(emostatehandle, self._outint1ref, self._outint2ref)
+            snapshot.BatteryLevel, snapshot.BatteryMaxLevel = self._outint1.value, self._outint2.value
+            snapshot.NumContactQualityChannels = self._ES_GetContactQualityFromAllChannels(emostatehandle, snapshot.ContactQuality, len(snapshot.ContactQuality))
+        # expressiv
+        if parts & SNAPSHOTPART['EXPRESSIV']:
+            snapshot.Blink = self._ES_ExpressivIsBlink(emostatehandle)
+            snapshot.LeftWink = self._ES_ExpressivIsLeftWink(emostatehandle)
+            snapshot.RightWink = self._ES_ExpressivIsRightWink(emostatehandle)
+            snapshot.EyesOpen = self._ES_ExpressivIsEyesOpen(emostatehandle)
+            snapshot.LookingUp = self._ES_ExpressivIsLookingUp(emostatehandle)
+            snapshot.LookingDown = self._ES_ExpressivIsLookingDown(emostatehandle)
+            snapshot.LookingLeft = self._ES_ExpressivIsLookingLeft(emostatehandle)
+            snapshot.LookingRight = self._ES_ExpressivIsLookingRight(emostatehandle)
+            self._ES_ExpressivGetEyelidState(emostatehandle, self._outfloat1ref, self._outfloat2ref)
+            snapshot.LeftEyelid, snapshot.RightEyelid = self._outfloat1.value, self._outfloat2.value
+            self._ES_ExpressivGetEyeLocation(emostatehandle, self._outfloat1ref, self._outfloat2ref)
+            snapshot.EyeX, snapshot.EyeY = self._outfloat1.value, self._outfloat2.value
+            snapshot.UpperFaceAction = self._ES_ExpressivGetUpperFaceAction(emostatehandle)
+            snapshot.UpperFaceActionPower = self._ES_ExpressivGetUpperFaceActionPower(emostatehandle)
+            snapshot.LowerFaceAction = self._ES_ExpressivGetLowerFaceAction(emostatehandle)
+            snapshot.LowerFaceActionPower = self._ES_ExpressivGetLowerFaceActionPower(emostatehandle)
+        # affectiv
+        if parts & SNAPSHOTPART['AFFECTIV']:
+            snapshot.ExcitementShortTerm = self._ES_AffectivGetExcitementShortTermScore(emostatehandle)
+            snapshot.ExcitementLongTerm = self._ES_AffectivGetExcitementLongTermScore(emostatehandle)
+            snapshot.Meditation = self._ES_AffectivGetMeditationScore(emostatehandle)
+            snapshot.Frustration = self._ES_AffectivGetFrustrationScore(emostatehandle)
+            snapshot.EngagementBoredom = self._ES_AffectivGetEngagementBoredomScore(emostatehandle)
+        # cognitiv
+        if parts & SNAPSHOTPART['COGNITIV']:
+            snapshot.CognitivAction = self._ES_CognitivGetCurrentAction(emostatehandle)
+            snapshot.CognitivActionPower = self._ES_CognitivGetCurrentActionPower(emostatehandle)
+            snapshot.CognitivIsActive = self._ES_CognitivIsActive(emostatehandle)
+        return snapshot
+
+    ##################################[ Waiting ]#########################################
+    # Blocking reads of decoded events, with a bounded polling backoff.
+    ######################################################################################
+
+    ## Wait for the next event.
+    #
+    # @param timeout float, seconds (None = forever)
+    # @return EventRecord, or None if no event arrived in time
+    # @sa EpocHandler::get_events()
+    def wait_next_event(self, timeout=None):
+        records = self.get_events(1, timeout)
+        return records[0] if records else None
+
+    ## Wait for events and return them as a batch.
+    #
+    # Returns as soon as at least one event is available. With a PyEpocPump::EventPump attached to
+    # this handler, waits on the pump's condition variable and drains its ring; otherwise polls
+    # EE_EngineGetNextEvent(), sleeping PollMinSleep at first and doubling up to PollMaxSleep while
+    # the engine is idle, so an idle wait costs almost no CPU and adds at most PollMaxSleep latency.
+    # @param max_n int, largest batch (None = every event available)
+    # @param timeout float, seconds (None = forever)
+    # @return list of EventRecord, empty on timeout or once the attached pump has stopped
+    # @warning Call from one thread at a time; without a pump, do not poll the engine elsewhere meanwhile.
+    def get_events(self, max_n=None, timeout=None):
+        deadline = None if timeout is None else _monotonic() + timeout
+        pump = self.Pump
+        if pump is not None:
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - _monotonic())
+                if pump.Wait(remaining):
+                    records = pump.Drain(max_n)
+                    if records:
+                        return records
+                if remaining == 0.0 or not pump.IsRunning():
+                    return []
+        if self._waithandles is None:
+            self._waithandles = (self._EE_EmoEngineEventCreate(), self._EE_EmoStateCreate())
+        engineeventhandle, statehandle = self._waithandles
+        sleep = 0.0
+        records = []
+        while True:
+            while max_n is None or len(records) < max_n:
+                if self._EE_EngineGetNextEvent(engineeventhandle) != ERRCODE['EDK_OK']:
+                    break
+                record = EventRecord()
+                record.Sequence = self._sequence
+                self._sequence += 1
+                records.append(self._DecodeEvent(engineeventhandle, statehandle, record))
+            if records:
+                return records
+            sleep = min(self.PollMaxSleep, sleep * 2) if sleep else self.PollMinSleep
+            if deadline is not None:
+                remaining = deadline - _monotonic()
+                if remaining <= 0:
+                    return records
+                sleep = min(sleep, remaining)
+            time.sleep(sleep)
+
+    ## \internal
+    # Decode the current event of emoengineeventhandle into record; EmoStates go through statehandle.
+    #
+    # The one event decoder, used by get_events(), PyEpocPump::EventPump, PyEpocUsers::UserRouter and
+    # PyEpocPool workers. Every field but Sequence is written, so ring slots can be reused. Callers
+    # that already read the event type and user ID (e.g. to route the event) pass them in.
+    # @return record
+    def _DecodeEvent(self, emoengineeventhandle, statehandle, record, eventtype=None, userid=None):
+        if eventtype is None:
+            eventtype = self._EE_EmoEngineEventGetType(emoengineeventhandle)
+        if userid is None:
+            self._EE_EmoEngineEventGetUserId(emoengineeventhandle, self._outint1ref)
+            userid = self._outint1.value
+        record.EventType = eventtype
+        record.UserId = userid
+        record.CognitivEvent = record.ExpressivEvent = 0
+        if eventtype == _EMOSTATEUPDATED:
+            self._EE_EmoEngineEventGetEmoState(emoengineeventhandle, statehandle)
+            self.snapshot(statehandle, record.State)
+            record.State.UserId = userid
+            return record
+        ctypes.memset(ctypes.addressof(record.State), 0, _SNAPSHOTSIZE)    # no stale EmoState in reused slots
+        if eventtype == _COGNITIVEVENT:
+            record.CognitivEvent = self._EE_CognitivEventGetType(emoengineeventhandle)
+        elif eventtype == _EXPRESSIVEVENT:
+            record.ExpressivEvent = self._EE_ExpressivEventGetType(emoengineeventhandle)
+        return record
+
+    ################################[ Handle Pools ]######################################
+    # Pre-created EmoState and EmoEngineEvent handles, freed together with the handler.
+    ######################################################################################
+
+    ## Create a pool of EmoState handles.
+    #
+    # The handles are created now and freed by EpocHandler::Close().
+    # @param size int, number of handles
+    # @param debug bool, check every HandlePool::Return()
+    # @return HandlePool
+    # @sa EpocHandler::EmoEngineEventPool()
+    def EmoStatePool(self, size, debug=False):
+        pool = HandlePool(self._EE_EmoStateCreate, self._EE_EmoStateFree, size, debug)
+        self._pools.append(pool)
+        return pool
+
+    ## Create a pool of EmoEngineEvent handles.
+    #
+    # The handles are created now and freed by EpocHandler::Close().
+    # @param size int, number of handles
+    # @param debug bool, check every HandlePool::Return()
+    # @return HandlePool
+    # @sa EpocHandler::EmoStatePool()
+    def EmoEngineEventPool(self, size, debug=False):
+        pool = HandlePool(self._EE_EmoEngineEventCreate, self._EE_EmoEngineEventFree, size, debug)
+        self._pools.append(pool)
+        return pool
+
+    ## Free every pooled handle of the handler, and the handles of get_events() and get_user_profile().
+    #
+    # Called on leaving a with block. The connection itself is left alone; call
+    # EpocHandler::EE_EngineDisconnect() to close it.
+    def Close(self):
+        for pool in self._pools:
+            pool.Close()
+        self._pools = []
+        if self._waithandles is not None:
+            self._EE_EmoEngineEventFree(self._waithandles[0])
+            self._EE_EmoStateFree(self._waithandles[1])
+            self._waithandles = None
+        if self._profilehandle is not None:
+            self._EE_EmoEngineEventFree(self._profilehandle)
+            self._profilehandle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
\ No newline at end of file
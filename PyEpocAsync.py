@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""asyncio client for PyEpoc (Python 3.7 or later)"""
+## @package PyEpocAsync
+# asyncio front end for EpocHandler.
+#
+# AsyncEpocHandler runs one EventPump thread for acquisition and for every engine call.
+# The pump hands decoded events to the event loop in batches with one
+# call_soon_threadsafe() per batch, and engine calls are awaited without an executor.
+#
+# @code
+# engine = AsyncEpocHandler(EpocHandler())
+# engine.Start()
+# async for record in engine.events():
+#     print(record.EventType, record.State.Meditation)
+# @endcode
+# @note Requires Python 3.7 or later.
+
+import asyncio
+
+from PyEpoc import ERRCODE
+from PyEpocPump import EventPump
+
+## @class AsyncEpocHandler
+# \brief asyncio wrapper around an EventPump.
+#
+# Any number of coroutines may iterate events(); each gets its own bounded queue of batches.
+# Engine calls are queued to the pump thread, so they never run concurrently with polling.
+class AsyncEpocHandler:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param loop asyncio event loop (default: the running loop when Start() is called)
+    # @param capacity int, EventPump ring slots
+    # @param queuesize int, batches buffered per events() consumer before batches are dropped for it
+    def __init__(self, handler, loop=None, capacity=4096, queuesize=256):
+        self.Handler = handler
+        self.Pump = EventPump(handler, capacity, ondata=self._OnData)
+        self.QueueSize = queuesize
+        ## batches dropped because a consumer's queue was full
+        self.Dropped = 0
+        self._loop = loop
+        self._subscribers = set()
+        self._calls = set()
+
+    ## Start the acquisition thread.
+    #
+    # Must be called from a coroutine or callback of the running event loop if no loop was given.
+    def Start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self.Pump.Start()
+
+    ## Stop the acquisition thread and end every events() iterator.
+    #
+    # A consumer whose queue is full loses its oldest batch to make room for the end marker. Engine
+    # calls that did not run before the pump stopped raise RuntimeError.
+    async def Stop(self):
+        await self._loop.run_in_executor(None, self.Pump.Stop)
+        for future in list(self._calls):
+            self._Resolve(future, None, RuntimeError("EventPump stopped before the call ran"))
+        for queue in list(self._subscribers):
+            while True:
+                try:
+                    queue.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    queue.get_nowait()
+                    self.Dropped += 1
+
+    ## Iterate decoded events.
+    #
+    # Async generator yielding PyEpocPump::EventRecord copies. Records are shared between
+    # consumers and must not be modified.
+    # @param eventtypes int, #EVENT flags to pass through (default: all)
+    def events(self, eventtypes=None):
+        return self._Events(eventtypes)
+
+    ## \internal
+    async def _Events(self, eventtypes):
+        queue = asyncio.Queue(self.QueueSize)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                for record in batch:
+                    if eventtypes is None or record.EventType & eventtypes:
+                        yield record
+        finally:
+            self._subscribers.discard(queue)
+
+    ## Run an engine call on the pump thread.
+    #
+    # @param function callable, e.g. a bound EpocHandler method
+    # @param args positional arguments
+    # @return the call's return value
+    # @exception RuntimeError the pump is not running, or stopped before the call ran
+    async def Call(self, function, *args):
+        if not self.Pump.IsRunning():
+            raise RuntimeError("EventPump is not running; call Start() first")
+        future = self._loop.create_future()
+        self._calls.add(future)
+        self.Pump.Submit(function, args, lambda result, error: self._loop.call_soon_threadsafe(self._Resolve, future, result, error))
+        return await future
+
+    ## Set Cognitiv Training Action
+    # @param userid int, User ID
+    # @param action int, #COGACTION
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_CognitivSetTrainingAction()
+    async def EE_CognitivSetTrainingAction(self, userid, action):
+        return await self.Call(self.Handler.EE_CognitivSetTrainingAction, userid, action)
+
+    ## Set Cognitiv Training Control
+    # @param userid int, User ID
+    # @param trainingcontrol int, #COGTRAININGCONTROL
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_CognitivSetTrainingControl()
+    async def EE_CognitivSetTrainingControl(self, userid, trainingcontrol):
+        return await self.Call(self.Handler.EE_CognitivSetTrainingControl, userid, trainingcontrol)
+
+    ## Set Expressiv Training Action
+    # @param userid int, User ID
+    # @param expressivalgoname int, #EXPRESSIVALGO
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_ExpressivSetTrainingAction()
+    async def EE_ExpressivSetTrainingAction(self, userid, expressivalgoname):
+        return await self.Call(self.Handler.EE_ExpressivSetTrainingAction, userid, expressivalgoname)
+
+    ## Set Expressiv Training Control
+    # @param userid int, User ID
+    # @param control int, #EXPRTRAININGCONTROL
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_ExpressivSetTrainingControl()
+    async def EE_ExpressivSetTrainingControl(self, userid, control):
+        return await self.Call(self.Handler.EE_ExpressivSetTrainingControl, userid, control)
+
+    ## Get User Profile
+    # @param userid int, User ID
+    # @param emoengineeventhandle handle, returned by EE_ProfileEventCreate()
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_GetUserProfile()
+    async def EE_GetUserProfile(self, userid, emoengineeventhandle):
+        return await self.Call(self.Handler.EE_GetUserProfile, userid, emoengineeventhandle)
+
+    ## Set User Profile
+    # @param userid int, User ID
+    # @param profilebuffer bytes, serialized user profile
+    # @param length int, buffer size (number of bytes, default: the whole buffer)
+    # @return #ERRCODE
+    # @sa EpocHandler::EE_SetUserProfile()
+    async def EE_SetUserProfile(self, userid, profilebuffer, length=None):
+        return await self.Call(self.Handler.EE_SetUserProfile, userid, profilebuffer, length)
+
+    ## Fetch a user profile.
+    #
+    # Runs EE_GetUserProfile(), EE_GetUserProfileSize() and EE_GetUserProfileBytes() as one call on the pump thread.
+    # @param userid int, User ID
+    # @return (#ERRCODE, bytes profile)
+    async def GetUserProfileBytes(self, userid):
+        return await self.Call(self._GetUserProfileBytes, userid)
+
+    ## \internal
+    # Runs on the pump thread.
+    def _GetUserProfileBytes(self, userid):
+        code, view = self.Handler.get_user_profile(userid)
+        if code != ERRCODE['EDK_OK']:
+            return (code, b"")
+        return (code, bytes(view))
+
+    ## \internal
+    # Runs on the event loop.
+    def _Resolve(self, future, result, error):
+        self._calls.discard(future)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    ## \internal
+    # Runs on the pump thread: drain the ring and schedule one delivery per batch.
+    def _OnData(self):
+        batch = self.Pump.Drain()
+        if batch:
+            self._loop.call_soon_threadsafe(self._Deliver, batch)
+
+    ## \internal
+    # Runs on the event loop.
+    def _Deliver(self, batch):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self.Dropped += 1
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Raw EEG acquisition for PyEpoc"""
+## @package PyEpocData
+# Raw EEG acquisition (research SDK).
+#
+# EEGAcquisition keeps a data handle and one contiguous double buffer, one row per channel. Each
+# Update() moves the samples the engine received since the previous update straight into the rows
+# with EE_DataGet(), through ctypes arrays created once over the buffer, so no Python object is made
+# per sample. AsNumPy() views the buffer without copying.
+#
+# @code
+# acquisition = EEGAcquisition(EmotivEngine, userid=0)
+# while True:
+#     code, samples = acquisition.Update()
+#     if samples:
+#         eeg = acquisition.AsNumPy()          # shape (14, samples), microvolts
+#     time.sleep(0.1)
+# @endcode
+# @note NumPy is optional; only AsNumPy() needs it.
+
+import array
+import ctypes
+
+from PyEpoc import DATACHANNEL, ERRCODE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## The 14 EEG channels of the headset, as #DATACHANNEL values in headset order.
+EEGCHANNELS = tuple(DATACHANNEL['ED_' + label] for label in
+                    ('AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4'))
+
+## \internal
+# Channel label (DATACHANNEL name without the ED_ prefix) per DATACHANNEL value.
+_LABELS = dict((value, name[3:]) for name, value in DATACHANNEL.items())
+
+## @class EEGAcquisition
+# \brief Raw samples of one user in a reusable buffer.
+#
+# Buffer is channel-major: row i holds the samples of Channels[i] and rows are Capacity doubles
+# apart, so after Update() the first Count entries of every row are the new block. The rows are
+# overwritten by the next Update(); copy them to keep them.
+class EEGAcquisition:
+    """.UserId   - user ID
+    .Channels - tuple of DATACHANNEL values, one per row
+    .Labels   - tuple of str, e.g. 'AF3' (INPUTCHANNELS name without the EE_CHAN_ prefix)
+    .Rate     - samples per second
+    .Capacity - samples per row
+    .Buffer   - the buffer, len(Channels) * Capacity doubles
+    .Count    - samples per row from the latest Update()"""
+
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param userid int, user to acquire
+    # @param channels sequence of #DATACHANNEL, one row each (default: the 14 EEG channels)
+    # @param buffersize float, seconds the engine keeps between updates
+    # @param capacity int, samples per row (default: buffersize seconds, which never overruns)
+    # @param buffer writable buffer of len(channels) * capacity doubles, e.g. a numpy.float64 array of shape (channels, capacity) (default: a new array.array('d'))
+    # @exception ValueError the buffer is too small
+    def __init__(self, handler, userid=0, channels=EEGCHANNELS, buffersize=1.0, capacity=None, buffer=None):
+        self.Handler = handler
+        self.UserId = userid
+        self.Channels = tuple(channels)
+        self.Labels = tuple(_LABELS.get(channel, str(channel)) for channel in self.Channels)
+        handler.EE_DataSetBufferSizeInSec(buffersize)
+        code, rate = handler.EE_DataGetSamplingRate(userid)
+        self.Rate = rate if code == ERRCODE['EDK_OK'] and rate else 128
+        self.Capacity = capacity if capacity is not None else int(self.Rate * buffersize + 0.5)
+        if buffer is None:
+            buffer = array.array('d', [0.0]) * (len(self.Channels) * self.Capacity)
+        self.Buffer = buffer
+        rowsize = ctypes.sizeof(ctypes.c_double) * self.Capacity
+        self._rows = [(ctypes.c_double * self.Capacity).from_buffer(buffer, row * rowsize) for row in range(len(self.Channels))]
+        self.Count = 0
+        ## samples per row received since the acquisition was created
+        self.Total = 0
+        ## updates that found more samples waiting than fit in a row (the rest were lost)
+        self.Overruns = 0
+        self._datahandle = handler.EE_DataCreate()
+        self._samples = ctypes.c_uint()
+        self._samplesref = ctypes.byref(self._samples)
+        handler.EE_DataAcquisitionEnable(userid, True)
+
+    ## Move the samples received since the previous update into the buffer.
+    # @return (#ERRCODE, samples per row), Count is 0 on errors
+    def Update(self):
+        handler = self.Handler
+        ok = ERRCODE['EDK_OK']
+        self.Count = 0
+        code = handler._EE_DataUpdateHandle(self.UserId, self._datahandle)
+        if code != ok:
+            return (code, 0)
+        code = handler._EE_DataGetNumberOfSample(self._datahandle, self._samplesref)
+        if code != ok:
+            return (code, 0)
+        count = self._samples.value
+        if count > self.Capacity:
+            self.Overruns += 1
+            count = self.Capacity
+        getdata, datahandle = handler._EE_DataGet, self._datahandle
+        for channel, row in zip(self.Channels, self._rows):
+            code = getdata(datahandle, channel, row, count)
+            if code != ok:
+                return (code, 0)
+        self.Count = count
+        self.Total += count
+        return (code, count)
+
+    ## Latest block of one channel.
+    # @param channel int or str, #DATACHANNEL value or label
+    # @return memoryview of double, Count samples, sharing memory with the buffer
+    # @exception ValueError unknown channel
+    def Row(self, channel):
+        row = self.Labels.index(channel) if isinstance(channel, str) else self.Channels.index(channel)
+        return memoryview(self._rows[row]).cast('B').cast('d')[:self.Count]
+
+    ## Latest block as a NumPy array.
+    # @return numpy.ndarray of shape (channels, Count), a view of the buffer
+    def AsNumPy(self):
+        if numpy is None:
+            raise ImportError("EEGAcquisition.AsNumPy() requires NumPy")
+        rows = numpy.frombuffer(self.Buffer, dtype=numpy.float64, count=len(self.Channels) * self.Capacity)
+        return rows.reshape(len(self.Channels), self.Capacity)[:, :self.Count]
+
+    ## Stop acquisition for the user and free the data handle.
+    def Close(self):
+        if self._datahandle is not None:
+            self.Handler.EE_DataAcquisitionEnable(self.UserId, False)
+            self.Handler.EE_DataFree(self._datahandle)
+            self._datahandle = None
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Change-suppressing EmoState dispatcher for PyEpoc"""
+## @package PyEpocDelta
+# Delta-aware EmoState dispatch.
+#
+# Most EE_EmoStateUpdated events change a single detection suite. DeltaDispatcher keeps the previous
+# EmoState of every user (ES_Copy), asks the engine which parts changed (ES_EmoEngineEqual,
+# ES_ExpressivEqual, ES_AffectivEqual, ES_CognitivEqual), decodes only those parts and calls only the
+# subscribers of those parts.
+#
+# @code
+# dispatcher = DeltaDispatcher(EmotivEngine)
+# dispatcher.Subscribe(OnCognitiv, SNAPSHOTPART['COGNITIV'])
+# ...
+# if EmotivEngine.EE_EmoEngineEventGetType(engineeventhandle) == EVENT['EE_EmoStateUpdated']:
+#     EmotivEngine.EE_EmoEngineEventGetEmoState(engineeventhandle, statehandle)
+#     dispatcher.Dispatch(statehandle, EmotivEngine.EE_EmoEngineEventGetUserId(engineeventhandle)[1])
+# @endcode
+
+from PyEpoc import SNAPSHOTPART, EmoStateSnapshot
+
+## @class DeltaDispatcher
+# \brief Publishes the changed parts of consecutive EmoStates.
+#
+# Each user has its own previous-state handle and EmoStateSnapshot. The snapshot always holds the
+# user's current values: parts that did not change keep their last decoded values. Parts nobody
+# subscribes to are neither compared nor decoded.
+class DeltaDispatcher:
+    ## \internal
+    # @param handler EpocHandler, the handler producing the EmoStates
+    def __init__(self, handler):
+        self.Handler = handler
+        ## EmoStates passed to Dispatch()
+        self.States = 0
+        ## EmoStates with no subscribed part changed
+        self.Suppressed = 0
+        ## number of EmoStates in which each #SNAPSHOTPART changed
+        self.Changes = dict((part, 0) for part in SNAPSHOTPART if part != 'ALL')
+        self._users = {}
+        self._subscribers = []
+        self._subscribed = 0
+        self._parts = [(SNAPSHOTPART['EMOENGINE'], handler._ES_EmoEngineEqual, 'EMOENGINE'),
+                       (SNAPSHOTPART['EXPRESSIV'], handler._ES_ExpressivEqual, 'EXPRESSIV'),
+                       (SNAPSHOTPART['AFFECTIV'], handler._ES_AffectivEqual, 'AFFECTIV'),
+                       (SNAPSHOTPART['COGNITIV'], handler._ES_CognitivEqual, 'COGNITIV')]
+
+    ## Subscribe to EmoState changes.
+    #
+    # The callback is called once per EmoState in which at least one of its parts changed, as
+    # callback(userid, snapshot, changed), where changed holds the changed #SNAPSHOTPART flags.
+    # @param callback function(userid, snapshot, changed)
+    # @param parts int, #SNAPSHOTPART flags (default: all)
+    # @warning The snapshot is owned by the dispatcher and updated in place; copy it to keep it.
+    def Subscribe(self, callback, parts=SNAPSHOTPART['ALL']):
+        self._subscribers.append((callback, parts))
+        newparts = parts & ~self._subscribed
+        self._subscribed |= parts
+        # parts nobody watched have not been decoded, so the next EmoState reports them as changed
+        for user in self._users.values():
+            user[2] |= newparts
+
+    ## Remove every subscription of a callback.
+    # @param callback function, as passed to Subscribe()
+    def Unsubscribe(self, callback):
+        self._subscribers = [(function, parts) for function, parts in self._subscribers if function != callback]
+        self._subscribed = 0
+        for function, parts in self._subscribers:
+            self._subscribed |= parts
+
+    ## Dispatch an EmoState.
+    #
+    # Compares the EmoState with the user's previous one, decodes the changed parts into the user's
+    # snapshot, calls the matching subscribers and keeps a copy of the EmoState for the next call.
+    # @param emostatehandle handle, populated by EE_EmoEngineEventGetEmoState()
+    # @param userid int, user the EmoState belongs to
+    # @return int, the changed #SNAPSHOTPART flags among the subscribed parts (0 if suppressed)
+    def Dispatch(self, emostatehandle, userid=0):
+        self.States += 1
+        handler = self.Handler
+        user = self._users.get(userid)
+        if user is None:
+            snapshot = EmoStateSnapshot()
+            snapshot.UserId = userid
+            user = self._users[userid] = [handler.EE_EmoStateCreate(), snapshot, SNAPSHOTPART['ALL']]
+        previous, snapshot, changed = user
+        subscribed = self._subscribed
+        for flag, equal, name in self._parts:
+            if subscribed & flag and not changed & flag and not equal(emostatehandle, previous):
+                changed |= flag
+        changed &= subscribed
+        if not changed:
+            self.Suppressed += 1
+            return 0
+        user[2] = 0
+        handler.snapshot(emostatehandle, snapshot, changed)
+        handler._ES_Copy(previous, emostatehandle)
+        for flag, equal, name in self._parts:
+            if changed & flag:
+                self.Changes[name] += 1
+        for callback, parts in self._subscribers:
+            if changed & parts:
+                callback(userid, snapshot, changed & parts)
+        return changed
+
+    ## Current snapshot of a user.
+    # @param userid int
+    # @return EmoStateSnapshot, or None if no EmoState of the user was dispatched yet
+    def Snapshot(self, userid=0):
+        user = self._users.get(userid)
+        return user[1] if user is not None else None
+
+    ## Forget a user's previous EmoState (e.g. on EE_UserRemoved) and free its handle.
+    # @param userid int
+    def Reset(self, userid):
+        user = self._users.pop(userid, None)
+        if user is not None:
+            self.Handler.EE_EmoStateFree(user[0])
+
+    ## Free the previous-state handles of every user.
+    def Close(self):
+        for userid in list(self._users):
+            self.Reset(userid)
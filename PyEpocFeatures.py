@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Streaming spectral features of raw EEG for PyEpoc"""
+## @package PyEpocFeatures
+# Streaming band power.
+#
+# BandPower takes blocks of raw samples (e.g. from PyEpocData::EEGAcquisition) and, every hop
+# samples, estimates the power spectrum of the latest window on every channel at once with Welch's
+# method (Hann-windowed, overlapping segments), then sums it into frequency bands. Each estimate is
+# a FeatureFrame keyed by #INPUTCHANNELS name.
+#
+# @code
+# acquisition = EEGAcquisition(EmotivEngine)
+# bandpower = BandPower(acquisition.Labels, acquisition.Rate)
+# while True:
+#     acquisition.Update()
+#     for frame in bandpower.Push(acquisition.AsNumPy()):
+#         print(frame.Time, frame.Channel('EE_CHAN_O1')['alpha'])
+# @endcode
+# @note Requires NumPy.
+
+import numpy
+
+from PyEpoc import INPUTCHANNELS
+
+## Frequency bands in Hz, lower edge included, upper edge excluded.
+BANDS = {'delta' : (1.0, 4.0),
+         'theta' : (4.0, 8.0),
+         'alpha' : (8.0, 13.0),
+         'beta'  : (13.0, 30.0),
+         'gamma' : (30.0, 45.0)}
+
+## @class FeatureFrame
+# \brief Band power of every channel at one point in time.
+class FeatureFrame:
+    """.Time   - seconds of samples pushed up to the end of the window
+    .Labels - tuple of INPUTCHANNELS names (or the raw label of channels that are not EEG sensors)
+    .Bands  - tuple of band names, in column order
+    .Power  - numpy.ndarray of shape (channels, bands), band power in uV^2"""
+
+    ## \internal
+    def __init__(self, time, labels, bands, power):
+        self.Time = time
+        self.Labels = labels
+        self.Bands = bands
+        self.Power = power
+
+    ## Band powers of one channel.
+    # @param label str, #INPUTCHANNELS name
+    # @return dict, band name: power
+    def Channel(self, label):
+        row = self.Power[self.Labels.index(label)]
+        return dict(zip(self.Bands, row.tolist()))
+
+    ## Every band power.
+    # @return dict, #INPUTCHANNELS name: {band name: power}
+    def AsDict(self):
+        return dict((label, dict(zip(self.Bands, row))) for label, row in zip(self.Labels, self.Power.tolist()))
+
+## @class BandPower
+# \brief Welch band power over a sliding window.
+#
+# Samples are kept in a buffer of two windows; each frame costs one FFT per segment for all
+# channels together, and a matrix product sums the bins into bands.
+class BandPower:
+    ## \internal
+    # @param labels sequence of str, channel labels as in PyEpocData::EEGAcquisition::Labels or #INPUTCHANNELS names
+    # @param rate float, samples per second
+    # @param window int, samples per estimate
+    # @param segment int, samples per Welch segment (segments overlap by half)
+    # @param hop int, samples between estimates
+    # @param bands dict, band name: (low Hz, high Hz) (default: #BANDS)
+    # @exception ValueError segment longer than window, or hop not in 1..window
+    def __init__(self, labels, rate=128.0, window=256, segment=128, hop=32, bands=BANDS):
+        if segment > window or not 0 < hop <= window:
+            raise ValueError("need segment <= window and 0 < hop <= window")
+        self.Labels = tuple(label if label in INPUTCHANNELS or 'EE_CHAN_' + label not in INPUTCHANNELS
+                            else 'EE_CHAN_' + label for label in labels)
+        self.Rate = float(rate)
+        self.Window, self.Segment, self.Hop = window, segment, hop
+        self.Bands = tuple(sorted(bands, key=lambda name: bands[name]))
+        ## frames produced
+        self.Frames = 0
+        channels = len(self.Labels)
+        self._data = numpy.zeros((channels, 2 * window))
+        self._fill = 0
+        self._untilnext = window
+        self._pushed = 0
+        step = segment // 2
+        starts = numpy.arange(0, window - segment + 1, step)
+        self._segments = starts[:, None] + numpy.arange(segment)
+        self._taper = numpy.hanning(segment)
+        frequencies = numpy.fft.rfftfreq(segment, 1.0 / self.Rate)
+        # one-sided density scaling, then integrate over the band: power = sum(psd) * df
+        scale = 2.0 / (self.Rate * (self._taper ** 2).sum() * len(starts))
+        weights = numpy.full(len(frequencies), scale)
+        weights[0] /= 2.0
+        if segment % 2 == 0:
+            weights[-1] /= 2.0
+        weights *= self.Rate / segment
+        self._bandmatrix = numpy.array([((frequencies >= bands[name][0]) & (frequencies < bands[name][1])) * weights
+                                        for name in self.Bands]).T
+
+    ## Add samples.
+    # @param block array of shape (channels, samples), e.g. PyEpocData::EEGAcquisition::AsNumPy()
+    # @return list of FeatureFrame, one per hop completed by the block
+    def Push(self, block):
+        block = numpy.asarray(block)
+        frames = []
+        done, total = 0, block.shape[1]
+        while done < total:
+            take = min(total - done, self._untilnext)
+            if self._fill + take > self._data.shape[1]:
+                window = self.Window
+                self._data[:, :window] = self._data[:, self._fill - window:self._fill]
+                self._fill = window
+            self._data[:, self._fill:self._fill + take] = block[:, done:done + take]
+            self._fill += take
+            self._pushed += take
+            self._untilnext -= take
+            done += take
+            if not self._untilnext:
+                self._untilnext = self.Hop
+                frames.append(self._Estimate())
+        return frames
+
+    ## \internal
+    # Welch estimate of the latest window.
+    def _Estimate(self):
+        window = self._data[:, self._fill - self.Window:self._fill]
+        segments = window[:, self._segments]    # (channels, segments, segment)
+        segments = segments - segments.mean(axis=2, keepdims=True)
+        spectra = numpy.fft.rfft(segments * self._taper, axis=2)
+        power = (spectra.real ** 2 + spectra.imag ** 2).sum(axis=1)    # (channels, bins)
+        self.Frames += 1
+        return FeatureFrame(self._pushed / self.Rate, self.Labels, self.Bands, power.dot(self._bandmatrix))
+
+    ## Forget the buffered samples; the next frame comes after a full window.
+    def Reset(self):
+        self._fill = 0
+        self._untilnext = self.Window
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Online filtering of raw EEG for PyEpoc"""
+## @package PyEpocFilter
+# Incremental IIR filtering.
+#
+# FilterChain filters every channel of consecutive raw blocks with a cascade of biquad sections
+# (mains notch, Butterworth band-pass, baseline high-pass). The filter state of every section and
+# channel is kept between blocks, so each block costs work proportional to its own length and the
+# output is the same as filtering the whole recording at once.
+#
+# @code
+# acquisition = EEGAcquisition(EmotivEngine)
+# chain = FilterChain(len(acquisition.Channels), acquisition.Rate, notch=50.0, bandpass=(1.0, 45.0))
+# bandpower = BandPower(acquisition.Labels, acquisition.Rate)
+# while True:
+#     acquisition.Update()
+#     frames = bandpower.Push(chain.Filter(acquisition.AsNumPy()))
+# @endcode
+# @note Requires NumPy. With SciPy, blocks are filtered by scipy.signal.sosfilt(); without it, by
+# a NumPy loop over the samples of the block (all channels at once).
+
+import math
+
+import numpy
+
+try:
+    from scipy import signal
+except ImportError:
+    signal = None
+
+## Biquad notch (Audio EQ Cookbook design).
+# @param frequency float, centre frequency in Hz
+# @param rate float, samples per second
+# @param q float, quality factor (centre frequency / bandwidth)
+# @return list of one [b0, b1, b2, a0, a1, a2] section
+def NotchSections(frequency, rate, q=30.0):
+    w = 2.0 * math.pi * frequency / rate
+    alpha = math.sin(w) / (2.0 * q)
+    return [_Normalized([1.0, -2.0 * math.cos(w), 1.0, 1.0 + alpha, -2.0 * math.cos(w), 1.0 - alpha])]
+
+## Butterworth high-pass, e.g. for baseline (DC and drift) removal.
+# @param cutoff float, -3 dB frequency in Hz
+# @param rate float, samples per second
+# @param order int, even filter order
+# @return list of order / 2 sections
+def HighPassSections(cutoff, rate, order=2):
+    w = 2.0 * math.pi * cutoff / rate
+    sections = []
+    for q in _ButterworthQ(order):
+        alpha = math.sin(w) / (2.0 * q)
+        c = math.cos(w)
+        sections.append(_Normalized([(1.0 + c) / 2.0, -(1.0 + c), (1.0 + c) / 2.0, 1.0 + alpha, -2.0 * c, 1.0 - alpha]))
+    return sections
+
+## Butterworth low-pass.
+# @param cutoff float, -3 dB frequency in Hz
+# @param rate float, samples per second
+# @param order int, even filter order
+# @return list of order / 2 sections
+def LowPassSections(cutoff, rate, order=4):
+    w = 2.0 * math.pi * cutoff / rate
+    sections = []
+    for q in _ButterworthQ(order):
+        alpha = math.sin(w) / (2.0 * q)
+        c = math.cos(w)
+        sections.append(_Normalized([(1.0 - c) / 2.0, 1.0 - c, (1.0 - c) / 2.0, 1.0 + alpha, -2.0 * c, 1.0 - alpha]))
+    return sections
+
+## Band-pass as a Butterworth high-pass followed by a Butterworth low-pass.
+# @param low float, lower -3 dB frequency in Hz
+# @param high float, upper -3 dB frequency in Hz
+# @param rate float, samples per second
+# @param order int, even order of each half
+# @return list of sections
+def BandPassSections(low, high, rate, order=4):
+    return HighPassSections(low, rate, order) + LowPassSections(high, rate, order)
+
+## \internal
+# Section quality factors of an even-order Butterworth filter.
+def _ButterworthQ(order):
+    if order < 2 or order % 2:
+        raise ValueError("Butterworth order must be even and at least 2, not %r" % order)
+    return [1.0 / (2.0 * math.cos(math.pi * (2 * k + 1) / (2.0 * order))) for k in range(order // 2)]
+
+## \internal
+# Divide a section by a0.
+def _Normalized(section):
+    a0 = section[3]
+    return [section[0] / a0, section[1] / a0, section[2] / a0, 1.0, section[4] / a0, section[5] / a0]
+
+## @class FilterChain
+# \brief Biquad cascade with per-channel state.
+#
+# Sections run in order: notch, band-pass, baseline high-pass, then any extra sections. The first
+# block sets the state to the steady state of its first sample, so the large electrode offset of
+# raw EEG does not ring through the filters.
+class FilterChain:
+    """.Channels - number of channels (rows of each block)
+    .Rate     - samples per second
+    .Sections - numpy.ndarray of shape (sections, 6), [b0, b1, b2, 1, a1, a2] rows
+    .Samples  - samples per channel filtered since the last Reset()"""
+
+    ## \internal
+    # @param channels int, rows per block
+    # @param rate float, samples per second
+    # @param notch float or sequence of float, mains frequencies to notch out in Hz (None = no notch)
+    # @param bandpass (low, high) in Hz (None = no band-pass)
+    # @param baseline float, high-pass cutoff in Hz for baseline removal (None = none)
+    # @param order int, even Butterworth order of each band-pass half
+    # @param sections list of extra [b0, b1, b2, a0, a1, a2] sections, e.g. from scipy.signal.butter(output='sos')
+    # @exception ValueError no sections, or invalid order
+    def __init__(self, channels, rate=128.0, notch=50.0, bandpass=(1.0, 45.0), baseline=None, order=4, sections=()):
+        self.Channels = channels
+        self.Rate = float(rate)
+        rows = []
+        if notch is not None:
+            for frequency in (notch if isinstance(notch, (list, tuple)) else [notch]):
+                rows += NotchSections(frequency, self.Rate)
+        if bandpass is not None:
+            rows += BandPassSections(bandpass[0], bandpass[1], self.Rate, order)
+        if baseline is not None:
+            rows += HighPassSections(baseline, self.Rate)
+        rows += [_Normalized(list(section)) for section in sections]
+        if not rows:
+            raise ValueError("FilterChain needs at least one section")
+        self.Sections = numpy.array(rows, dtype=numpy.float64)
+        self.Samples = 0
+        ## filter state, shape (sections, channels, 2) as used by scipy.signal.sosfilt()
+        self.State = numpy.zeros((len(rows), channels, 2))
+
+    ## Filter a block.
+    #
+    # @param block array of shape (channels, samples), e.g. PyEpocData::EEGAcquisition::AsNumPy()
+    # @param out numpy.ndarray of the same shape to write into (default: a new array); may be block itself
+    # @return numpy.ndarray of shape (channels, samples)
+    def Filter(self, block, out=None):
+        block = numpy.asarray(block, dtype=numpy.float64)
+        if not block.shape[1]:
+            return block.copy() if out is None else out
+        if not self.Samples:
+            self._SteadyState(block[:, 0])
+        if signal is not None:
+            result, self.State = signal.sosfilt(self.Sections, block, axis=1, zi=self.State)
+            if out is not None:
+                out[...] = result
+                result = out
+        else:
+            result = self._Filter(block, out)
+        self.Samples += block.shape[1]
+        return result
+
+    ## \internal
+    # Transposed direct form II, one sample of every channel at a time.
+    def _Filter(self, block, out):
+        result = numpy.array(block) if out is None else out
+        if result is not block:
+            result[...] = block
+        for section, state in zip(self.Sections.tolist(), self.State):
+            b0, b1, b2, a0, a1, a2 = section
+            z1, z2 = state[:, 0].copy(), state[:, 1].copy()
+            for i in range(result.shape[1]):
+                x = result[:, i].copy()
+                y = b0 * x + z1
+                z1 = b1 * x - a1 * y + z2
+                z2 = b2 * x - a2 * y
+                result[:, i] = y
+            state[:, 0], state[:, 1] = z1, z2
+        return result
+
+    ## \internal
+    # State for a constant input equal to the first sample of every channel.
+    def _SteadyState(self, first):
+        x = numpy.array(first, dtype=numpy.float64)
+        for section, state in zip(self.Sections.tolist(), self.State):
+            b0, b1, b2, a0, a1, a2 = section
+            y = x * ((b0 + b1 + b2) / (1.0 + a1 + a2))
+            state[:, 1] = b2 * x - a2 * y
+            state[:, 0] = b1 * x - a1 * y + state[:, 1]
+            x = y
+
+    ## Forget the filter state; the next block starts a new steady state.
+    def Reset(self):
+        self.State[...] = 0.0
+        self.Samples = 0
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""Network streaming of decoded EmoEngine events for PyEpoc"""
+## @package PyEpocNet
+# TCP/UDP streaming of EventRecords.
+#
+# StreamServer runs a PyEpocPump::EventPump on an EpocHandler and sends the decoded records to
+# every connected StreamClient in batches. A frame is a FRAMELENGTH prefix and a FRAMEHEADER followed by the raw
+# EventRecord structs, optionally zlib-compressed; the client returns the same EventRecord objects
+# the pump produces.
+#
+# @code
+# server = StreamServer(EmotivEngine, port=1727, compress=6)         # lab machine
+# server.Start()
+#
+# client = StreamClient("lab-pc", 1727)                              # analysis node
+# while True:
+#     for record in client.Receive(1.0):
+#         print(record.State.Meditation)
+# @endcode
+# @note Both ends must use the same EventRecord layout (same PyEpoc version and byte order).
+
+import collections
+import ctypes
+import select
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from PyEpocPump import EventPump, EventRecord
+
+## Frame length prefix: number of bytes that follow.
+FRAMELENGTH = struct.Struct("<I")
+
+## Frame header, after the length: flags, record count, sequence number of the first record,
+# server send time (time.time()).
+FRAMEHEADER = struct.Struct("<HHQd")
+
+## Frame flags.
+#
+# COMPRESSED : \b 0x1 \n the records are zlib-compressed
+FRAMEFLAG = {'COMPRESSED' : 0x1}
+
+## Largest UDP datagram payload.
+UDPMAXFRAME = 65507
+
+## Datagram a UDP client sends to subscribe.
+UDPHELLO = b"PYEPOC-HELLO"
+
+## \internal
+_RECORDSIZE = ctypes.sizeof(EventRecord)
+
+## Build one frame.
+# @param records list of EventRecord
+# @param compress int, zlib level (0 = uncompressed)
+# @return bytes
+def EncodeFrame(records, compress=0):
+    payload = b"".join([ctypes.string_at(ctypes.addressof(record), _RECORDSIZE) for record in records])
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, compress)
+        flags |= FRAMEFLAG['COMPRESSED']
+    first = records[0].Sequence if records else 0
+    return FRAMELENGTH.pack(FRAMEHEADER.size + len(payload)) + FRAMEHEADER.pack(flags, len(records), first, time.time()) + payload
+
+## Decode the part of a frame after its length field.
+# @param body bytes, the frame without its FRAMELENGTH prefix
+# @return (sendtime, list of EventRecord)
+def DecodeFrame(body):
+    flags, count, first, sendtime = FRAMEHEADER.unpack_from(body)
+    payload = body[FRAMEHEADER.size:]
+    if flags & FRAMEFLAG['COMPRESSED']:
+        payload = zlib.decompress(payload)
+    if len(payload) != count * _RECORDSIZE:
+        raise ValueError("frame holds %d bytes for %d records" % (len(payload), count))
+    return sendtime, [EventRecord.from_buffer_copy(payload, i * _RECORDSIZE) for i in range(count)]
+
+## \internal
+# @class _Connection
+# \brief TCP client of a StreamServer, with its own send queue and thread.
+#
+# Frames are queued by the batching thread and sent here, so a slow client only delays itself.
+class _Connection:
+    ## \internal
+    # @param server StreamServer
+    # @param client socket, accepted connection
+    # @param queuesize int, most frames queued before the client counts as too slow
+    def __init__(self, server, client, queuesize):
+        self.Socket = client
+        ## frames sent to this client
+        self.Frames = 0
+        ## bytes sent to this client
+        self.Bytes = 0
+        self._server = server
+        self._queuesize = queuesize
+        self._queue = collections.deque()
+        self._ready = threading.Condition()
+        self._open = True
+        self._thread = threading.Thread(target=self._Run, name="StreamServerClient")
+        self._thread.daemon = True
+        self._thread.start()
+
+    ## \internal
+    # Queue a frame.
+    # @return bool, False if the connection is closed or its queue is full
+    def Put(self, frame):
+        with self._ready:
+            if not self._open or len(self._queue) >= self._queuesize:
+                return False
+            self._queue.append(frame)
+            self._ready.notify()
+        return True
+
+    ## \internal
+    # Stop sending; frames still queued are discarded and the thread closes the socket.
+    def Close(self):
+        with self._ready:
+            self._open = False
+            self._queue.clear()
+            self._ready.notify()
+
+    ## \internal
+    # Wait for the send thread to exit.
+    # @param timeout float, seconds (None = forever)
+    def Join(self, timeout=None):
+        self._thread.join(timeout)
+
+    ## \internal
+    # Send loop, runs on the connection's thread.
+    def _Run(self):
+        client = self.Socket
+        try:
+            while True:
+                with self._ready:
+                    while self._open and not self._queue:
+                        self._ready.wait()
+                    if not self._open:
+                        break
+                    frame = self._queue.popleft()
+                client.sendall(frame)
+                self.Frames += 1
+                self.Bytes += len(frame)
+        except socket.error:
+            self._server._Drop(self)
+        finally:
+            self._open = False
+            client.close()
+
+## @class StreamServer
+# \brief Streams an EpocHandler's events to network clients.
+#
+# Records are sent once batchsize of them are waiting or the oldest has waited maxdelay seconds,
+# whichever comes first. With TCP every client has its own send queue and thread; a client that
+# falls sendqueue frames behind, or whose send blocks for sendtimeout seconds, is disconnected
+# without holding up the others. With UDP, frames to slow or lost clients are simply dropped and
+# clients see gaps in the record sequence numbers.
+class StreamServer:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param host str, address to bind
+    # @param port int, port to bind (0 = any free port, see Port)
+    # @param udp bool, stream over UDP instead of TCP
+    # @param batchsize int, most records per frame
+    # @param maxdelay float, longest time a record waits for its batch, in seconds
+    # @param compress int, zlib level, or 0 for uncompressed frames
+    # @param sendtimeout float, TCP only: seconds a send may block before the client is dropped
+    # @param sendqueue int, TCP only: frames queued for a client before the client is dropped
+    def __init__(self, handler, host="0.0.0.0", port=1727, udp=False, batchsize=64, maxdelay=0.01, compress=0, sendtimeout=1.0,
+                 sendqueue=256):
+        self.Pump = EventPump(handler)
+        self.UDP = udp
+        if udp:
+            # keep every datagram under the UDP limit even when compression does not help
+            batchsize = min(batchsize, (UDPMAXFRAME - FRAMELENGTH.size - FRAMEHEADER.size - 64) // _RECORDSIZE)
+        self.BatchSize = batchsize
+        self.MaxDelay = maxdelay
+        self.Compress = compress
+        self.SendTimeout = sendtimeout
+        self.SendQueue = sendqueue
+        self.Socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM if udp else socket.SOCK_STREAM)
+        self.Socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.Socket.bind((host, port))
+        self.Port = self.Socket.getsockname()[1]
+        if not udp:
+            self.Socket.listen(8)
+        ## frames built, counted once however many clients they are sent to
+        self.Frames = 0
+        ## bytes of the frames built, counted once however many clients they are sent to
+        self.Bytes = 0
+        ## clients disconnected because they fell behind or their connection failed
+        self.Dropped = 0
+        self._clients = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads = []
+
+    ## Number of connected (TCP) or subscribed (UDP) clients.
+    # @return int
+    def Clients(self):
+        return len(self._clients)
+
+    ## Start the pump and the network threads.
+    def Start(self):
+        if self._running:
+            return
+        self._running = True
+        self.Pump.Start()
+        self._threads = [threading.Thread(target=self._Send, name="StreamServer"),
+                         threading.Thread(target=self._Accept, name="StreamServerAccept")]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    ## Stop streaming and close every client connection.
+    def Stop(self):
+        self._running = False
+        self.Pump.Stop()
+        self.Pump.DataReady.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._lock:
+            clients, self._clients = self._clients, []
+        if not self.UDP:
+            for client in clients:
+                client.Close()
+            for client in clients:
+                client.Join(self.SendTimeout)
+        self.Socket.close()
+
+    ## \internal
+    # Accept TCP connections / UDP subscriptions.
+    def _Accept(self):
+        while self._running:
+            if not select.select([self.Socket], [], [], 0.2)[0]:
+                continue
+            try:
+                if self.UDP:
+                    data, address = self.Socket.recvfrom(64)
+                    if data == UDPHELLO and address not in self._clients:
+                        with self._lock:
+                            self._clients = self._clients + [address]
+                else:
+                    client = self.Socket.accept()[0]
+                    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    client.settimeout(self.SendTimeout)
+                    with self._lock:
+                        self._clients = self._clients + [_Connection(self, client, self.SendQueue)]
+            except socket.error:
+                continue
+
+    ## \internal
+    # Remove a client from the send list.
+    def _Drop(self, client):
+        with self._lock:
+            if client not in self._clients:
+                return
+            self._clients = [other for other in self._clients if other is not client]
+            self.Dropped += 1
+
+    ## \internal
+    # Batch records from the pump and send the frames.
+    def _Send(self):
+        pump = self.Pump
+        while self._running:
+            if not pump.Wait(0.2):
+                continue
+            deadline = time.time() + self.MaxDelay
+            remaining = self.MaxDelay
+            while remaining > 0 and self._running and not pump.Wait(remaining, self.BatchSize):
+                remaining = deadline - time.time()
+            records = pump.Peek(self.BatchSize)
+            if not self._clients:
+                pump.Release(len(records))
+                continue
+            frame = EncodeFrame(records, self.Compress)
+            pump.Release(len(records))
+            del records
+            self.Frames += 1
+            self.Bytes += len(frame)
+            for client in self._clients:
+                if not self.UDP:
+                    if not client.Put(frame):
+                        self._Drop(client)
+                        client.Close()
+                    continue
+                try:
+                    self.Socket.sendto(frame, client)
+                except socket.error:
+                    self._Drop(client)
+
+## @class StreamClient
+# \brief Receives a StreamServer's records.
+class StreamClient:
+    ## \internal
+    # @param host str, server address
+    # @param port int, server port
+    # @param udp bool, the server streams over UDP
+    # @param keeplatency bool, keep the transport latency of every frame in Latencies
+    def __init__(self, host, port=1727, udp=False, keeplatency=False):
+        self.UDP = udp
+        self.Address = (host, port)
+        if udp:
+            self.Socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.Socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+            self.Socket.sendto(UDPHELLO, self.Address)
+        else:
+            self.Socket = socket.create_connection(self.Address)
+            self.Socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        ## frames received
+        self.Frames = 0
+        ## records received
+        self.Received = 0
+        ## records missing from the sequence (UDP datagrams lost on the way)
+        self.Lost = 0
+        ## receive time minus server send time of every frame, if keeplatency
+        self.Latencies = [] if keeplatency else None
+        self._next = None
+        self._buffer = bytearray()
+
+    ## Receive records.
+    #
+    # Waits up to timeout for a frame, then returns the records of every complete frame read.
+    # @param timeout float, seconds (None = forever)
+    # @return list of EventRecord
+    def Receive(self, timeout=None):
+        records = []
+        while not records:
+            if not select.select([self.Socket], [], [], timeout)[0]:
+                break
+            if not self._Read(records):
+                break
+        return records
+
+    ## \internal
+    # Read from the socket and decode complete frames into records.
+    # @return bool, False once the server closed the connection
+    def _Read(self, records):
+        if self.UDP:
+            self._Frame(self.Socket.recv(UDPMAXFRAME)[FRAMELENGTH.size:], records)
+            return True
+        data = self.Socket.recv(1 << 18)
+        if not data:
+            return False
+        buffer = self._buffer
+        buffer += data
+        while len(buffer) >= FRAMELENGTH.size:
+            end = FRAMELENGTH.size + FRAMELENGTH.unpack_from(buffer)[0]
+            if len(buffer) < end:
+                break
+            self._Frame(bytes(buffer[FRAMELENGTH.size:end]), records)
+            del buffer[:end]
+        return True
+
+    ## \internal
+    def _Frame(self, body, records):
+        sendtime, batch = DecodeFrame(body)
+        if self.Latencies is not None:
+            self.Latencies.append(time.time() - sendtime)
+        if batch:
+            if self._next is not None and batch[0].Sequence > self._next:
+                self.Lost += batch[0].Sequence - self._next
+            self._next = batch[-1].Sequence + 1
+        self.Frames += 1
+        self.Received += len(batch)
+        records.extend(batch)
+
+    ## Send the UDP subscription again, e.g. after the server restarted.
+    def Hello(self):
+        if self.UDP:
+            self.Socket.sendto(UDPHELLO, self.Address)
+
+    ## Close the connection.
+    def Close(self):
+        self.Socket.close()
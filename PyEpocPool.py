@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Multi-process EmoEngine supervisor for PyEpoc (Python 3.8 or later)"""
+## @package PyEpocPool
+# Multi-engine process pool.
+#
+# EngineSupervisor runs each EmoEngine connection (local, or EE_EngineRemoteConnect to an
+# EmoComposer/control panel host) in its own worker process. Workers poll and decode events like
+# PyEpocPump::EventPump and write the EventRecords straight into a PyEpocShared::SharedRing, so
+# throughput scales with cores instead of sharing one interpreter lock.
+#
+# @code
+# supervisor = EngineSupervisor()
+# supervisor.Add(EpocHandler, remote=("10.0.0.5", 1726))
+# supervisor.Add(EpocHandler, remote=("10.0.0.6", 1726))
+# supervisor.Start()
+# while True:
+#     for engine, records in supervisor.DrainAll():
+#         ...
+# @endcode
+# @note Requires Python 3.8 or later.
+
+import multiprocessing
+import time
+
+from PyEpoc import ERRCODE, EpocHandler
+from PyEpocShared import SharedRing
+
+## Worker status values, in SharedRing.Header.Status (non-negative values are #ERRCODE of a failed connect).
+WORKERSTATUS = {'STARTING' : -1,
+                'RUNNING'  : -2,
+                'STOPPED'  : -3,
+                'FAILED'   : -4}
+
+## \internal
+# Worker process main: connect, then poll and decode into the shared ring until Header.Closed is set.
+def _EngineWorker(factory, args, remote, ringname, minsleep, maxsleep):
+    ring = SharedRing.Attach(ringname)
+    header = ring.Header
+    try:
+        handler = factory(*args)
+        code = handler.EE_EngineRemoteConnect(*remote) if remote else handler.EE_EngineConnect()
+        if code != ERRCODE['EDK_OK']:
+            header.Status = code
+            return
+        header.Status = WORKERSTATUS['RUNNING']
+        engineeventhandle = handler.EE_EmoEngineEventCreate()
+        statehandle = handler.EE_EmoStateCreate()
+        getnextevent = handler._EE_EngineGetNextEvent
+        decode = handler._DecodeEvent
+        ok = ERRCODE['EDK_OK']
+        sleep = 0.0
+        while not header.Closed:
+            if getnextevent(engineeventhandle) != ok:
+                sleep = min(maxsleep, sleep * 2) if sleep else minsleep
+                time.sleep(sleep)
+                continue
+            sleep = 0.0
+            record = ring.Reserve()
+            if record is None:
+                continue
+            record.Sequence = header.Head
+            decode(engineeventhandle, statehandle, record)
+            record = None
+            ring.Commit()
+        handler.EE_EmoStateFree(statehandle)
+        handler.EE_EmoEngineEventFree(engineeventhandle)
+        handler.EE_EngineDisconnect()
+        header.Status = WORKERSTATUS['STOPPED']
+    except Exception:
+        header.Status = WORKERSTATUS['FAILED']
+        raise
+    finally:
+        header = None
+        ring.Close()
+
+## @class EngineSupervisor
+# \brief Runs EmoEngine connections in worker processes.
+#
+# Each engine has its own SharedRing; the supervisor process is the only consumer of every ring.
+# The worker's handler is built in the worker by calling factory(*args), so factory and args must be
+# picklable (e.g. EpocHandler with a library path, or a module-level function).
+class EngineSupervisor:
+    ## \internal
+    # @param capacity int, ring slots per engine
+    # @param minsleep float, first backoff sleep of the workers in seconds
+    # @param maxsleep float, longest backoff sleep of the workers in seconds
+    # @param context multiprocessing context (default: the default context)
+    def __init__(self, capacity=4096, minsleep=0.0005, maxsleep=0.008, context=None):
+        self.Capacity = capacity
+        self.MinSleep = minsleep
+        self.MaxSleep = maxsleep
+        self.Context = context if context is not None else multiprocessing.get_context()
+        ## SharedRing per engine, in Add() order
+        self.Rings = []
+        self._workers = []
+        self._processes = []
+
+    ## Add an engine connection.
+    #
+    # @param factory callable returning an EpocHandler in the worker (default: EpocHandler)
+    # @param args tuple, arguments for factory, e.g. the path of the edk library
+    # @param remote (str, int), host and port for EE_EngineRemoteConnect() (default: EE_EngineConnect())
+    # @return int, engine index
+    def Add(self, factory=EpocHandler, args=(), remote=None):
+        ring = SharedRing(self.Capacity)
+        ring.Header.Status = WORKERSTATUS['STARTING']
+        self.Rings.append(ring)
+        self._workers.append((factory, tuple(args), remote))
+        return len(self.Rings) - 1
+
+    ## Start every worker process that is not running.
+    def Start(self):
+        for index, (factory, args, remote) in enumerate(self._workers):
+            if index < len(self._processes) and self._processes[index] is not None:
+                continue
+            process = self.Context.Process(target=_EngineWorker, name="EngineWorker-%d" % index,
+                                           args=(factory, args, remote, self.Rings[index].Name, self.MinSleep, self.MaxSleep))
+            process.daemon = True
+            process.start()
+            if index < len(self._processes):
+                self._processes[index] = process
+            else:
+                self._processes.append(process)
+
+    ## Stop every worker and wait for them to exit.
+    #
+    # A worker still running after timeout is terminated. The ring of a worker that does not exit
+    # even then stays closed and Start() does not replace it, so no two workers write to one ring.
+    # @param timeout float, seconds to wait per worker (None = forever)
+    def Stop(self, timeout=None):
+        for ring in self.Rings:
+            ring.Header.Closed = 1
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(timeout)
+        for index, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                self._processes[index] = None
+                self.Rings[index].Header.Closed = 0
+
+    ## Status of an engine's worker.
+    # @param index int, engine index
+    # @return int, #WORKERSTATUS value, or the #ERRCODE of a failed connect
+    def Status(self, index):
+        return self.Rings[index].Header.Status
+
+    ## Number of records waiting, over all engines.
+    # @return int
+    def Pending(self):
+        return sum(ring.Pending() for ring in self.Rings)
+
+    ## Wait for records from any engine.
+    #
+    # Polls the rings with the workers' backoff, since there is no cross-process wakeup.
+    # @param timeout float, seconds (None = forever)
+    # @return bool, True if records are waiting
+    def Wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sleep = 0.0
+        while not self.Pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            sleep = min(self.MaxSleep, sleep * 2) if sleep else self.MinSleep
+            time.sleep(sleep)
+        return True
+
+    ## Take the waiting records of one engine.
+    # @param index int, engine index
+    # @param maxcount int, largest batch (None = all waiting)
+    # @return list of PyEpocPump::EventRecord copies
+    def Drain(self, index, maxcount=None):
+        return self.Rings[index].Drain(maxcount)
+
+    ## Take the waiting records of every engine.
+    # @param maxcount int, largest batch per engine (None = all waiting)
+    # @return list of (engine index, list of EventRecord), for engines with records only
+    def DrainAll(self, maxcount=None):
+        batches = []
+        for index, ring in enumerate(self.Rings):
+            if ring.Pending():
+                batches.append((index, ring.Drain(maxcount)))
+        return batches
+
+    ## Counters of an engine.
+    # @param index int, engine index
+    # @return (received, overflows), events taken by the worker and events dropped on a full ring
+    def Counters(self, index):
+        header = self.Rings[index].Header
+        return header.Received, header.Overflows
+
+    ## Stop the workers and remove the shared rings.
+    def Close(self):
+        self.Stop()
+        for ring in self.Rings:
+            ring.Unlink()
+        self.Rings = []
+        self._workers = []
+        self._processes = []
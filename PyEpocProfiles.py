@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""User profile caching for PyEpoc"""
+## @package PyEpocProfiles
+# User profile cache.
+#
+# ProfileCache keeps serialized user profiles in memory by name, each with a content hash, and
+# remembers which profile each engine user was last given. Apply() uploads a profile with
+# EE_SetUserProfile() only when the engine does not already hold identical bytes, so switching
+# subjects between headsets costs a dictionary lookup when nothing changed. Profiles missing from
+# the cache are loaded on first use through an optional loader function.
+#
+# ProfileRepository stores profiles as files in a directory. Saves are written by a background
+# thread in batches, through a temporary file and an atomic rename, so the caller never waits for
+# the disk; Preload() reads a whole directory with parallel threads.
+#
+# @code
+# cache = ProfileCache(EmotivEngine, loader=lambda name: open(name + ".emu", "rb").read())
+# cache.Apply(0, "subject-07")        # loads the file and uploads it
+# cache.Apply(0, "subject-07")        # no-op, the engine already holds it
+# cache.Fetch(0, "subject-07")        # after training: keep the engine's updated profile
+# @endcode
+
+import collections
+import hashlib
+import os
+import threading
+import time
+
+from PyEpoc import ERRCODE
+
+## @class ProfileCache
+# \brief Profiles by name, with least-recently-used eviction.
+#
+# The cache only knows about profile changes that go through it. After training or parameter
+# changes made directly on the handler, call Fetch() to keep the updated profile, or Invalidate()
+# so the next Apply() uploads again.
+class ProfileCache:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param maxbytes int, largest total size of the cached profiles (None = unlimited)
+    # @param maxentries int, largest number of cached profiles (None = unlimited)
+    # @param loader function(name) returning the profile bytes, or None if there is no such profile (default: none)
+    def __init__(self, handler, maxbytes=64 << 20, maxentries=None, loader=None):
+        self.Handler = handler
+        self.MaxBytes = maxbytes
+        self.MaxEntries = maxentries
+        self.Loader = loader
+        ## total size of the cached profiles
+        self.Bytes = 0
+        ## lookups (Get(), Apply()) answered from the cache
+        self.Hits = 0
+        ## lookups that went to the loader
+        self.Misses = 0
+        ## EE_SetUserProfile() calls made by Apply()
+        self.Uploads = 0
+        ## Apply() calls skipped because the engine already held the profile
+        self.Skipped = 0
+        ## profiles evicted to stay within MaxBytes / MaxEntries
+        self.Evictions = 0
+        self._profiles = collections.OrderedDict()  # name: (bytes, digest), least recently used first
+        self._engine = {}  # userid: digest of the profile the engine holds
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __contains__(self, name):
+        return name in self._profiles
+
+    ## Content hash of a profile.
+    # @param data bytes
+    # @return str, hex digest
+    @staticmethod
+    def Digest(data):
+        return hashlib.sha1(data).hexdigest()
+
+    ## Add or replace a profile.
+    # @param name str, profile name
+    # @param data bytes or buffer, serialized profile (buffers are copied once)
+    # @return str, content hash
+    def Put(self, name, data):
+        data = bytes(data)
+        digest = self.Digest(data)
+        self.Remove(name)
+        self._profiles[name] = (data, digest)
+        self.Bytes += len(data)
+        self._Evict()
+        return digest
+
+    ## Get a profile, loading it if it is not cached.
+    # @param name str, profile name
+    # @return bytes, or None if the profile is neither cached nor found by the loader
+    def Get(self, name):
+        entry = self._Entry(name)
+        return entry[0] if entry is not None else None
+
+    ## Content hash of a profile.
+    # @param name str, profile name
+    # @return str, or None if the profile is not cached (the loader is not called)
+    def Hash(self, name):
+        entry = self._profiles.get(name)
+        return entry[1] if entry is not None else None
+
+    ## Remove a profile from the cache.
+    # @param name str, profile name
+    def Remove(self, name):
+        entry = self._profiles.pop(name, None)
+        if entry is not None:
+            self.Bytes -= len(entry[0])
+
+    ## Give a user a profile.
+    #
+    # Calls EE_SetUserProfile() unless the last profile the cache gave the user, or fetched from it,
+    # has the same content hash.
+    # @param userid int, user ID
+    # @param name str, profile name
+    # @param force bool, upload even if the engine holds the same profile
+    # @return #ERRCODE (EDK_INVALID_PROFILE_ARCHIVE if there is no such profile)
+    def Apply(self, userid, name, force=False):
+        entry = self._Entry(name)
+        if entry is None:
+            return ERRCODE['EDK_INVALID_PROFILE_ARCHIVE']
+        data, digest = entry[0], entry[1]
+        if not force and self._engine.get(userid) == digest:
+            self.Skipped += 1
+            return ERRCODE['EDK_OK']
+        self._engine.pop(userid, None)
+        code = self.Handler._EE_SetUserProfile(userid, data, len(data))
+        self.Uploads += 1
+        if code == ERRCODE['EDK_OK']:
+            self._engine[userid] = digest
+        return code
+
+    ## Read a user's profile from the engine into the cache.
+    #
+    # Use after training, so the trained profile replaces the cached one.
+    # @param userid int, user ID
+    # @param name str, profile name to store it under
+    # @return (#ERRCODE, bytes), bytes is None on errors
+    def Fetch(self, userid, name):
+        code, view = self.Handler.get_user_profile(userid)
+        if code != ERRCODE['EDK_OK']:
+            return (code, None)
+        self._engine[userid] = self.Put(name, view)
+        return (code, self._profiles[name][0])
+
+    ## Forget which profile the engine holds for a user (e.g. after EE_UserRemoved or direct parameter changes).
+    # @param userid int, user ID (None = every user)
+    def Invalidate(self, userid=None):
+        if userid is None:
+            self._engine.clear()
+        else:
+            self._engine.pop(userid, None)
+
+    ## Drop every profile and the engine state.
+    def Clear(self):
+        self._profiles.clear()
+        self._engine.clear()
+        self.Bytes = 0
+
+    ## Release the cached profiles.
+    def Close(self):
+        self.Clear()
+
+    ## \internal
+    # Cached (bytes, digest) of a profile, loading it on a miss; marks it as most recently used.
+    def _Entry(self, name):
+        entry = self._profiles.pop(name, None)
+        if entry is not None:
+            self.Hits += 1
+            self._profiles[name] = entry
+            return entry
+        if self.Loader is None:
+            return None
+        self.Misses += 1
+        data = self.Loader(name)
+        if data is None:
+            return None
+        self.Put(name, data)
+        return self._profiles[name]
+
+    ## \internal
+    # Evict least recently used profiles until the limits are met; the newest profile always stays.
+    def _Evict(self):
+        while len(self._profiles) > 1 and ((self.MaxBytes is not None and self.Bytes > self.MaxBytes) or
+                                           (self.MaxEntries is not None and len(self._profiles) > self.MaxEntries)):
+            self.Remove(next(iter(self._profiles)))
+            self.Evictions += 1
+
+## @class ProfileRepository
+# \brief Directory of profile files written in the background.
+#
+# Each profile is one file, <name><extension>. Save() only queues the bytes; a writer thread
+# collects the saves of delay seconds into one batch and writes every file to a temporary name
+# first, then renames it over the old file, so a crash never leaves a half-written profile. A
+# profile saved twice before its batch is written is written once. Load() sees queued saves, so it
+# can serve as ProfileCache's loader.
+#
+# @code
+# repository = ProfileRepository("profiles")
+# cache = ProfileCache(EmotivEngine, loader=repository.Load)
+# repository.Preload(cache)                                    # at start-up, parallel reads
+# ...
+# repository.Save("subject-07", cache.Fetch(0, "subject-07")[1])   # after training, returns at once
+# @endcode
+class ProfileRepository:
+    ## \internal
+    # @param directory str, profile directory (created if missing)
+    # @param extension str, file name extension
+    # @param delay float, seconds a save waits for others to join its batch
+    # @param fsync bool, fsync() every file before renaming it
+    # @param retries int, failed writes of a profile before it is given up (moved to Failed)
+    def __init__(self, directory, extension=".emu", delay=0.25, fsync=True, retries=3):
+        self.Directory = directory
+        self.Extension = extension
+        self.Delay = delay
+        self.FSync = fsync
+        self.Retries = retries
+        ## files written
+        self.Writes = 0
+        ## batches written
+        self.Batches = 0
+        ## failed writes; the profile stays queued and is retried with the next batch
+        self.Errors = 0
+        ## the latest write error (EnvironmentError), or None
+        self.LastError = None
+        ## profiles given up after Retries failed writes, name: bytes; Save() them again to retry
+        self.Failed = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._pending = {}
+        self._writing = {}
+        self._attempts = {}
+        self._flush = False
+        self._lock = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._Run, name="ProfileRepository")
+        self._thread.daemon = True
+        self._thread.start()
+
+    ## File of a profile.
+    # @param name str, profile name
+    # @return str, path
+    # @exception ValueError the name is not a plain file name
+    def Path(self, name):
+        if not name or name != os.path.basename(name) or name in (os.curdir, os.pardir):
+            raise ValueError("invalid profile name %r" % (name,))
+        return os.path.join(self.Directory, name + self.Extension)
+
+    ## Names of the stored and queued profiles.
+    # @return list of str, sorted
+    def Names(self):
+        names = set(filename[:-len(self.Extension)] for filename in os.listdir(self.Directory)
+                    if filename.endswith(self.Extension))
+        with self._lock:
+            names.update(self._pending)
+            names.update(self._writing)
+            names.update(self.Failed)
+        return sorted(names)
+
+    ## Queue a profile for writing.
+    # @param name str, profile name
+    # @param data bytes or buffer, serialized profile (copied before returning)
+    def Save(self, name, data):
+        self.Path(name)
+        data = bytes(data)
+        with self._lock:
+            self._pending[name] = data
+            self._attempts.pop(name, None)
+            self.Failed.pop(name, None)
+            self._lock.notify_all()
+
+    ## Read a profile.
+    # @param name str, profile name
+    # @return bytes, or None if there is no such profile
+    def Load(self, name):
+        path = self.Path(name)
+        with self._lock:
+            data = self._pending.get(name, self._writing.get(name, self.Failed.get(name)))
+        if data is not None:
+            return data
+        try:
+            with open(path, "rb") as profilefile:
+                return profilefile.read()
+        except EnvironmentError:
+            return None
+
+    ## Read many profiles in parallel.
+    #
+    # @param cache ProfileCache to put the profiles into (default: none)
+    # @param names list of str, profiles to read (default: every stored profile)
+    # @param threads int, reader threads
+    # @return dict, name: bytes of the profiles found
+    def Preload(self, cache=None, names=None, threads=4):
+        names = list(self.Names() if names is None else names)
+        profiles = {}
+        def Read(chunk):
+            for name in chunk:
+                data = self.Load(name)
+                if data is not None:
+                    profiles[name] = data
+        readers = [threading.Thread(target=Read, args=(names[i::threads],)) for i in range(min(threads, len(names)))]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        if cache is not None:
+            for name in names:
+                if name in profiles:
+                    cache.Put(name, profiles[name])
+        return profiles
+
+    ## Delete a profile, queued, given up or stored.
+    #
+    # Waits for a write of the profile that is in progress, so the file cannot reappear afterwards.
+    # @param name str, profile name
+    def Remove(self, name):
+        path = self.Path(name)
+        with self._lock:
+            while name in self._writing:
+                self._lock.wait()
+            self._pending.pop(name, None)
+            self._attempts.pop(name, None)
+            self.Failed.pop(name, None)
+            try:
+                os.remove(path)
+            except EnvironmentError:
+                pass
+
+    ## Wait until every queued profile is written or given up.
+    # @param timeout float, seconds (None = until every profile is written or has used its retries)
+    # @return bool, True if nothing is left to write
+    def Flush(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            self._flush = True
+            self._lock.notify_all()
+            while (self._pending or self._writing) and self._running:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._lock.wait(remaining if remaining is not None else 0.1)
+            done = not (self._pending or self._writing)
+            if done:
+                self._flush = False
+            return done
+
+    ## Write the queued profiles and stop the writer thread.
+    # @param timeout float, seconds to wait for the writes (None = as in Flush())
+    # @return dict, name: bytes of the profiles that were not written (given up or still queued)
+    def Close(self, timeout=None):
+        self.Flush(timeout)
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        self._thread.join()
+        with self._lock:
+            unwritten = dict(self.Failed)
+            unwritten.update(self._pending)
+            return unwritten
+
+    ## \internal
+    # Writer thread: wait for a batch, write it, repeat.
+    def _Run(self):
+        while True:
+            with self._lock:
+                while not self._pending and self._running:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                deadline = time.time() + self.Delay
+                while self._running and not self._flush and time.time() < deadline:
+                    self._lock.wait(deadline - time.time())
+                if not self._running:
+                    return
+                self._flush = False
+                self._writing, self._pending = self._pending, {}
+            failed = {}
+            for name, data in self._writing.items():
+                try:
+                    self._Write(name, data)
+                    self.Writes += 1
+                except EnvironmentError as error:
+                    self.Errors += 1
+                    self.LastError = error
+                    failed[name] = data
+            with self._lock:
+                for name, data in failed.items():
+                    if name in self._pending:
+                        continue    # saved again meanwhile
+                    attempts = self._attempts[name] = self._attempts.get(name, 0) + 1
+                    if attempts < self.Retries:
+                        self._pending[name] = data
+                    else:
+                        del self._attempts[name]
+                        self.Failed[name] = data
+                for name in self._writing:
+                    if name not in failed:
+                        self._attempts.pop(name, None)
+                self._writing = {}
+                self.Batches += 1
+                self._lock.notify_all()
+                if self._pending and failed and self._running:
+                    self._lock.wait(self.Delay)
+
+    ## \internal
+    # Write one file through a temporary name and an atomic rename.
+    def _Write(self, name, data):
+        path = self.Path(name)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as profilefile:
+            profilefile.write(data)
+            profilefile.flush()
+            if self.FSync:
+                os.fsync(profilefile.fileno())
+        _replace(temporary, path)
+
+## \internal
+# Atomic rename over an existing file (os.rename() does not replace files on Windows before Python 3.3).
+_replace = getattr(os, "replace", os.rename)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Background EmoEngine event acquisition for PyEpoc"""
+## @package PyEpocPump
+# Background event acquisition.
+#
+# EventPump polls EmoEngine from a dedicated thread and decodes every event into a bounded,
+# preallocated ring of EventRecord structs. Consumers drain the ring in batches from any one
+# other thread, so acquisition never waits on application processing and an idle engine
+# costs almost no CPU.
+#
+# @code
+# pump = EventPump(EmotivEngine)
+# pump.Start()
+# while True:
+#     if pump.Wait(1.0):
+#         for record in pump.Drain():
+#             print(record.State.Meditation)
+# @endcode
+
+import collections
+import threading
+
+from PyEpoc import ERRCODE, EpocHandler, EventRecord
+
+## @class EventPump
+# \brief Acquisition thread feeding a lock-free ring buffer.
+#
+# The ring is single-producer/single-consumer: the pump thread only advances Head and the
+# consumer only advances Tail, so neither side takes a lock. When the ring is full new events
+# are dropped and counted in Overflows; records are numbered by EventRecord.Sequence in the order
+# the events were received, dropped events included, so a gap in the numbers marks a drop.
+#
+# When EE_EngineGetNextEvent() returns EDK_NO_EVENT the thread sleeps, starting at MinSleep and
+# doubling up to MaxSleep, and goes back to full speed as soon as an event arrives. MaxSleep
+# bounds the latency added by the backoff.
+#
+# @warning The EmoEngine API is not thread-safe. While the pump runs, do not call into the
+# engine from other threads; use Submit() to run calls on the pump thread instead.
+class EventPump:
+    ## \internal
+    # @param handler EpocHandler, connected handler; the pump binds its own handler to the same library
+    # @param capacity int, number of ring slots
+    # @param minsleep float, first backoff sleep in seconds
+    # @param maxsleep float, longest backoff sleep in seconds
+    # @param ondata callable, called on the pump thread after each burst of records (default: none)
+    # @param attach bool, make EpocHandler::get_events() on handler read from this pump while it runs;
+    # the caller of get_events() is then the pump's consumer
+    def __init__(self, handler, capacity=4096, minsleep=0.0005, maxsleep=0.008, ondata=None, attach=False):
+        self.Handler = EpocHandler(handler.EmotivEngineDLL)  # own snapshot buffers, see EpocHandler::snapshot()
+        self.Owner = handler if attach else None
+        self.Capacity = capacity
+        self.Ring = (EventRecord * capacity)()
+        self.Head = 0  # next sequence number to write, pump thread only
+        self.Tail = 0  # next sequence number to read, consumer only
+        self.MinSleep = minsleep
+        self.MaxSleep = maxsleep
+        ## events taken from the engine
+        self.Received = 0
+        ## events dropped because the ring was full
+        self.Overflows = 0
+        ## EE_EngineGetNextEvent() calls that returned EDK_NO_EVENT
+        self.IdlePolls = 0
+        ## EE_EngineGetNextEvent() calls that returned an error
+        self.Errors = 0
+        self.DataReady = threading.Event()
+        ## condition notified with DataReady; EpocHandler::get_events() waits on it while the pump runs
+        self.Ready = threading.Condition()
+        self.OnData = ondata
+        self._commands = collections.deque()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    ## Start the acquisition thread.
+    #
+    # While an attached pump runs, EpocHandler::get_events() on its handler reads from the pump
+    # instead of polling the engine.
+    def Start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._Run, name="EventPump")
+        self._thread.daemon = True
+        self._thread.start()
+        if self.Owner is not None:
+            self.Owner.Pump = self
+
+    ## Stop the acquisition thread and wait for it to exit.
+    # @param timeout float, seconds to wait (None = forever)
+    def Stop(self, timeout=None):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.Owner is not None and self.Owner.Pump is self:
+            self.Owner.Pump = None
+
+    ## Is the acquisition thread running.
+    # @return bool
+    def IsRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    ## Number of records waiting in the ring.
+    # @return int
+    def Pending(self):
+        return self.Head - self.Tail
+
+    ## Wait for records.
+    #
+    # Returns when count records are waiting, after the pump's next notification, or on timeout;
+    # call it again with the remaining time to wait for a whole batch.
+    # @param timeout float, seconds (None = forever)
+    # @param count int, number of records to wait for
+    # @return bool, True if count records are waiting
+    def Wait(self, timeout=None, count=1):
+        if self.Head - self.Tail >= count:
+            return True
+        with self.Ready:
+            self.DataReady.clear()
+            if self.Head - self.Tail < count and self._running:
+                self.Ready.wait(timeout)
+        return self.Head - self.Tail >= count
+
+    ## Look at waiting records without copying them.
+    #
+    # The returned records are ring slots; they stay valid until Release() is called for them.
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of EventRecord
+    def Peek(self, maxcount=None):
+        count = self.Head - self.Tail
+        if maxcount is not None and count > maxcount:
+            count = maxcount
+        ring, capacity, tail = self.Ring, self.Capacity, self.Tail
+        return [ring[(tail + i) % capacity] for i in range(count)]
+
+    ## Hand ring slots back to the pump.
+    # @param count int, number of records consumed, as returned by Peek()
+    def Release(self, count):
+        self.Tail += count
+
+    ## Take waiting records out of the ring.
+    #
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of EventRecord, copies owned by the caller
+    def Drain(self, maxcount=None):
+        records = [EventRecord.from_buffer_copy(record) for record in self.Peek(maxcount)]
+        self.Release(len(records))
+        return records
+
+    ## Run a call on the pump thread.
+    #
+    # The call runs between two polls, so it never overlaps event acquisition. Use this for
+    # blocking or stateful engine calls (training control, profiles) while the pump runs.
+    # @param function callable, e.g. a bound EpocHandler method
+    # @param args tuple, positional arguments
+    # @param callback callable(result, error), called on the pump thread when the call returns;
+    # error is the raised exception or None (default: none)
+    def Submit(self, function, args=(), callback=None):
+        self._commands.append((function, args, callback))
+        self._wake.set()
+
+    ## \internal
+    # Signal consumers that records are waiting.
+    def _Notify(self):
+        with self.Ready:
+            self.DataReady.set()
+            self.Ready.notify_all()
+        if self.OnData is not None:
+            self.OnData()
+
+    ## \internal
+    # Run the calls queued by Submit().
+    def _RunCommands(self):
+        commands = self._commands
+        while commands:
+            function, args, callback = commands.popleft()
+            try:
+                result, error = function(*args), None
+            except Exception as exception:
+                result, error = None, exception
+            if callback is not None:
+                callback(result, error)
+
+    ## \internal
+    # Acquisition loop, runs on the pump thread.
+    def _Run(self):
+        handler = self.Handler
+        engineeventhandle = handler.EE_EmoEngineEventCreate()
+        statehandle = handler.EE_EmoStateCreate()
+        getnextevent = handler._EE_EngineGetNextEvent
+        decode = handler._DecodeEvent
+        ok, noevent = ERRCODE['EDK_OK'], ERRCODE['EDK_NO_EVENT']
+        ring, capacity = self.Ring, self.Capacity
+        sleep = 0.0
+        try:
+            while self._running:
+                if self._commands:
+                    self._RunCommands()
+                code = getnextevent(engineeventhandle)
+                if code != ok:
+                    if code == noevent:
+                        self.IdlePolls += 1
+                    else:
+                        self.Errors += 1
+                    if self.Head != self.Tail:
+                        self._Notify()
+                    sleep = min(self.MaxSleep, sleep * 2) if sleep else self.MinSleep
+                    if self._wake.wait(sleep):
+                        self._wake.clear()
+                    continue
+                sleep = 0.0
+                self.Received += 1
+                if self.Head - self.Tail >= capacity:
+                    self.Overflows += 1
+                    continue
+                record = ring[self.Head % capacity]
+                record.Sequence = self.Received - 1    # dropped events use up their numbers too
+                decode(engineeventhandle, statehandle, record)
+                self.Head += 1
+                if self.Head - self.Tail >= capacity // 2:
+                    self._Notify()
+        finally:
+            self._RunCommands()
+            handler.EE_EmoStateFree(statehandle)
+            handler.EE_EmoEngineEventFree(engineeventhandle)
+            self._Notify()
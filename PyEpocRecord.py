@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""Recording EmoState sessions with PyEpoc"""
+## @package PyEpocRecord
+# Session recording.
+#
+# SessionRecorder keeps decoded EmoStates in memory as typed columns (one array.array per field),
+# so an hour-long session costs a few bytes per value instead of a dict per state, and columns
+# can be handed to NumPy without copying. ContactQualityHistory keeps a rolling window of
+# per-channel contact quality for electrode monitoring.
+#
+# RecordingWriter / RecordingReader store sessions on disk as fixed-size binary records. The
+# reader memory-maps the file, so opening a recording is instant whatever its size, and time
+# ranges are found by binary search on the record time stamps.
+#
+# @code
+# recorder = SessionRecorder()
+# recorder.Append(EmotivEngine.snapshot(statehandle))
+# meditation = recorder.AsNumPy()['Meditation']
+#
+# reader = RecordingReader("session.pyepoc")
+# for record in reader.Range(60.0, 120.0):
+#     print(record.Event.State.Meditation)
+# @endcode
+# @note NumPy is optional; only the NumPy export methods need it.
+
+import array
+import ctypes
+import mmap
+import os
+import struct
+import time
+
+from PyEpoc import INPUTCHANNELS
+from PyEpocPump import EventRecord
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## Recorded columns.
+#
+# (column name, array typecode, EmoStateSnapshot field). Contact quality is recorded as one
+# column per #INPUTCHANNELS entry, named CQ_<channel>.
+RECORDERCOLUMNS = [('Time', 'f', 'Time'),
+                   ('UserId', 'i', 'UserId'),
+                   ('WirelessSignal', 'b', 'WirelessSignal'),
+                   ('ExcitementShortTerm', 'f', 'ExcitementShortTerm'),
+                   ('ExcitementLongTerm', 'f', 'ExcitementLongTerm'),
+                   ('Meditation', 'f', 'Meditation'),
+                   ('Frustration', 'f', 'Frustration'),
+                   ('EngagementBoredom', 'f', 'EngagementBoredom'),
+                   ('CognitivAction', 'i', 'CognitivAction'),
+                   ('CognitivActionPower', 'f', 'CognitivActionPower'),
+                   ('Blink', 'b', 'Blink'),
+                   ('LeftWink', 'b', 'LeftWink'),
+                   ('RightWink', 'b', 'RightWink'),
+                   ('LeftEyelid', 'f', 'LeftEyelid'),
+                   ('RightEyelid', 'f', 'RightEyelid'),
+                   ('UpperFaceAction', 'i', 'UpperFaceAction'),
+                   ('UpperFaceActionPower', 'f', 'UpperFaceActionPower'),
+                   ('LowerFaceAction', 'i', 'LowerFaceAction'),
+                   ('LowerFaceActionPower', 'f', 'LowerFaceActionPower')]
+
+## Contact quality column names, in channel order.
+CONTACTQUALITYCOLUMNS = ['CQ_' + name.replace('EE_CHAN_', '') for name, channel in sorted(INPUTCHANNELS.items(), key=lambda item: item[1])]
+
+## @class SessionRecorder
+# \brief Columnar in-memory EmoState history.
+#
+# Every column is an array.array with spare capacity. Append() writes in place and doubles the
+# capacity when it runs out, so appends are amortized O(1). Growing replaces the arrays instead of
+# resizing them, so NumPy views taken earlier stay valid (they just stop seeing new rows).
+class SessionRecorder:
+    ## \internal
+    # @param capacity int, rows to allocate up front
+    def __init__(self, capacity=1024):
+        self._capacity = max(1, capacity)
+        self._length = 0
+        self.Columns = {}
+        for name in self.ColumnNames():
+            self.Columns[name] = array.array(self._TypeCode(name), [0]) * self._capacity
+        self._Bind()
+
+    ## \internal
+    def __len__(self):
+        return self._length
+
+    ## \internal
+    @staticmethod
+    def _TypeCode(name):
+        for column, typecode, field in RECORDERCOLUMNS:
+            if column == name:
+                return typecode
+        return 'b'  # contact quality
+
+    ## \internal
+    # Cache (column, field) pairs for Append().
+    def _Bind(self):
+        self._fields = [(self.Columns[name], field) for name, typecode, field in RECORDERCOLUMNS]
+        self._contactquality = [self.Columns[name] for name in CONTACTQUALITYCOLUMNS]
+
+    ## \internal
+    # Double the capacity of every column.
+    def _Grow(self):
+        for name, column in self.Columns.items():
+            grown = array.array(column.typecode, [0]) * (self._capacity * 2)
+            grown[:self._length] = column[:self._length]
+            self.Columns[name] = grown
+        self._capacity *= 2
+        self._Bind()
+
+    ## Append a decoded EmoState.
+    #
+    # @param snapshot PyEpoc::EmoStateSnapshot, e.g. from EpocHandler::snapshot() or an EventPump record's State
+    def Append(self, snapshot):
+        if self._length == self._capacity:
+            self._Grow()
+        row = self._length
+        for column, field in self._fields:
+            column[row] = getattr(snapshot, field)
+        contactquality = snapshot.ContactQuality
+        for channel, column in enumerate(self._contactquality):
+            column[row] = contactquality[channel]
+        self._length = row + 1
+
+    ## Decode an EmoState and append it.
+    #
+    # @param handler EpocHandler
+    # @param emostatehandle handle, populated by EE_EmoEngineEventGetEmoState()
+    # @param userid int, user the EmoState belongs to
+    def Record(self, handler, emostatehandle, userid=0):
+        snapshot = handler.snapshot(emostatehandle)
+        snapshot.UserId = userid
+        self.Append(snapshot)
+
+    ## Remove every recorded row.
+    #
+    # Keeps the allocated capacity.
+    def Clear(self):
+        self._length = 0
+
+    ## Get one column.
+    # @param name str, column name
+    # @return array.array, the recorded values (a copy)
+    def Column(self, name):
+        return self.Columns[name][:self._length]
+
+    ## Column names, in recording order.
+    # @return list of str
+    @staticmethod
+    def ColumnNames():
+        return [name for name, typecode, field in RECORDERCOLUMNS] + CONTACTQUALITYCOLUMNS
+
+    ## Columns as NumPy arrays, without copying.
+    #
+    # The arrays share memory with the recorder. A view does not grow with the recording; take a
+    # new one after recording more rows. Clear() lets later rows overwrite viewed memory.
+    # @return dict, column name: numpy.ndarray
+    def AsNumPy(self):
+        if numpy is None:
+            raise ImportError("SessionRecorder.AsNumPy() requires NumPy")
+        return dict((name, numpy.frombuffer(column, dtype=column.typecode, count=self._length))
+                    for name, column in self.Columns.items())
+
+    ## Session as a NumPy structured array.
+    #
+    # Rows are packed from the columns, so this makes one copy.
+    # @return numpy.ndarray, one record per appended EmoState
+    def ToStructuredArray(self):
+        columns = self.AsNumPy()
+        names = self.ColumnNames()
+        result = numpy.empty(self._length, dtype=[(name, columns[name].dtype) for name in names])
+        for name in names:
+            result[name] = columns[name]
+        return result
+
+
+## @class ContactQualityHistory
+# \brief Rolling per-channel contact quality.
+#
+# Keeps the last length contact quality readings as rows of a flat array.array('i'), written by
+# ES_GetContactQualityFromAllChannels() straight into the row, so monitoring electrode drift costs
+# one native call per EmoState and no per-channel Python work. Channels the engine does not report
+# read as 0 (EEG_CQ_NO_SIGNAL).
+class ContactQualityHistory:
+    ## \internal
+    # @param length int, number of readings kept
+    # @param channels int, channels per reading
+    def __init__(self, length=1024, channels=len(INPUTCHANNELS)):
+        self.Length = length
+        self.Channels = channels
+        ## readings, row-major: Values[row * Channels + channel]
+        self.Values = array.array('i', [0]) * (length * channels)
+        ## ES_GetTimeFromStart() of each row
+        self.Times = array.array('f', [0]) * length
+        ## readings appended so far (the newest is row (Count - 1) % Length)
+        self.Count = 0
+        rowsize = ctypes.sizeof(ctypes.c_int) * channels
+        self._rows = [(ctypes.c_int * channels).from_buffer(self.Values, row * rowsize) for row in range(length)]
+
+    def __len__(self):
+        return min(self.Count, self.Length)
+
+    ## Read the contact quality of an EmoState into the history.
+    # @param handler EpocHandler
+    # @param emostatehandle handle, populated by EE_EmoEngineEventGetEmoState()
+    def Record(self, handler, emostatehandle):
+        row = self.Count % self.Length
+        count = handler._ES_GetContactQualityFromAllChannels(emostatehandle, self._rows[row], self.Channels)
+        if count < self.Channels:
+            self._ClearTail(row, count)
+        self.Times[row] = handler._ES_GetTimeFromStart(emostatehandle)
+        self.Count += 1
+
+    ## Append the contact quality of a decoded EmoState.
+    # @param snapshot PyEpoc::EmoStateSnapshot
+    def Append(self, snapshot):
+        row = self.Count % self.Length
+        count = min(snapshot.NumContactQualityChannels, self.Channels, len(snapshot.ContactQuality))
+        if count > 0:
+            ctypes.memmove(self._rows[row], snapshot.ContactQuality, count * ctypes.sizeof(ctypes.c_int))
+        if count < self.Channels:
+            self._ClearTail(row, count)
+        self.Times[row] = snapshot.Time
+        self.Count += 1
+
+    ## \internal
+    # Zero the channels of a row from count on, so no stale reading survives a shorter one.
+    def _ClearTail(self, row, count):
+        count = max(count, 0)
+        size = ctypes.sizeof(ctypes.c_int)
+        ctypes.memset(ctypes.addressof(self._rows[row]) + count * size, 0, (self.Channels - count) * size)
+
+    ## Mean contact quality per channel.
+    #
+    # Compare Mean(last=n) with Mean() to spot electrodes drifting away from good contact.
+    # @param last int, only the newest last readings (None = every reading held)
+    # @return list of float, one per channel (empty if nothing was recorded)
+    def Mean(self, last=None):
+        held = len(self)
+        if last is None or last > held:
+            last = held
+        if not last:
+            return []
+        channels, start = self.Channels, (self.Count - last) % self.Length
+        if numpy is not None:
+            values = numpy.frombuffer(self.Values, dtype='i', count=len(self) * channels).reshape(-1, channels)
+            rows = values[start:start + last] if start + last <= self.Length else \
+                   numpy.concatenate((values[start:], values[:start + last - self.Length]))
+            return rows.mean(axis=0).tolist()
+        # without NumPy: one strided slice per channel and contiguous block (two once wrapped)
+        blocks = [(start, min(start + last, self.Length))]
+        if start + last > self.Length:
+            blocks.append((0, start + last - self.Length))
+        values = self.Values
+        return [sum(sum(values[begin * channels + channel:end * channels:channels]) for begin, end in blocks) / float(last)
+                for channel in range(channels)]
+
+    ## History as NumPy arrays, oldest reading first.
+    #
+    # Until the history wraps around the arrays share memory with it; after that they are copies.
+    # @return (numpy.ndarray times, numpy.ndarray readings of shape (readings, channels))
+    def AsNumPy(self):
+        if numpy is None:
+            raise ImportError("ContactQualityHistory.AsNumPy() requires NumPy")
+        held = len(self)
+        times = numpy.frombuffer(self.Times, dtype='f', count=held)
+        values = numpy.frombuffer(self.Values, dtype='i', count=held * self.Channels).reshape(held, self.Channels)
+        if self.Count > self.Length:
+            start = self.Count % self.Length
+            times = numpy.roll(times, -start)
+            values = numpy.roll(values, -start, axis=0)
+        return times, values
+
+
+########################################[ Files ]#########################################
+# File layout, all little-endian:
+#   header   RECORDINGHEADER, then channelcount x RECORDINGCHANNEL, padded to headersize
+#   records  recordsize-byte RecordedEvent structs, in time stamp order
+######################################################################################
+
+## Recording file magic.
+RECORDINGMAGIC = b"PYEPOCRC"
+
+## Recording schema version, bumped whenever RecordedEvent changes.
+RECORDINGVERSION = 1
+
+## Header: magic, schema version, header size, record size, start time (Unix seconds), channel count.
+RECORDINGHEADER = struct.Struct("<8sHHIdI")
+
+## Channel map entry: channel id, exists, label, x, y, z.
+RECORDINGCHANNEL = struct.Struct("<ii16sddd")
+
+## @struct RecordedEvent
+# \brief One record of a recording file.
+class RecordedEvent(ctypes.Structure):
+    """.Timestamp - seconds since the recording started
+    .Event     - PyEpocPump.EventRecord"""
+
+    _fields_ = [("Timestamp", ctypes.c_double),
+                ("Event", EventRecord)]
+
+## Read the sensor map of the headset.
+#
+# @param handler EpocHandler
+# @return list of (channelid, exist, label, x, y, z), one per #INPUTCHANNELS entry
+def SensorMap(handler):
+    return [(channelid, exist, label.encode("ascii", "replace"), x, y, z)
+            for channelid, exist, label, x, y, z in handler.sensor_montage().Sensors()]
+
+## \internal
+# Monotonic clock in seconds, falling back to time.time() where time.monotonic() is missing.
+def _Clock():
+    return getattr(time, "monotonic", time.time)
+
+## @class RecordingWriter
+# \brief Appends events to a recording file.
+#
+# Records go through a large write buffer; call Close() (or use a with block) to flush them.
+class RecordingWriter:
+    ## \internal
+    # @param path str, file to create (an existing file is replaced)
+    # @param sensors list, channel map as returned by SensorMap() (default: empty)
+    # @param buffersize int, write buffer size in bytes
+    def __init__(self, path, sensors=(), buffersize=1 << 20):
+        self.Path = path
+        self.StartTime = time.time()
+        self.Count = 0
+        self._file = open(path, "wb", buffersize)
+        self._record = RecordedEvent()
+        self._clock = _Clock()
+        self._start = self._clock()
+        channels = b"".join(RECORDINGCHANNEL.pack(channelid, exist, label[:16], x, y, z) for channelid, exist, label, x, y, z in sensors)
+        headersize = RECORDINGHEADER.size + len(channels)
+        headersize += -headersize % 8
+        self.HeaderSize = headersize
+        self._file.write(RECORDINGHEADER.pack(RECORDINGMAGIC, RECORDINGVERSION, headersize, ctypes.sizeof(RecordedEvent), self.StartTime, len(sensors)))
+        self._file.write(channels)
+        self._file.write(b"\0" * (headersize - RECORDINGHEADER.size - len(channels)))
+
+    ## \internal
+    def __enter__(self):
+        return self
+
+    ## \internal
+    def __exit__(self, *exc):
+        self.Close()
+
+    ## Append an event.
+    #
+    # @param record PyEpocPump::EventRecord
+    # @param timestamp float, seconds since the recording started (default: now). Must not go backwards.
+    def Write(self, record, timestamp=None):
+        self._record.Timestamp = self._clock() - self._start if timestamp is None else timestamp
+        self._record.Event = record
+        self._file.write(self._record)
+        self.Count += 1
+
+    ## Append EventPump records.
+    # @param records iterable of PyEpocPump::EventRecord, e.g. from EventPump::Drain()
+    def WriteMany(self, records):
+        for record in records:
+            self.Write(record)
+
+    ## Flush buffered records to the file.
+    def Flush(self):
+        self._file.flush()
+
+    ## Flush and close the file.
+    def Close(self):
+        if not self._file.closed:
+            self._file.close()
+
+## @class RecordingReader
+# \brief Memory-mapped, random-access view of a recording file.
+#
+# Records are read straight from the mapping. Indexing returns RecordedEvent structs that share
+# memory with the file mapping; copy them with RecordedEvent.from_buffer_copy() to keep them past Close().
+class RecordingReader:
+    ## \internal
+    # @param path str, recording file
+    def __init__(self, path):
+        self.Path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < RECORDINGHEADER.size:
+            raise ValueError("%s: not a PyEpoc recording" % path)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, headersize, recordsize, starttime, channelcount = RECORDINGHEADER.unpack_from(self._map, 0)
+        if magic != RECORDINGMAGIC:
+            raise ValueError("%s: not a PyEpoc recording" % path)
+        if version != RECORDINGVERSION:
+            raise ValueError("%s: recording schema version %d is not supported" % (path, version))
+        if recordsize != ctypes.sizeof(RecordedEvent):
+            raise ValueError("%s: record size is %d bytes, expected %d" % (path, recordsize, ctypes.sizeof(RecordedEvent)))
+        channelsend = RECORDINGHEADER.size + channelcount * RECORDINGCHANNEL.size
+        if headersize < channelsend or headersize > size:
+            raise ValueError("%s: header size is %d bytes, expected %d to %d for %d channels" % (path, headersize, channelsend, size, channelcount))
+        self.Version = version
+        self.HeaderSize = headersize
+        self.RecordSize = recordsize
+        self.StartTime = starttime
+        self.Sensors = [RECORDINGCHANNEL.unpack_from(self._map, RECORDINGHEADER.size + i * RECORDINGCHANNEL.size) for i in range(channelcount)]
+        self.Sensors = [(channelid, exist, label.rstrip(b"\0"), x, y, z) for channelid, exist, label, x, y, z in self.Sensors]
+        self._count = (size - headersize) // recordsize  # a torn last record is ignored
+
+    ## \internal
+    def __enter__(self):
+        return self
+
+    ## \internal
+    def __exit__(self, *exc):
+        self.Close()
+
+    ## \internal
+    def __len__(self):
+        return self._count
+
+    ## \internal
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        return RecordedEvent.from_buffer(self._map, self.HeaderSize + index * self.RecordSize)
+
+    ## Get the time stamp of a record without decoding it.
+    # @param index int, record number
+    # @return float, seconds since the recording started
+    def Timestamp(self, index):
+        return struct.unpack_from("<d", self._map, self.HeaderSize + index * self.RecordSize)[0]
+
+    ## Find the first record at or after a time.
+    #
+    # Binary search on the time stamps; O(log n) reads.
+    # @param timestamp float, seconds since the recording started
+    # @return int, record number (len() if every record is earlier)
+    def Find(self, timestamp):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.Timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    ## Iterate the records in a time range.
+    # @param start float, first time stamp included (default: start of the recording)
+    # @param end float, first time stamp excluded (default: end of the recording)
+    # @return generator of RecordedEvent
+    def Range(self, start=None, end=None):
+        first = 0 if start is None else self.Find(start)
+        last = self._count if end is None else self.Find(end)
+        for index in range(first, last):
+            yield self[index]
+
+    ## Records as a NumPy structured array, without copying.
+    #
+    # @param start float, first time stamp included (default: start of the recording)
+    # @param end float, first time stamp excluded (default: end of the recording)
+    # @return numpy.ndarray with the RecordedEvent layout, viewing the file mapping
+    def AsNumPy(self, start=None, end=None):
+        if numpy is None:
+            raise ImportError("RecordingReader.AsNumPy() requires NumPy")
+        first = 0 if start is None else self.Find(start)
+        last = self._count if end is None else self.Find(end)
+        return numpy.frombuffer(self._map, dtype=numpy.dtype(RecordedEvent), count=last - first,
+                                offset=self.HeaderSize + first * self.RecordSize)
+
+    ## Close the mapping and the file.
+    #
+    # Records and arrays obtained from the reader must not be used afterwards.
+    def Close(self):
+        if not self._map.closed:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # records still reference the mapping; it is released with them
+        self._file.close()
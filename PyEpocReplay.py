@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""Replaying recorded sessions through the EpocHandler API"""
+## @package PyEpocReplay
+# Replay engine backend.
+#
+# ReplayEngine is a Python object with the same EE_* / ES_* functions as Emotiv's edk library,
+# serving the events of a PyEpocRecord recording. Bind an EpocHandler to it and the rest of the
+# application runs unchanged, without a headset or EmoComposer.
+#
+# @code
+# EmotivEngine = EpocHandler(ReplayEngine(RecordingReader("session.pyepoc"), speed=10.0))
+# EmotivEngine.EE_EngineConnect()
+# @endcode
+
+import itertools
+import time
+
+from PyEpoc import COGACTION, ERRCODE, EVENT, EXPRSIGNATURE, EmoStateSnapshot
+from PyEpocRecord import RecordedEvent
+
+## EmoStateSnapshot fields compared by ES_ExpressivEqual().
+EXPRESSIVFIELDS = ['Blink', 'LeftWink', 'RightWink', 'EyesOpen', 'LookingUp', 'LookingDown', 'LookingLeft', 'LookingRight',
+                   'LeftEyelid', 'RightEyelid', 'EyeX', 'EyeY', 'UpperFaceAction', 'UpperFaceActionPower',
+                   'LowerFaceAction', 'LowerFaceActionPower']
+
+## EmoStateSnapshot fields compared by ES_AffectivEqual().
+AFFECTIVFIELDS = ['ExcitementShortTerm', 'ExcitementLongTerm', 'Meditation', 'Frustration', 'EngagementBoredom']
+
+## EmoStateSnapshot fields compared by ES_CognitivEqual().
+COGNITIVFIELDS = ['CognitivAction', 'CognitivActionPower', 'CognitivIsActive']
+
+## EmoStateSnapshot fields compared by ES_EmoEngineEqual() (ContactQuality is compared as well).
+EMOENGINEFIELDS = ['Time', 'HeadsetOn', 'WirelessSignal', 'BatteryLevel', 'BatteryMaxLevel', 'NumContactQualityChannels']
+
+## Tuning values ReplayEngine reports until they are set, by parameter.
+TUNINGDEFAULTS = {'ActiveActions'      : COGACTION['COG_NEUTRAL'],
+                  'ActivationLevel'    : 4,
+                  'ActionSensitivity'  : (5, 5, 5, 5),
+                  'SignatureCaching'   : 0,
+                  'SignatureCacheSize' : 0,
+                  'Threshold'          : 500,
+                  'SignatureType'      : EXPRSIGNATURE['EXP_SIG_UNIVERSAL']}
+
+## @class ReplayEngine
+# \brief edk stand-in that plays back a recording.
+#
+# Speed 1.0 plays in real time, N plays N times faster and 0 delivers events as fast as they are
+# polled. EE_EngineConnect() / EE_EngineRemoteConnect() restart playback from the first record.
+# Values that recordings do not hold (Expressiv extents, per-algorithm IsActive flags) read as
+# neutral defaults. Cognitiv and Expressiv tuning reads as the defaults in TUNINGDEFAULTS until it
+# is set; set values are kept per user. Training control and user profiles are not provided: the
+# EpocHandler has no _EE_* function for them, so calling their wrappers raises AttributeError.
+class ReplayEngine:
+    ## \internal
+    # @param reader PyEpocRecord::RecordingReader
+    # @param speed float, playback speed (1.0 = real time, 0 = as fast as possible)
+    # @param loop bool, start over after the last record
+    def __init__(self, reader, speed=1.0, loop=False):
+        self.Reader = reader
+        self.Speed = speed
+        self.Loop = loop
+        self._handles = itertools.count(1)
+        self._events = {}
+        self._states = {}
+        self._clock = getattr(time, "monotonic", time.time)
+        self._users = set()
+        self._tuning = {}
+        self.Rewind()
+
+    ## Restart playback from the first record.
+    def Rewind(self):
+        self.Position = 0
+        self._users.clear()
+        self._start = self._clock()
+
+    ## \internal
+    # Wait-free check of the next record's due time.
+    def _Due(self):
+        if not self.Speed:
+            return True
+        return self._clock() - self._start >= self.Reader.Timestamp(self.Position) / self.Speed
+
+    # ---------------------------------------------------------------- EmoEngine
+
+    def EE_EngineConnect(self, *args):
+        self.Rewind()
+        return ERRCODE['EDK_OK']
+
+    def EE_EngineRemoteConnect(self, *args):
+        return self.EE_EngineConnect()
+
+    def EE_EngineDisconnect(self):
+        return ERRCODE['EDK_OK']
+
+    def EE_EmoEngineEventCreate(self):
+        handle = next(self._handles)
+        self._events[handle] = RecordedEvent()
+        return handle
+
+    EE_ProfileEventCreate = EE_EmoEngineEventCreate
+
+    def EE_EmoEngineEventFree(self, handle):
+        self._events.pop(handle, None)
+
+    def EE_EmoStateCreate(self):
+        handle = next(self._handles)
+        self._states[handle] = EmoStateSnapshot()
+        return handle
+
+    def EE_EmoStateFree(self, handle):
+        self._states.pop(handle, None)
+
+    def EE_EngineGetNextEvent(self, handle):
+        if self.Position >= len(self.Reader):
+            if not self.Loop or not len(self.Reader):
+                return ERRCODE['EDK_NO_EVENT']
+            self.Rewind()
+        if not self._Due():
+            return ERRCODE['EDK_NO_EVENT']
+        self._events[handle] = record = self.Reader[self.Position]
+        self.Position += 1
+        if record.Event.EventType == EVENT['EE_UserAdded']:
+            self._users.add(record.Event.UserId)
+        elif record.Event.EventType == EVENT['EE_UserRemoved']:
+            self._users.discard(record.Event.UserId)
+        return ERRCODE['EDK_OK']
+
+    def EE_EngineClearEventQueue(self, eventtypes):
+        return ERRCODE['EDK_OK']
+
+    def EE_EmoEngineEventGetType(self, handle):
+        return self._events[handle].Event.EventType
+
+    def EE_CognitivEventGetType(self, handle):
+        return self._events[handle].Event.CognitivEvent
+
+    def EE_ExpressivEventGetType(self, handle):
+        return self._events[handle].Event.ExpressivEvent
+
+    def EE_EmoEngineEventGetUserId(self, handle, userid):
+        userid._obj.value = self._events[handle].Event.UserId
+        return ERRCODE['EDK_OK']
+
+    def EE_EmoEngineEventGetEmoState(self, eventhandle, statehandle):
+        event = self._events[eventhandle].Event
+        if event.EventType != EVENT['EE_EmoStateUpdated']:
+            return ERRCODE['EDK_INVALID_PARAMETER']
+        self._states[statehandle] = EmoStateSnapshot.from_buffer_copy(event.State)
+        return ERRCODE['EDK_OK']
+
+    def EE_EngineGetNumUser(self, numusers):
+        numusers._obj.value = len(self._users)
+        return ERRCODE['EDK_OK']
+
+    def EE_HardwareGetVersion(self, userid, version):
+        return ERRCODE['EDK_INVALID_USER_ID']  # not recorded
+
+    def EE_HeadsetGetSensorDetails(self, channelid, descriptor):
+        for sensorid, exist, label, x, y, z in self.Reader.Sensors:
+            if sensorid == channelid:
+                descriptor = descriptor._obj
+                descriptor.ChannelId, descriptor.Exist, descriptor.Label = sensorid, exist, label
+                descriptor.xLoc, descriptor.yLoc, descriptor.zLoc = x, y, z
+                return ERRCODE['EDK_OK']
+        return ERRCODE['EDK_OUT_OF_RANGE']
+
+    # ------------------------------------------------------------------- Tuning
+
+    ## \internal
+    def _Get(self, userid, key):
+        return self._tuning.get((userid, key), TUNINGDEFAULTS[key if isinstance(key, str) else key[0]])
+
+    ## \internal
+    def _Set(self, userid, key, value):
+        self._tuning[(userid, key)] = value
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivSetActiveActions(self, userid, actions):
+        return self._Set(userid, 'ActiveActions', actions)
+
+    def EE_CognitivGetActiveActions(self, userid, actions):
+        actions._obj.value = self._Get(userid, 'ActiveActions')
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivSetActivationLevel(self, userid, level):
+        return self._Set(userid, 'ActivationLevel', level)
+
+    def EE_CognitivGetActivationLevel(self, userid, level):
+        level._obj.value = self._Get(userid, 'ActivationLevel')
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivSetActionSensitivity(self, userid, *sensitivity):
+        return self._Set(userid, 'ActionSensitivity', sensitivity)
+
+    def EE_CognitivGetActionSensitivity(self, userid, *sensitivity):
+        for out, value in zip(sensitivity, self._Get(userid, 'ActionSensitivity')):
+            out._obj.value = value
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivSetSignatureCaching(self, userid, enable):
+        return self._Set(userid, 'SignatureCaching', enable)
+
+    def EE_CognitivGetSignatureCaching(self, userid, enable):
+        enable._obj.value = self._Get(userid, 'SignatureCaching')
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivSetSignatureCacheSize(self, userid, size):
+        return self._Set(userid, 'SignatureCacheSize', size)
+
+    def EE_CognitivGetSignatureCacheSize(self, userid, size):
+        size._obj.value = self._Get(userid, 'SignatureCacheSize')
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivGetTrainedSignatureActions(self, userid, actions):
+        actions._obj.value = 0
+        return ERRCODE['EDK_OK']
+
+    EE_ExpressivGetTrainedSignatureActions = EE_CognitivGetTrainedSignatureActions
+
+    def EE_CognitivGetOverallSkillRating(self, userid, rating):
+        rating._obj.value = 0.0
+        return ERRCODE['EDK_OK']
+
+    def EE_CognitivGetActionSkillRating(self, userid, action, rating):
+        rating._obj.value = 0.0
+        return ERRCODE['EDK_OK']
+
+    def EE_ExpressivSetThreshold(self, userid, algo, threshold, value):
+        return self._Set(userid, ('Threshold', algo, threshold), value)
+
+    def EE_ExpressivGetThreshold(self, userid, algo, threshold, value):
+        value._obj.value = self._Get(userid, ('Threshold', algo, threshold))
+        return ERRCODE['EDK_OK']
+
+    def EE_ExpressivGetTrainedSignatureAvailable(self, userid, available):
+        available._obj.value = 0
+        return ERRCODE['EDK_OK']
+
+    def EE_ExpressivSetSignatureType(self, userid, sigtype):
+        if sigtype != EXPRSIGNATURE['EXP_SIG_UNIVERSAL']:
+            return ERRCODE['EDK_INVALID_PARAMETER']    # nothing is trained
+        return self._Set(userid, 'SignatureType', sigtype)
+
+    def EE_ExpressivGetSignatureType(self, userid, sigtype):
+        sigtype._obj.value = self._Get(userid, 'SignatureType')
+        return ERRCODE['EDK_OK']
+
+    # ----------------------------------------------------------------- EmoState
+
+    def ES_Init(self, handle):
+        self._states[handle] = EmoStateSnapshot()
+
+    def ES_Copy(self, dest, src):
+        self._states[dest] = EmoStateSnapshot.from_buffer_copy(self._states[src])
+
+    def ES_GetTimeFromStart(self, handle):
+        return self._states[handle].Time
+
+    def ES_GetHeadsetOn(self, handle):
+        return self._states[handle].HeadsetOn
+
+    def ES_GetWirelessSignalStatus(self, handle):
+        return self._states[handle].WirelessSignal
+
+    def ES_GetNumContactQualityChannels(self, handle):
+        return self._states[handle].NumContactQualityChannels
+
+    def ES_GetContactQuality(self, handle, channel):
+        state = self._states[handle]
+        return state.ContactQuality[channel] if 0 <= channel < len(state.ContactQuality) else 0
+
+    def ES_GetContactQualityFromAllChannels(self, handle, quality, size):
+        state = self._states[handle]
+        count = min(size, len(state.ContactQuality))
+        quality[:count] = state.ContactQuality[:count]
+        return count
+
+    def ES_GetBatteryChargeLevel(self, handle, level, maxlevel):
+        state = self._states[handle]
+        level._obj.value, maxlevel._obj.value = state.BatteryLevel, state.BatteryMaxLevel
+
+    def ES_ExpressivIsBlink(self, handle):
+        return self._states[handle].Blink
+
+    def ES_ExpressivIsLeftWink(self, handle):
+        return self._states[handle].LeftWink
+
+    def ES_ExpressivIsRightWink(self, handle):
+        return self._states[handle].RightWink
+
+    def ES_ExpressivIsEyesOpen(self, handle):
+        return self._states[handle].EyesOpen
+
+    def ES_ExpressivIsLookingUp(self, handle):
+        return self._states[handle].LookingUp
+
+    def ES_ExpressivIsLookingDown(self, handle):
+        return self._states[handle].LookingDown
+
+    def ES_ExpressivIsLookingLeft(self, handle):
+        return self._states[handle].LookingLeft
+
+    def ES_ExpressivIsLookingRight(self, handle):
+        return self._states[handle].LookingRight
+
+    def ES_ExpressivGetEyelidState(self, handle, lefteye, righteye):
+        state = self._states[handle]
+        lefteye._obj.value, righteye._obj.value = state.LeftEyelid, state.RightEyelid
+
+    def ES_ExpressivGetEyeLocation(self, handle, x, y):
+        state = self._states[handle]
+        x._obj.value, y._obj.value = state.EyeX, state.EyeY
+
+    def ES_ExpressivGetEyebrowExtent(self, handle):
+        return 0.0
+
+    ES_ExpressivGetSmileExtent = ES_ExpressivGetClenchExtent = ES_ExpressivGetEyebrowExtent
+
+    def ES_ExpressivGetUpperFaceAction(self, handle):
+        return self._states[handle].UpperFaceAction
+
+    def ES_ExpressivGetUpperFaceActionPower(self, handle):
+        return self._states[handle].UpperFaceActionPower
+
+    def ES_ExpressivGetLowerFaceAction(self, handle):
+        return self._states[handle].LowerFaceAction
+
+    def ES_ExpressivGetLowerFaceActionPower(self, handle):
+        return self._states[handle].LowerFaceActionPower
+
+    def ES_ExpressivIsActive(self, handle, type):
+        return 1
+
+    ES_AffectivIsActive = ES_ExpressivIsActive
+
+    def ES_AffectivGetExcitementShortTermScore(self, handle):
+        return self._states[handle].ExcitementShortTerm
+
+    def ES_AffectivGetExcitementLongTermScore(self, handle):
+        return self._states[handle].ExcitementLongTerm
+
+    def ES_AffectivGetMeditationScore(self, handle):
+        return self._states[handle].Meditation
+
+    def ES_AffectivGetFrustrationScore(self, handle):
+        return self._states[handle].Frustration
+
+    def ES_AffectivGetEngagementBoredomScore(self, handle):
+        return self._states[handle].EngagementBoredom
+
+    def ES_CognitivGetCurrentAction(self, handle):
+        return self._states[handle].CognitivAction
+
+    def ES_CognitivGetCurrentActionPower(self, handle):
+        return self._states[handle].CognitivActionPower
+
+    def ES_CognitivIsActive(self, handle):
+        return self._states[handle].CognitivIsActive
+
+    ## \internal
+    def _Equal(self, handlea, handleb, fields):
+        a, b = self._states[handlea], self._states[handleb]
+        return int(all(getattr(a, field) == getattr(b, field) for field in fields))
+
+    def ES_ExpressivEqual(self, handlea, handleb):
+        return self._Equal(handlea, handleb, EXPRESSIVFIELDS)
+
+    def ES_AffectivEqual(self, handlea, handleb):
+        return self._Equal(handlea, handleb, AFFECTIVFIELDS)
+
+    def ES_CognitivEqual(self, handlea, handleb):
+        return self._Equal(handlea, handleb, COGNITIVFIELDS)
+
+    def ES_EmoEngineEqual(self, handlea, handleb):
+        return int(self._Equal(handlea, handleb, EMOENGINEFIELDS) and
+                   list(self._states[handlea].ContactQuality) == list(self._states[handleb].ContactQuality))
+
+    def ES_Equal(self, handlea, handleb):
+        return int(bytes(self._states[handlea]) == bytes(self._states[handleb]))
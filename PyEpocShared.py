@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""Shared-memory ring buffers and EmoState publishing for PyEpoc (Python 3.8 or later)"""
+## @package PyEpocShared
+# Shared-memory transport for fixed-size records.
+#
+# SharedRing is a single-producer/single-consumer ring of ctypes records (by default
+# PyEpocPump::EventRecord) in a multiprocessing.shared_memory block, so decoded events can be
+# handed between processes without pickling. The layout mirrors PyEpocPump::EventPump: the
+# producer only advances Head, the consumer only advances Tail.
+#
+# SharedPublisher / SharedSubscriber broadcast the live event stream of one EpocHandler to any
+# number of local processes. The publisher never waits for subscribers; every slot carries its
+# sequence number, so a subscriber reads records in place and detects records it missed or that
+# were overwritten while it was reading.
+#
+# @code
+# ring = SharedRing(capacity=4096)            # consumer process
+# writer = SharedRing.Attach(ring.Name)       # producer process
+#
+# publisher = SharedPublisher(EmotivEngine, name="epoc")     # engine process
+# publisher.Start()
+# subscriber = SharedSubscriber("epoc")                      # any other process
+# for record in subscriber.Read():
+#     print(record.State.Meditation)
+# @endcode
+# @note Requires Python 3.8 or later.
+
+import ctypes
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from PyEpocPump import EventPump, EventRecord
+
+## \internal
+# Control block at the start of every SharedRing. Head and Tail sit on separate cache lines.
+class _RingHeader(ctypes.Structure):
+    _fields_ = [("Head", ctypes.c_uint64),
+                ("_HeadLine", ctypes.c_char * 56),
+                ("Tail", ctypes.c_uint64),
+                ("_TailLine", ctypes.c_char * 56),
+                ("Capacity", ctypes.c_uint64),
+                ("RecordSize", ctypes.c_uint64),
+                ("Received", ctypes.c_uint64),
+                ("Overflows", ctypes.c_uint64),
+                ("Closed", ctypes.c_uint64),
+                ("Status", ctypes.c_int64)]
+
+## \internal
+# Open an existing shared memory block without handing it to the resource tracker, which would
+# otherwise remove it when the attaching process exits (before Python 3.13 there is no track flag).
+def _AttachMemory(name):
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+## Bytes reserved for the ring header.
+RINGHEADERSIZE = 256
+
+## @class SharedRing
+# \brief SPSC ring of ctypes records in shared memory.
+#
+# The creating side owns the block and removes it with Unlink(). The record type is not stored in
+# the block; both sides must use the same one.
+class SharedRing:
+    ## \internal
+    # @param capacity int, number of slots
+    # @param recordtype ctypes.Structure subclass (default: EventRecord)
+    # @param name str, shared memory name (default: a generated one)
+    # @param create bool, False to attach to an existing ring (see Attach())
+    def __init__(self, capacity=4096, recordtype=EventRecord, name=None, create=True):
+        self.RecordType = recordtype
+        if create:
+            self.Memory = shared_memory.SharedMemory(name, True, RINGHEADERSIZE + capacity * ctypes.sizeof(recordtype))
+        else:
+            self.Memory = _AttachMemory(name)
+        self.Name = self.Memory.name
+        self.Header = _RingHeader.from_buffer(self.Memory.buf)
+        if create:
+            self.Header.Capacity, self.Header.RecordSize = capacity, ctypes.sizeof(recordtype)
+        elif self.Header.RecordSize != ctypes.sizeof(recordtype):
+            self.Close()
+            raise ValueError("%s: record size %d does not match %s" % (name, self.Header.RecordSize, recordtype.__name__))
+        self.Capacity = self.Header.Capacity
+        self.Ring = (recordtype * self.Capacity).from_buffer(self.Memory.buf, RINGHEADERSIZE)
+
+    ## Attach to a ring created by another process.
+    # @param name str, SharedRing.Name of the ring
+    # @param recordtype ctypes.Structure subclass (default: EventRecord)
+    # @return SharedRing
+    @classmethod
+    def Attach(cls, name, recordtype=EventRecord):
+        return cls(recordtype=recordtype, name=name, create=False)
+
+    ## Number of records waiting in the ring.
+    # @return int
+    def Pending(self):
+        return self.Header.Head - self.Header.Tail
+
+    ## Producer: next free slot.
+    #
+    # Fill the slot in place, then call Commit(). Counts the record in Received, and in Overflows
+    # if the ring is full.
+    # @return record slot, or None if the ring is full
+    def Reserve(self):
+        header = self.Header
+        header.Received += 1
+        if header.Head - header.Tail >= self.Capacity:
+            header.Overflows += 1
+            return None
+        return self.Ring[header.Head % self.Capacity]
+
+    ## Producer: publish the slot returned by Reserve().
+    def Commit(self):
+        self.Header.Head += 1
+
+    ## Producer: copy a record into the ring.
+    # @param record recordtype
+    # @return bool, False if the ring was full and the record was dropped
+    def Write(self, record):
+        slot = self.Reserve()
+        if slot is None:
+            return False
+        ctypes.memmove(ctypes.addressof(slot), ctypes.addressof(record), ctypes.sizeof(self.RecordType))
+        self.Commit()
+        return True
+
+    ## Consumer: look at waiting records without copying them.
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of records, ring slots valid until Release()
+    def Peek(self, maxcount=None):
+        tail = self.Header.Tail
+        count = self.Header.Head - tail
+        if maxcount is not None and count > maxcount:
+            count = maxcount
+        ring, capacity = self.Ring, self.Capacity
+        return [ring[(tail + i) % capacity] for i in range(count)]
+
+    ## Consumer: hand ring slots back to the producer.
+    # @param count int, number of records consumed
+    def Release(self, count):
+        self.Header.Tail += count
+
+    ## Consumer: take waiting records out of the ring.
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of records, copies owned by the caller
+    def Drain(self, maxcount=None):
+        recordtype = self.RecordType
+        records = [recordtype.from_buffer_copy(record) for record in self.Peek(maxcount)]
+        self.Release(len(records))
+        return records
+
+    ## Detach from the shared memory block.
+    #
+    # Records returned by Peek() must not be used afterwards.
+    def Close(self):
+        self.Header = self.Ring = None
+        if self.Memory is not None:
+            try:
+                self.Memory.close()
+            except BufferError:
+                pass  # records still reference the block; it is released with them
+            self.Memory = None
+
+    ## Close and remove the shared memory block (creating side).
+    def Unlink(self):
+        memory = self.Memory if self.Memory is not None else _AttachMemory(self.Name)
+        self.Close()
+        memory.close()
+        if not hasattr(memory, "_track"):
+            # an attaching process may have unregistered the name from a shared tracker
+            resource_tracker.register(memory._name, "shared_memory")
+        memory.unlink()
+
+## Sequence number of a slot that is being rewritten.
+WRITING = 2 ** 64 - 1
+
+## \internal
+_SEQUENCESIZE = EventRecord.Sequence.size
+_PAYLOADSIZE = ctypes.sizeof(EventRecord) - _SEQUENCESIZE
+
+## @class SharedPublisher
+# \brief Broadcasts an EpocHandler's events through shared memory.
+#
+# Runs a PyEpocPump::EventPump on the handler and copies every record into a broadcast ring,
+# overwriting the oldest slot when the ring is full. Slot i holds the record with sequence number s
+# where s % Capacity == i; while a slot is being rewritten its Sequence is #WRITING.
+class SharedPublisher:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param capacity int, broadcast ring slots (how far behind a subscriber may fall)
+    # @param name str, shared memory name subscribers attach to (default: a generated one, see Name)
+    def __init__(self, handler, capacity=4096, name=None):
+        self.Ring = SharedRing(capacity, EventRecord, name)
+        self.Name = self.Ring.Name
+        self.Pump = EventPump(handler, ondata=self._Forward)
+
+    ## Start publishing.
+    def Start(self):
+        self.Ring.Header.Closed = 0
+        self.Pump.Start()
+
+    ## Stop publishing. Subscribers see Closed() once they have read everything.
+    def Stop(self):
+        self.Pump.Stop()
+        self._Forward()
+        self.Ring.Header.Closed = 1
+
+    ## Publish one record.
+    #
+    # Called for every pump record; can also be used directly when no pump runs.
+    # @param record EventRecord, its Sequence is replaced by the broadcast sequence number
+    def Publish(self, record):
+        ring, header = self.Ring, self.Ring.Header
+        sequence = header.Head
+        slot = ring.Ring[sequence % ring.Capacity]
+        slot.Sequence = WRITING
+        ctypes.memmove(ctypes.addressof(slot) + _SEQUENCESIZE, ctypes.addressof(record) + _SEQUENCESIZE, _PAYLOADSIZE)
+        slot.Sequence = sequence
+        header.Received += 1
+        header.Head = sequence + 1
+
+    ## \internal
+    # EventPump OnData callback, runs on the pump thread.
+    def _Forward(self):
+        pump = self.Pump
+        records = pump.Peek()
+        for record in records:
+            self.Publish(record)
+        pump.Release(len(records))
+
+    ## Stop publishing and remove the shared memory block.
+    def Close(self):
+        self.Stop()
+        self.Ring.Unlink()
+
+## @class SharedSubscriber
+# \brief Reads a SharedPublisher's stream.
+#
+# Reading only touches shared memory: no locks, copies or system calls (Wait() sleeps only when
+# there is nothing to read). Each subscriber has its own cursor, so subscribers do not affect
+# each other or the publisher.
+class SharedSubscriber:
+    ## \internal
+    # @param name str, SharedPublisher.Name
+    # @param latest bool, start at the next record published (default) rather than the oldest one held
+    def __init__(self, name, latest=True):
+        self.Ring = SharedRing.Attach(name, EventRecord)
+        self.Header = self.Ring.Header
+        head = self.Header.Head
+        ## sequence number of the next record to read
+        self.Cursor = head if latest else max(0, head - self.Ring.Capacity)
+        ## records overwritten before this subscriber read them
+        self.Missed = 0
+
+    ## Number of records published and not read yet.
+    # @return int
+    def Pending(self):
+        return self.Header.Head - self.Cursor
+
+    ## Has the publisher stopped and everything been read.
+    # @return bool
+    def Closed(self):
+        return bool(self.Header.Closed) and self.Header.Head == self.Cursor
+
+    ## Look at unread records in place.
+    #
+    # Records too old to still be in the ring are skipped and counted in Missed. The returned slots
+    # may be overwritten once the publisher laps this subscriber: check Valid() after using a record.
+    # @param maxcount int, largest batch (None = all unread)
+    # @return list of EventRecord slots, in sequence order
+    def Peek(self, maxcount=None):
+        head, capacity = self.Header.Head, self.Ring.Capacity
+        if head - self.Cursor > capacity - 1:
+            # keep one slot of slack for the record being written
+            self.Missed += head - self.Cursor - (capacity - 1)
+            self.Cursor = head - (capacity - 1)
+        count = head - self.Cursor
+        if maxcount is not None and count > maxcount:
+            count = maxcount
+        ring, cursor = self.Ring.Ring, self.Cursor
+        return [ring[(cursor + i) % capacity] for i in range(count)]
+
+    ## Advance past records returned by Peek().
+    # @param count int
+    def Release(self, count):
+        self.Cursor += count
+
+    ## Was a Peek() record still intact.
+    # @param record EventRecord slot from Peek()
+    # @param sequence int, the record's expected sequence number
+    # @return bool, False if the publisher started rewriting the slot
+    @staticmethod
+    def Valid(record, sequence):
+        return record.Sequence == sequence
+
+    ## Take unread records.
+    #
+    # Copies each record and drops copies the publisher overwrote during the copy (counted in Missed).
+    # @param maxcount int, largest batch (None = all unread)
+    # @return list of EventRecord copies
+    def Read(self, maxcount=None):
+        records = []
+        slots = self.Peek(maxcount)
+        sequence = self.Cursor
+        for slot in slots:
+            record = EventRecord.from_buffer_copy(slot)
+            if record.Sequence == sequence and slot.Sequence == sequence:
+                records.append(record)
+            else:
+                self.Missed += 1
+            sequence += 1
+        self.Cursor = sequence
+        return records
+
+    ## Wait for records.
+    #
+    # Spins briefly, then sleeps with a doubling backoff up to maxsleep.
+    # @param timeout float, seconds (None = forever)
+    # @param maxsleep float, longest sleep in seconds
+    # @return bool, True if records are waiting
+    def Wait(self, timeout=None, maxsleep=0.004):
+        header = self.Header
+        deadline = None if timeout is None else time.time() + timeout
+        sleep = 0.0
+        while header.Head == self.Cursor:
+            if header.Closed or (deadline is not None and time.time() >= deadline):
+                return False
+            sleep = min(maxsleep, sleep * 2) if sleep else 0.0001
+            time.sleep(sleep)
+        return True
+
+    ## Detach from the stream.
+    def Close(self):
+        self.Header = None
+        self.Ring.Close()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Simulated EmoEngine for running PyEpoc without a headset"""
+## @package PyEpocSim
+# Simulated EmoEngine backend for PyEpoc.
+#
+# Builds stub/edkstub.c into a shared library that implements the EE_* / ES_* surface of
+# Emotiv's edk library and generates deterministic EmoState events at a configurable rate
+# for any number of users. An EpocHandler bound to it behaves like one bound to the real
+# SDK, so the wrapper can be run and benchmarked on build hosts and in CI.
+#
+# @code
+# engine = SimulatedEngine(rate=128.0, users=2)
+# EmotivEngine = engine.Handler()
+# @endcode
+
+import ctypes
+import os
+import subprocess
+import tempfile
+
+from PyEpoc import EpocHandler
+
+## Path of the simulator source.
+STUBSOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub", "edkstub.c")
+
+## Simulator control function prototypes.
+#
+# Same layout as PyEpoc::PROTOTYPES, for the SIM_* functions that only exist in the stub.
+SIMPROTOTYPES = {'SIM_Configure'        : (None, [ctypes.c_double, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]),
+                 'SIM_Now'              : (ctypes.c_double, []),
+                 'SIM_SetTraining'      : (None, [ctypes.c_double, ctypes.c_uint]),
+                 'SIM_GetEventCount'    : (ctypes.c_ulong, []),
+                 'SIM_GetSetCount'      : (ctypes.c_ulong, []),
+                 'SIM_EventGetDueTime'  : (ctypes.c_double, [ctypes.c_void_p])}
+
+## Compile the simulator.
+#
+# @param source str, path to edkstub.c
+# @param library str, output path (default: a fresh temporary directory)
+# @param compiler str, C compiler command
+# @return str, path of the shared library
+def BuildSimulator(source=STUBSOURCE, library=None, compiler="cc"):
+    if library is None:
+        library = os.path.join(tempfile.mkdtemp(), "libedkstub.so")
+    subprocess.check_call([compiler, "-O2", "-shared", "-fPIC", "-o", library, source, "-lm"])
+    return library
+
+## @class SimulatedEngine
+# \brief A loaded, configured simulator library.
+#
+# The simulator keeps its state in the library, so all handlers created from the same
+# library share one engine, like handlers bound to the real edk do.
+class SimulatedEngine:
+    ## \internal
+    # @param rate float, EmoStates per second per user (128.0 is the headset rate)
+    # @param users int, number of simulated users (1-8)
+    # @param realtime bool, pace events by their due time; False delivers them as fast as possible
+    # @param maxevents int, stop after this many EmoState events (0 = unlimited)
+    # @param library str, path to an already built simulator (built on demand otherwise)
+    def __init__(self, rate=128.0, users=1, realtime=True, maxevents=0, library=None):
+        if library is None:
+            library = BuildSimulator()
+        self.LibraryPath = library
+        self.EmotivEngineDLL = ctypes.CDLL(library)
+        for name, (restype, argtypes) in SIMPROTOTYPES.items():
+            function = getattr(self.EmotivEngineDLL, name)
+            function.restype = restype
+            function.argtypes = argtypes
+            setattr(self, "_" + name, function)
+        self.Configure(rate, users, realtime, maxevents)
+
+    ## Reconfigure and restart the simulated engine.
+    #
+    # Restarts the event counter and the clock, and re-announces every user with EE_UserAdded.
+    # @param rate float, EmoStates per second per user
+    # @param users int, number of simulated users
+    # @param realtime bool, pace events by their due time
+    # @param maxevents int, stop after this many EmoState events (0 = unlimited)
+    def Configure(self, rate=128.0, users=1, realtime=True, maxevents=0):
+        self.Rate, self.Users, self.Realtime, self.MaxEvents = rate, users, realtime, maxevents
+        self._SIM_Configure(rate, users, int(bool(realtime)), maxevents)
+
+    ## Configure simulated training sessions.
+    #
+    # @param seconds float, time from EE_*TrainingStarted to EE_*TrainingSucceeded in real-time mode
+    # @param failevery int, every failevery-th session of a user ends in EE_*TrainingFailed (0 = never)
+    def SetTraining(self, seconds=0.25, failevery=0):
+        self._SIM_SetTraining(seconds, failevery)
+
+    ## Create an EpocHandler bound to the simulator.
+    # @return EpocHandler
+    def Handler(self):
+        return EpocHandler(self.EmotivEngineDLL)
+
+    ## Read the simulator clock.
+    #
+    # Monotonic clock used for event due times, for latency measurements.
+    # @return float seconds
+    def Now(self):
+        return self._SIM_Now()
+
+    ## Get the time an event was due.
+    #
+    # @param emoengineeventhandle handle, populated by EE_EngineGetNextEvent()
+    # @return float seconds, on the Now() clock
+    def EventDueTime(self, emoengineeventhandle):
+        return self._SIM_EventGetDueTime(emoengineeventhandle)
+
+    ## Get the number of EmoState events generated since the last Configure().
+    # @return int
+    def EventCount(self):
+        return self._SIM_GetEventCount()
+
+    ## Get the number of calls that changed user parameters or uploaded a profile since the last Configure().
+    # @return int
+    def SetCount(self):
+        return self._SIM_GetSetCount()
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""Cognitiv and Expressiv training sessions for PyEpoc"""
+## @package PyEpocTraining
+# Event-driven training.
+#
+# TrainingOrchestrator keeps a queue of training jobs (a #COGACTION or #EXPRESSIVALGO to train) per
+# user and drives each through the training protocol from the EE_CognitivEvent and
+# EE_ExpressivEvent records the application already reads, e.g. from a PyEpocPump::EventPump. It
+# never blocks: Feed() handles a batch of records and issues the next training control calls, so
+# one loop trains every user at the same time. Whether a successful training is accepted is decided
+# by a policy function, or left to Accept()/Reject().
+#
+# @code
+# pump = EventPump(EmotivEngine)
+# pump.Start()
+# trainer = TrainingOrchestrator(EmotivEngine, pump)
+# for userid in (0, 1, 2):
+#     trainer.Queue(userid, 'COG_NEUTRAL')
+#     trainer.Queue(userid, 'COG_PUSH', retries=2)
+#     trainer.Queue(userid, 'EXP_SMILE')
+# while not trainer.Idle():
+#     if pump.Wait(1.0):
+#         for job in trainer.Feed(pump.Drain()):
+#             print(job.UserId, job.Name, job.State)
+# @endcode
+
+import collections
+import time
+
+from PyEpoc import COGACTION, COGEVENT, COGTRAININGCONTROL, ERRCODE, EVENT, EXPEVENT, EXPRESSIVALGO, EXPRTRAININGCONTROL
+
+## Training job states.
+#
+# QUEUED    : \b 0 \n waiting for the jobs queued before it for the same user
+# STARTING  : \b 1 \n training action set and START sent, TrainingStarted not yet received
+# TRAINING  : \b 2 \n the engine is recording the training
+# DECIDING  : \b 3 \n training succeeded, the policy left the decision to Accept() or Reject()
+# ACCEPTING : \b 4 \n ACCEPT sent
+# REJECTING : \b 5 \n REJECT sent
+# COMPLETED : \b 6 \n the engine accepted the training (final)
+# REJECTED  : \b 7 \n rejected, no retries left (final)
+# FAILED    : \b 8 \n training or a training control call failed, no retries left (final)
+# CANCELLED : \b 9 \n cancelled or the user was removed (final)
+TRAININGSTATE = {'QUEUED'    : 0,
+                 'STARTING'  : 1,
+                 'TRAINING'  : 2,
+                 'DECIDING'  : 3,
+                 'ACCEPTING' : 4,
+                 'REJECTING' : 5,
+                 'COMPLETED' : 6,
+                 'REJECTED'  : 7,
+                 'FAILED'    : 8,
+                 'CANCELLED' : 9}
+
+## \internal
+_FINAL = frozenset([TRAININGSTATE['COMPLETED'], TRAININGSTATE['REJECTED'], TRAININGSTATE['FAILED'], TRAININGSTATE['CANCELLED']])
+
+## \internal
+# Per suite: (actions, START, ACCEPT, REJECT, RESET, started, succeeded, failed, completed, rejected, reset events).
+_SUITES = {EVENT['EE_CognitivEvent'] : (COGACTION, COGTRAININGCONTROL['COG_START'], COGTRAININGCONTROL['COG_ACCEPT'],
+                                        COGTRAININGCONTROL['COG_REJECT'], COGTRAININGCONTROL['COG_RESET'],
+                                        COGEVENT['EE_CognitivTrainingStarted'], COGEVENT['EE_CognitivTrainingSucceeded'],
+                                        COGEVENT['EE_CognitivTrainingFailed'], COGEVENT['EE_CognitivTrainingCompleted'],
+                                        COGEVENT['EE_CognitivTrainingRejected'], COGEVENT['EE_CognitivTrainingReset']),
+           EVENT['EE_ExpressivEvent'] : (EXPRESSIVALGO, EXPRTRAININGCONTROL['EXP_START'], EXPRTRAININGCONTROL['EXP_ACCEPT'],
+                                         EXPRTRAININGCONTROL['EXP_REJECT'], EXPRTRAININGCONTROL['EXP_RESET'],
+                                         EXPEVENT['EE_ExpressivTrainingStarted'], EXPEVENT['EE_ExpressivTrainingSucceeded'],
+                                         EXPEVENT['EE_ExpressivTrainingFailed'], EXPEVENT['EE_ExpressivTrainingCompleted'],
+                                         EXPEVENT['EE_ExpressivTrainingRejected'], EXPEVENT['EE_ExpressivTrainingReset'])}
+
+## @class TrainingJob
+# \brief One action to train for one user.
+class TrainingJob:
+    """.UserId   - user ID
+    .Suite    - EVENT, EE_CognitivEvent or EE_ExpressivEvent
+    .Action   - COGACTION or EXPRESSIVALGO value
+    .Name     - COGACTION or EXPRESSIVALGO name
+    .State    - TRAININGSTATE
+    .Attempts - training sessions started
+    .Retries  - sessions to start again after a failed or rejected one
+    .Code     - ERRCODE of the latest failed training control call, or EDK_OK
+    .Started  - time.time() of the first START, or None
+    .Finished - time.time() the job reached a final state, or None"""
+
+    ## \internal
+    def __init__(self, userid, suite, action, name, retries):
+        self.UserId = userid
+        self.Suite = suite
+        self.Action = action
+        self.Name = name
+        self.State = TRAININGSTATE['QUEUED']
+        self.Attempts = 0
+        self.Retries = retries
+        self.Code = ERRCODE['EDK_OK']
+        self.Started = self.Finished = None
+
+    ## Has the job reached a final state.
+    # @return bool
+    def Done(self):
+        return self.State in _FINAL
+
+## @class TrainingOrchestrator
+# \brief Trains queued actions for many users from their training events.
+#
+# Each user trains one job at a time, in queue order; users train concurrently. A failed training
+# session, or one the policy rejects, is started again while the job has retries left.
+#
+# Training control calls go through EventPump::Submit() while the pump runs, because the engine
+# must not be called from two threads; without a running pump they are made directly. Feed(),
+# Accept(), Reject() and Cancel() must be called from one thread, normally the pump's consumer.
+class TrainingOrchestrator:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param pump PyEpocPump::EventPump the records come from (default: none, calls are made directly)
+    # @param policy callable(job), True to accept a successful training, False to reject it, None to
+    # leave it DECIDING for Accept() or Reject() (default: accept every training)
+    # @param retries int, default retries of queued jobs
+    # @param onfinished callable(job), called from Feed() when a job reaches a final state (default: none)
+    def __init__(self, handler, pump=None, policy=None, retries=0, onfinished=None):
+        self.Handler = handler
+        self.Pump = pump
+        self.Policy = policy if policy is not None else (lambda job: True)
+        self.Retries = retries
+        self.OnFinished = onfinished
+        ## training events not matching an active job
+        self.Ignored = 0
+        self._queues = {}     # userid: deque of QUEUED jobs
+        self._active = {}     # userid: job in training
+        self._resets = {}     # userid: TrainingReset events still due for cancelled jobs
+        self._errors = collections.deque()  # (job, code) of failed calls, filled on the pump thread
+        self._finished = []
+        self._calls = {EVENT['EE_CognitivEvent'] : (handler.EE_CognitivSetTrainingAction, handler.EE_CognitivSetTrainingControl),
+                       EVENT['EE_ExpressivEvent'] : (handler.EE_ExpressivSetTrainingAction, handler.EE_ExpressivSetTrainingControl)}
+
+    ## Queue an action for training.
+    #
+    # The user's first queued job starts at once if the user is not training.
+    # @param userid int, user ID
+    # @param action str or int, #COGACTION or #EXPRESSIVALGO name, or a value of the suite's table
+    # @param suite #EVENT, EE_CognitivEvent or EE_ExpressivEvent; only needed for int actions (default: EE_CognitivEvent)
+    # @param retries int, sessions to start again after a failure or rejection (default: Retries)
+    # @return TrainingJob
+    # @exception KeyError unknown action name
+    def Queue(self, userid, action, suite=None, retries=None):
+        if isinstance(action, str):
+            suite = EVENT['EE_CognitivEvent'] if action in COGACTION else EVENT['EE_ExpressivEvent']
+            name, action = action, _SUITES[suite][0][action]
+        else:
+            suite = EVENT['EE_CognitivEvent'] if suite is None else suite
+            names = [key for key, value in _SUITES[suite][0].items() if value == action]
+            name = names[0] if names else str(action)
+        job = TrainingJob(userid, suite, action, name, self.Retries if retries is None else retries)
+        self._queues.setdefault(userid, collections.deque()).append(job)
+        if userid not in self._active:
+            self._StartNext(userid)
+        return job
+
+    ## Handle a batch of records and advance the training of their users.
+    #
+    # Records other than training events and EE_UserRemoved are skipped, so every record read can
+    # be passed in.
+    # @param records iterable of EventRecord
+    # @return list of TrainingJob that reached a final state
+    def Feed(self, records):
+        cognitiv, expressiv, removed = EVENT['EE_CognitivEvent'], EVENT['EE_ExpressivEvent'], EVENT['EE_UserRemoved']
+        for record in records:
+            eventtype = record.EventType
+            if eventtype == cognitiv:
+                self._Event(record.UserId, eventtype, record.CognitivEvent)
+            elif eventtype == expressiv:
+                self._Event(record.UserId, eventtype, record.ExpressivEvent)
+            elif eventtype == removed:
+                self._Removed(record.UserId)
+        return self._Collect()
+
+    ## Accept a DECIDING job.
+    # @param job TrainingJob
+    def Accept(self, job):
+        if job.State == TRAININGSTATE['DECIDING']:
+            self._Control(job, TRAININGSTATE['ACCEPTING'], _SUITES[job.Suite][2])
+
+    ## Reject a DECIDING job; it trains again if it has retries left.
+    # @param job TrainingJob
+    def Reject(self, job):
+        if job.State == TRAININGSTATE['DECIDING']:
+            self._Control(job, TRAININGSTATE['REJECTING'], _SUITES[job.Suite][3])
+
+    ## Cancel a job.
+    #
+    # A queued job is dropped; an active one is reset in the engine and the user's next job starts.
+    # @param job TrainingJob
+    # @return list of TrainingJob that reached a final state
+    def Cancel(self, job):
+        if job.Done():
+            return []
+        if self._active.get(job.UserId) is job:
+            self._Call(job, self._calls[job.Suite][1], _SUITES[job.Suite][4])
+            self._resets[job.UserId] = self._resets.get(job.UserId, 0) + 1
+            del self._active[job.UserId]
+            self._Finish(job, TRAININGSTATE['CANCELLED'])
+            self._StartNext(job.UserId)
+        else:
+            self._queues[job.UserId].remove(job)
+            self._Finish(job, TRAININGSTATE['CANCELLED'])
+        return self._Collect()
+
+    ## Jobs not yet finished.
+    # @param userid int, only this user's jobs (default: every user)
+    # @return list of TrainingJob, active jobs first
+    def Jobs(self, userid=None):
+        users = sorted(set(self._active) | set(self._queues)) if userid is None else [userid]
+        jobs = [self._active[user] for user in users if user in self._active]
+        for user in users:
+            jobs.extend(self._queues.get(user, ()))
+        return jobs
+
+    ## Is every job finished.
+    # @return bool
+    def Idle(self):
+        return not self._active and not any(self._queues.values())
+
+    ## \internal
+    # Training event of one user.
+    def _Event(self, userid, suite, event):
+        started, succeeded, failed, completed, rejected, reset = _SUITES[suite][5:]
+        if event == reset and self._resets.get(userid):
+            self._resets[userid] -= 1
+            return
+        job = self._active.get(userid)
+        if job is None or job.Suite != suite:
+            self.Ignored += 1
+            return
+        state = job.State
+        if event == started and state == TRAININGSTATE['STARTING']:
+            job.State = TRAININGSTATE['TRAINING']
+        elif event == succeeded and state in (TRAININGSTATE['STARTING'], TRAININGSTATE['TRAINING']):
+            job.State = TRAININGSTATE['DECIDING']
+            decision = self.Policy(job)
+            if decision is not None:
+                (self.Accept if decision else self.Reject)(job)
+        elif event == completed and state == TRAININGSTATE['ACCEPTING']:
+            self._End(job, TRAININGSTATE['COMPLETED'])
+        elif event == rejected and state == TRAININGSTATE['REJECTING']:
+            self._Retry(job, TRAININGSTATE['REJECTED'])
+        elif event in (failed, reset) and state in (TRAININGSTATE['STARTING'], TRAININGSTATE['TRAINING']):
+            self._Retry(job, TRAININGSTATE['FAILED'])
+        else:
+            self.Ignored += 1
+
+    ## \internal
+    # The user left: cancel the active and queued jobs.
+    def _Removed(self, userid):
+        self._resets.pop(userid, None)
+        job = self._active.pop(userid, None)
+        if job is not None:
+            self._Finish(job, TRAININGSTATE['CANCELLED'])
+        for job in self._queues.pop(userid, ()):
+            self._Finish(job, TRAININGSTATE['CANCELLED'])
+
+    ## \internal
+    # Start the active job again, or end it in the given final state.
+    def _Retry(self, job, state):
+        if job.Attempts <= job.Retries:
+            self._Start(job)
+        else:
+            self._End(job, state)
+
+    ## \internal
+    # End the active job and start the user's next one.
+    def _End(self, job, state):
+        del self._active[job.UserId]
+        self._Finish(job, state)
+        self._StartNext(job.UserId)
+
+    ## \internal
+    def _Finish(self, job, state):
+        job.State = state
+        job.Finished = time.time()
+        self._finished.append(job)
+
+    ## \internal
+    def _StartNext(self, userid):
+        queue = self._queues.get(userid)
+        if queue:
+            job = queue.popleft()
+            self._active[userid] = job
+            self._Start(job)
+
+    ## \internal
+    # Set the training action and send START.
+    def _Start(self, job):
+        setaction, setcontrol = self._calls[job.Suite]
+        job.Attempts += 1
+        if job.Started is None:
+            job.Started = time.time()
+        job.State = TRAININGSTATE['STARTING']
+        self._Call(job, _SetAndStart, setaction, setcontrol, job.Action, _SUITES[job.Suite][1])
+
+    ## \internal
+    def _Control(self, job, state, control):
+        job.State = state
+        self._Call(job, self._calls[job.Suite][1], control)
+
+    ## \internal
+    # Call a training function on the pump thread, or directly without a running pump.
+    def _Call(self, job, function, *arguments):
+        pump = self.Pump
+        if pump is not None and pump.IsRunning():
+            pump.Submit(function, (job.UserId,) + arguments, lambda code, error: self._Result(job, code, error))
+        else:
+            self._Result(job, function(job.UserId, *arguments), None)
+
+    ## \internal
+    # Note a failed call; may run on the pump thread, so the job is failed later by _Collect().
+    def _Result(self, job, code, error):
+        if error is not None or code != ERRCODE['EDK_OK']:
+            self._errors.append((job, ERRCODE['EDK_UNKNOWN_ERROR'] if error is not None else code))
+
+    ## \internal
+    # Fail the jobs whose calls failed, then hand out the finished jobs.
+    def _Collect(self):
+        errors = self._errors
+        while errors:
+            job, code = errors.popleft()
+            job.Code = code
+            if self._active.get(job.UserId) is job:
+                self._End(job, TRAININGSTATE['FAILED'])
+        finished, self._finished = self._finished, []
+        if self.OnFinished is not None:
+            for job in finished:
+                self.OnFinished(job)
+        return finished
+
+## \internal
+# Set the training action, then send START only if that succeeded.
+def _SetAndStart(userid, setaction, setcontrol, action, start):
+    code = setaction(userid, action)
+    return setcontrol(userid, start) if code == ERRCODE['EDK_OK'] else code
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Batched Cognitiv and Expressiv tuning for PyEpoc"""
+## @package PyEpocTuning
+# User tuning parameters.
+#
+# UserTuning holds every Cognitiv and Expressiv tuning parameter of a user. TuningCache reads
+# them from the engine in one pass over the raw functions, reusing the same ctypes output
+# variables, and remembers the last tuning it read or applied for each user. Apply() then calls
+# the setters only for parameters that differ from that copy, so re-applying the settings of many
+# users after a reconnect costs no engine calls for the parameters that did not change.
+#
+# @code
+# tuning = TuningCache(EmotivEngine)
+# settings = UserTuning(ActivationLevel=4, ActiveActions=COGACTION['COG_PUSH'] | COGACTION['COG_LIFT'],
+#                       Thresholds={'EXP_SMILE': 600})
+# for userid in users:
+#     tuning.Apply(userid, settings)        # only the parameters that differ are set
+# code, current = tuning.Read(0)
+# print(current.ActionSensitivity)
+# @endcode
+
+import ctypes
+
+from PyEpoc import ERRCODE, EVENT, EXPRESSIVALGO, EXPRTHRESHOLD
+
+## \internal
+# Expressiv algorithms in #EXPRESSIVALGO value order.
+_ALGOS = sorted(EXPRESSIVALGO.items(), key=lambda item: item[1])
+
+## @class UserTuning
+# \brief Tuning parameters of one user.
+#
+# A field left None is not part of the tuning: TuningCache::Apply() leaves it unchanged in the
+# engine. Thresholds may name only some algorithms.
+class UserTuning:
+    """.ActivationLevel    - int, Cognitiv activation level (1-7)
+    .ActionSensitivity  - tuple of 4 int, sensitivity of the active Cognitiv actions (1-10)
+    .ActiveActions      - int, COGACTION bit vector
+    .SignatureCaching   - int, Cognitiv signature caching (1 enable/0 disable)
+    .SignatureCacheSize - int, Cognitiv signature cache size (0 = unlimited)
+    .Thresholds         - dict, EXPRESSIVALGO name: EXP_SENSITIVITY threshold (0-1000)
+    .SignatureType      - EXPRSIGNATURE, Expressiv signature"""
+
+    ## Field names, in the order TuningCache::Apply() sets them.
+    FIELDS = ('ActiveActions', 'ActivationLevel', 'ActionSensitivity', 'SignatureCaching', 'SignatureCacheSize',
+              'Thresholds', 'SignatureType')
+
+    ## \internal
+    # @param fields field values by name (default: None, not part of the tuning)
+    # @exception TypeError unknown field
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError("unknown UserTuning fields: %s" % ", ".join(sorted(fields)))
+        if self.ActionSensitivity is not None:
+            self.ActionSensitivity = tuple(self.ActionSensitivity)
+
+    ## Copy with its own Thresholds dictionary.
+    # @return UserTuning
+    def Copy(self):
+        copy = UserTuning(**self.AsDict())
+        if copy.Thresholds is not None:
+            copy.Thresholds = dict(copy.Thresholds)
+        return copy
+
+    ## Fields that are set here and differ in another tuning.
+    # @param other UserTuning
+    # @return list of field names
+    def Diff(self, other):
+        return [name for name in self.FIELDS if getattr(self, name) is not None and getattr(self, name) != getattr(other, name)]
+
+    ## Every field.
+    # @return dict, field name: value
+    def AsDict(self):
+        return dict((name, getattr(self, name)) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, UserTuning) and self.AsDict() == other.AsDict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "UserTuning(%s)" % ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.FIELDS
+                                            if getattr(self, name) is not None)
+
+## @class TuningCache
+# \brief Reads and applies UserTuning, setting only what changed.
+#
+# The cached copy of a user is what the engine held after the last Read() or Apply(). Anything
+# else that changes the engine's parameters makes it stale: call Invalidate() after uploading a
+# profile (EpocHandler::EE_SetUserProfile(), PyEpocProfiles::ProfileCache::Apply()), or pass the
+# event records to Feed(), which invalidates users that are added or removed.
+class TuningCache:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    def __init__(self, handler):
+        self.Handler = handler
+        ## tunings read from the engine
+        self.Reads = 0
+        ## setter calls made by Apply()
+        self.Sets = 0
+        ## parameters Apply() found unchanged and did not set
+        self.Skipped = 0
+        self._tunings = {}
+        self._ints = [ctypes.c_int() for i in range(4)]
+        self._intrefs = [ctypes.byref(value) for value in self._ints]
+        self._ulong = ctypes.c_ulong()
+        self._ulongref = ctypes.byref(self._ulong)
+
+    ## Tuning of a user.
+    #
+    # Algorithms whose threshold cannot be read are left out of Thresholds.
+    # @param userid int, user ID
+    # @param refresh bool, read from the engine even if a cached copy exists
+    # @return (#ERRCODE, UserTuning), a copy owned by the caller; None on errors
+    def Read(self, userid, refresh=False):
+        tuning = None if refresh else self._tunings.get(userid)
+        if tuning is None:
+            code, tuning = self._Read(userid)
+            if code != ERRCODE['EDK_OK']:
+                return (code, None)
+            self._tunings[userid] = tuning
+        return (ERRCODE['EDK_OK'], tuning.Copy())
+
+    ## Apply a tuning to a user.
+    #
+    # The fields of tuning that are not None and differ from the user's cached copy are set; without
+    # a cached copy the tuning is read first. If a setter fails, the cached copy is dropped. A forced
+    # Apply() to a user without a cached copy leaves the user uncached.
+    # @param userid int, user ID
+    # @param tuning UserTuning
+    # @param force bool, set every field that is not None without comparing
+    # @return (#ERRCODE, number of setter calls)
+    def Apply(self, userid, tuning, force=False):
+        ok = ERRCODE['EDK_OK']
+        current = self._tunings.get(userid)
+        if current is None and not force:
+            code, current = self._Read(userid)
+            if code != ok:
+                return (code, 0)
+        partial = current is None
+        if partial:
+            current = UserTuning()    # force without a cached copy: the other fields are unknown
+        handler = self.Handler
+        calls = 0
+        for name in UserTuning.FIELDS:
+            value = getattr(tuning, name)
+            if value is None:
+                continue
+            if name == 'Thresholds':
+                thresholds = current.Thresholds = dict(current.Thresholds or {})
+                sensitivity = EXPRTHRESHOLD['EXP_SENSITIVITY']
+                for algo, threshold in sorted(value.items()):
+                    if not force and thresholds.get(algo) == threshold:
+                        self.Skipped += 1
+                        continue
+                    calls += 1
+                    code = handler._EE_ExpressivSetThreshold(userid, EXPRESSIVALGO[algo], sensitivity, threshold)
+                    if code != ok:
+                        return self._Failed(userid, code, calls)
+                    thresholds[algo] = threshold
+                continue
+            if not force and getattr(current, name) == value:
+                self.Skipped += 1
+                continue
+            calls += 1
+            if name == 'ActionSensitivity':
+                code = handler._EE_CognitivSetActionSensitivity(userid, *value)
+            else:
+                code = getattr(handler, _SETTERS[name])(userid, value)
+            if code != ok:
+                return self._Failed(userid, code, calls)
+            setattr(current, name, value)
+        self.Sets += calls
+        if not partial:
+            self._tunings[userid] = current
+        return (ok, calls)
+
+    ## Forget cached tunings.
+    # @param userid int, only this user (default: every user)
+    def Invalidate(self, userid=None):
+        if userid is None:
+            self._tunings.clear()
+        else:
+            self._tunings.pop(userid, None)
+
+    ## Invalidate the users of EE_UserAdded and EE_UserRemoved records.
+    # @param records iterable of EventRecord
+    def Feed(self, records):
+        added, removed = EVENT['EE_UserAdded'], EVENT['EE_UserRemoved']
+        for record in records:
+            if record.EventType == added or record.EventType == removed:
+                self._tunings.pop(record.UserId, None)
+
+    ## \internal
+    def _Failed(self, userid, code, calls):
+        self.Sets += calls
+        self._tunings.pop(userid, None)
+        return (code, calls)
+
+    ## \internal
+    # Read every parameter through the preallocated output variables.
+    def _Read(self, userid):
+        handler = self.Handler
+        ok = ERRCODE['EDK_OK']
+        ints, refs = self._ints, self._intrefs
+        tuning = UserTuning()
+        code = handler._EE_CognitivGetActiveActions(userid, self._ulongref)
+        if code != ok:
+            return (code, None)
+        tuning.ActiveActions = self._ulong.value
+        code = handler._EE_CognitivGetActivationLevel(userid, refs[0])
+        if code != ok:
+            return (code, None)
+        tuning.ActivationLevel = ints[0].value
+        code = handler._EE_CognitivGetActionSensitivity(userid, refs[0], refs[1], refs[2], refs[3])
+        if code != ok:
+            return (code, None)
+        tuning.ActionSensitivity = (ints[0].value, ints[1].value, ints[2].value, ints[3].value)
+        code = handler._EE_CognitivGetSignatureCaching(userid, refs[0])
+        if code != ok:
+            return (code, None)
+        tuning.SignatureCaching = ints[0].value
+        code = handler._EE_CognitivGetSignatureCacheSize(userid, refs[0])
+        if code != ok:
+            return (code, None)
+        tuning.SignatureCacheSize = ints[0].value
+        thresholds = tuning.Thresholds = {}
+        getthreshold, sensitivity = handler._EE_ExpressivGetThreshold, EXPRTHRESHOLD['EXP_SENSITIVITY']
+        for name, algo in _ALGOS:
+            if getthreshold(userid, algo, sensitivity, refs[0]) == ok:
+                thresholds[name] = ints[0].value
+        code = handler._EE_ExpressivGetSignatureType(userid, refs[0])
+        if code != ok:
+            return (code, None)
+        tuning.SignatureType = ints[0].value
+        self.Reads += 1
+        return (ok, tuning)
+
+## \internal
+# Raw setter of each single-argument field.
+_SETTERS = {'ActiveActions'      : '_EE_CognitivSetActiveActions',
+            'ActivationLevel'    : '_EE_CognitivSetActivationLevel',
+            'SignatureCaching'   : '_EE_CognitivSetSignatureCaching',
+            'SignatureCacheSize' : '_EE_CognitivSetSignatureCacheSize',
+            'SignatureType'      : '_EE_ExpressivSetSignatureType'}
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""Per-user event routing for PyEpoc"""
+## @package PyEpocUsers
+# Multi-user event routing.
+#
+# UserRouter reads EmoEngine events and routes them by user ID. Each user added with
+# EE_UserAdded gets a UserStream with its own EmoState handle, ring buffer of EventRecords and
+# statistics. Every stream is a single-producer/single-consumer ring, so one consumer thread per
+# headset can drain its own user without any lock shared with the other users.
+#
+# @code
+# router = UserRouter(EmotivEngine)
+# router.OnUserAdded = lambda stream: threading.Thread(target=Consume, args=(stream,)).start()
+# router.Start()
+#
+# def Consume(stream):
+#     while stream.Connected or stream.Pending():
+#         if stream.Wait(1.0):
+#             for record in stream.Drain():
+#                 print(record.State.Meditation)
+# @endcode
+
+import ctypes
+import threading
+
+from PyEpoc import ERRCODE, EVENT
+from PyEpocPump import EventRecord
+
+## @class UserStream
+# \brief Events of one user.
+#
+# Filled by the UserRouter thread, drained by one consumer. StateHandle always holds the user's
+# latest EmoState, so ES_* functions can be used on it from the router thread (or any thread while
+# the router is stopped). Once the user is removed and the stream drained, the router frees the
+# handle on its next poll and sets StateHandle to None.
+class UserStream:
+    ## \internal
+    # @param userid int
+    # @param statehandle handle, EmoState handle owned by the router
+    # @param capacity int, number of ring slots
+    def __init__(self, userid, statehandle, capacity):
+        self.UserId = userid
+        self.StateHandle = statehandle
+        self.Capacity = capacity
+        self.Ring = (EventRecord * capacity)()
+        self.Head = 0  # next sequence number to write, router only
+        self.Tail = 0  # next sequence number to read, consumer only
+        ## False once EE_UserRemoved was received
+        self.Connected = True
+        ## events routed to this user
+        self.Received = 0
+        ## EE_EmoStateUpdated events routed to this user
+        self.States = 0
+        ## events dropped because the ring was full
+        self.Overflows = 0
+        ## ES_GetTimeFromStart() of the first and the latest EmoState
+        self.FirstTime = self.LastTime = None
+        self.DataReady = threading.Event()
+        ## callable(stream), called on the router thread after each burst of records (default: none)
+        self.OnData = None
+
+    ## EmoState rate.
+    # @return float, EmoStates per second of engine time (0.0 until two EmoStates were seen)
+    def Rate(self):
+        if self.States < 2 or self.LastTime == self.FirstTime:
+            return 0.0
+        return (self.States - 1) / (self.LastTime - self.FirstTime)
+
+    ## Number of records waiting in the ring.
+    # @return int
+    def Pending(self):
+        return self.Head - self.Tail
+
+    ## Wait for records.
+    #
+    # Also returns when the user is removed.
+    # @param timeout float, seconds (None = forever)
+    # @return bool, True if records are waiting
+    def Wait(self, timeout=None):
+        if self.Head != self.Tail:
+            return True
+        self.DataReady.clear()
+        if self.Head != self.Tail or not self.Connected:
+            return self.Head != self.Tail
+        self.DataReady.wait(timeout)
+        return self.Head != self.Tail
+
+    ## Look at waiting records without copying them.
+    #
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of EventRecord, ring slots valid until Release()
+    # @sa PyEpocPump::EventPump::Peek()
+    def Peek(self, maxcount=None):
+        count = self.Head - self.Tail
+        if maxcount is not None and count > maxcount:
+            count = maxcount
+        ring, capacity, tail = self.Ring, self.Capacity, self.Tail
+        return [ring[(tail + i) % capacity] for i in range(count)]
+
+    ## Hand ring slots back to the router.
+    # @param count int, number of records consumed
+    def Release(self, count):
+        self.Tail += count
+
+    ## Take waiting records out of the ring.
+    #
+    # @param maxcount int, largest batch to return (None = all waiting)
+    # @return list of EventRecord, copies owned by the caller
+    def Drain(self, maxcount=None):
+        records = [EventRecord.from_buffer_copy(record) for record in self.Peek(maxcount)]
+        self.Release(len(records))
+        return records
+
+    ## \internal
+    def _Notify(self):
+        self.DataReady.set()
+        if self.OnData is not None:
+            self.OnData(self)
+
+## @class UserRouter
+# \brief Routes EmoEngine events to per-user streams.
+#
+# Poll() can be called from the application's own loop, or Start() runs it on a thread with the
+# same backoff as PyEpocPump::EventPump. Only the polling thread may call into the engine.
+class UserRouter:
+    ## \internal
+    # @param handler EpocHandler, connected handler
+    # @param capacity int, ring slots per user
+    # @param minsleep float, first backoff sleep in seconds (Start() only)
+    # @param maxsleep float, longest backoff sleep in seconds (Start() only)
+    def __init__(self, handler, capacity=1024, minsleep=0.0005, maxsleep=0.008):
+        self.Handler = handler
+        self.Capacity = capacity
+        self.MinSleep = minsleep
+        self.MaxSleep = maxsleep
+        ## UserStream by user ID, for the users currently connected
+        self.Users = {}
+        ## events without a known user (e.g. received before EE_UserAdded)
+        self.Unrouted = 0
+        ## callable(stream), called on the polling thread when a user is added (default: none)
+        self.OnUserAdded = None
+        ## callable(stream), called on the polling thread when a user is removed (default: none)
+        self.OnUserRemoved = None
+        self._removed = []
+        self._engineeventhandle = handler.EE_EmoEngineEventCreate()
+        self._userid = ctypes.c_int()
+        self._useridref = ctypes.byref(self._userid)
+        self._running = False
+        self._wake = threading.Event()
+        self._thread = None
+
+    ## Stream of a user.
+    # @param userid int
+    # @return UserStream, or None if the user is not connected
+    def Stream(self, userid):
+        return self.Users.get(userid)
+
+    ## Route every event the engine has ready.
+    #
+    # @param maxevents int, most events to take in this call (None = until EDK_NO_EVENT)
+    # @return int, number of events taken
+    def Poll(self, maxevents=None):
+        handler = self.Handler
+        engineeventhandle = self._engineeventhandle
+        getnextevent = handler._EE_EngineGetNextEvent
+        gettype = handler._EE_EmoEngineEventGetType
+        getuserid = handler._EE_EmoEngineEventGetUserId
+        userid = self._userid
+        ok = ERRCODE['EDK_OK']
+        decode = handler._DecodeEvent
+        if self._removed:
+            self._Reclaim()
+        emostateupdated = EVENT['EE_EmoStateUpdated']
+        useradded, userremoved = EVENT['EE_UserAdded'], EVENT['EE_UserRemoved']
+        users = self.Users
+        touched = set()
+        count = 0
+        while maxevents is None or count < maxevents:
+            if getnextevent(engineeventhandle) != ok:
+                break
+            count += 1
+            eventtype = gettype(engineeventhandle)
+            getuserid(engineeventhandle, self._useridref)
+            if eventtype == useradded and userid.value not in users:
+                stream = users[userid.value] = UserStream(userid.value, handler.EE_EmoStateCreate(), self.Capacity)
+                if self.OnUserAdded is not None:
+                    self.OnUserAdded(stream)
+            stream = users.get(userid.value)
+            if stream is None:
+                self.Unrouted += 1
+                continue
+            stream.Received += 1
+            if stream.Head - stream.Tail >= stream.Capacity:
+                stream.Overflows += 1
+            else:
+                record = stream.Ring[stream.Head % stream.Capacity]
+                record.Sequence = stream.Head
+                decode(engineeventhandle, stream.StateHandle, record, eventtype, userid.value)
+                if eventtype == emostateupdated:
+                    stream.States += 1
+                    stream.LastTime = record.State.Time
+                    if stream.FirstTime is None:
+                        stream.FirstTime = stream.LastTime
+                stream.Head += 1
+                touched.add(stream)
+            if eventtype == userremoved:
+                self._RemoveUser(stream)
+                touched.add(stream)
+        for stream in touched:
+            stream._Notify()
+        return count
+
+    ## \internal
+    def _RemoveUser(self, stream):
+        del self.Users[stream.UserId]
+        stream.Connected = False
+        self._removed.append(stream)
+        if self.OnUserRemoved is not None:
+            self.OnUserRemoved(stream)
+
+    ## \internal
+    # Free the EmoState handles of removed users whose streams have been drained.
+    def _Reclaim(self):
+        drained = [stream for stream in self._removed if stream.Head == stream.Tail]
+        if drained:
+            self._removed = [stream for stream in self._removed if stream.Head != stream.Tail]
+            for stream in drained:
+                self.Handler.EE_EmoStateFree(stream.StateHandle)
+                stream.StateHandle = None
+
+    ## Start polling on a thread.
+    def Start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._Run, name="UserRouter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    ## Stop the polling thread and wait for it to exit.
+    # @param timeout float, seconds to wait (None = forever)
+    def Stop(self, timeout=None):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    ## \internal
+    # Polling loop, runs on the router thread.
+    def _Run(self):
+        sleep = 0.0
+        while self._running:
+            if self.Poll(self.Capacity):
+                sleep = 0.0
+                continue
+            sleep = min(self.MaxSleep, sleep * 2) if sleep else self.MinSleep
+            if self._wake.wait(sleep):
+                self._wake.clear()
+
+    ## Stop polling and free the EmoState handles of every stream.
+    #
+    # Streams of connected users are marked disconnected; their records can still be drained.
+    def Close(self):
+        self.Stop()
+        for stream in list(self.Users.values()):
+            self._RemoveUser(stream)
+        for stream in self._removed:
+            self.Handler.EE_EmoStateFree(stream.StateHandle)
+            stream._Notify()
+        self._removed = []
+        if self._engineeventhandle is not None:
+            self.Handler.EE_EmoEngineEventFree(self._engineeventhandle)
+            self._engineeventhandle = None
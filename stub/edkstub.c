@@ -0,0 +1,945 @@
+/*
+ * edkstub.c - simulated stand-in for Emotiv's edk library.
+ *
+ * Implements the EmoEngine / EmoState surface used by PyEpoc so the wrapper can be run
+ * and benchmarked without a headset, EmoComposer or the Windows SDK.
+ *
+ * The simulated engine emits one EE_UserAdded event per user, then EE_EmoStateUpdated
+ * events round-robin over the users. Every value is derived from the event counter, so
+ * runs are deterministic. Suites change at different cadences (Expressiv every 4th state
+ * of a user, Cognitiv every 8th, Affectiv every 16th) while the time stamp changes on every
+ * state, which gives the ES_*Equal functions something to report.
+ *
+ * Configure with SIM_Configure(rate, users, realtime, maxevents):
+ *   rate      - EmoStates per second per user (128.0 for the headset rate)
+ *   users     - number of simulated users (1-8)
+ *   realtime  - 1: events become available at their due time, 0: as fast as possible
+ *   maxevents - stop after this many EmoState events (0 = unlimited)
+ *
+ * Training: EE_CognitivSetTrainingControl / EE_ExpressivSetTrainingControl with START queue a
+ * TrainingStarted event and, after the training time, TrainingSucceeded (or TrainingFailed for
+ * every failevery-th session); ACCEPT, REJECT, ERASE and RESET answer with the matching event.
+ * Configure with SIM_SetTraining(seconds, failevery); seconds is ignored when not real time.
+ *
+ * Profiles are SIM_PROFILESIZE bytes: the user's parameters followed by filler that contains
+ * NUL bytes, so binary-safe handling can be checked. SIM_GetSetCount() counts calls that change
+ * user parameters or upload profiles.
+ *
+ * Raw EEG (EE_Data*): SIM_SAMPLERATE samples per second per user, due at the same time as the
+ * EmoStates (engine time, so not real time runs produce data as fast as they produce events). EEG
+ * channel n is a 4200 uV offset plus a (6 + n) Hz sine and a small 50 Hz mains component; the
+ * counter channel counts 0-128 like the headset's.
+ *
+ * Build: cc -O2 -shared -fPIC -o libedkstub.so edkstub.c -lm
+ */
+
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#define EDK_OK                          0x0000
+#define EDK_INVALID_PROFILE_ARCHIVE     0x0101
+#define EDK_CANNOT_ACQUIRE_DATA         0x0200
+#define EDK_BUFFER_TOO_SMALL            0x0300
+#define EDK_OUT_OF_RANGE                0x0301
+#define EDK_INVALID_PARAMETER           0x0302
+#define EDK_COG_INVALID_TRAINING_ACTION 0x0304
+#define EDK_FILESYSTEM_ERROR            0x0309
+#define EDK_INVALID_USER_ID             0x0400
+#define EDK_NO_EVENT                    0x0600
+
+#define EE_UserAdded            0x0010
+#define EE_EmoStateUpdated      0x0040
+#define EE_ProfileEvent         0x0080
+#define EE_CognitivEvent        0x0100
+#define EE_ExpressivEvent       0x0200
+
+/* Cognitiv / Expressiv training events and controls share their values */
+#define TRAINING_STARTED        1
+#define TRAINING_SUCCEEDED      2
+#define TRAINING_FAILED         3
+#define TRAINING_COMPLETED      4
+#define TRAINING_ERASED         5
+#define TRAINING_REJECTED       6
+#define TRAINING_RESET          7
+#define CONTROL_START           1
+#define CONTROL_ACCEPT          2
+#define CONTROL_REJECT          3
+#define CONTROL_ERASE           4
+#define CONTROL_RESET           5
+
+#define SIM_CHANNELS            18
+#define SIM_MAXUSERS            8
+#define SIM_EXPRESSIVALGOS      12
+#define SIM_PENDING             64
+#define SIM_PROFILESIZE         16384
+#define SIM_PROFILEMAGIC        0x53494d50u
+#define SIM_SAMPLERATE          128
+#define SIM_DATACHANNELS        25      /* ED_COUNTER .. ED_SYNC_SIGNAL */
+#define SIM_DATAMAXSAMPLES      (SIM_SAMPLERATE * 16)
+
+/* EE_DataChannel_t values used by the generator */
+#define ED_COUNTER              0
+#define ED_AF3                  3
+#define ED_AF4                  16
+#define ED_GYROX                17
+#define ED_GYROY                18
+#define ED_TIMESTAMP            19
+#define ED_ES_TIMESTAMP         20
+#define ED_MARKER               23
+
+typedef struct {
+    float time;
+    int   headseton;
+    int   wireless;
+    int   battery;
+    int   maxbattery;
+    int   contactquality[SIM_CHANNELS];
+} StatusStub;
+
+typedef struct {
+    int   blink, leftwink, rightwink, eyesopen;
+    int   lookingup, lookingdown, lookingleft, lookingright;
+    float lefteyelid, righteyelid, eyex, eyey;
+    float eyebrow, smile, clench;
+    int   upperaction;
+    float upperpower;
+    int   loweraction;
+    float lowerpower;
+    int   active;
+} ExpressivStub;
+
+typedef struct {
+    float excitementshort, excitementlong, meditation, frustration, engagement;
+    int   active;
+} AffectivStub;
+
+typedef struct {
+    int   action;
+    float power;
+    int   active;
+} CognitivStub;
+
+typedef struct {
+    StatusStub    status;
+    ExpressivStub expressiv;
+    AffectivStub  affectiv;
+    CognitivStub  cognitiv;
+} EmoStateStub;
+
+typedef struct {
+    int          type;
+    int          subtype;
+    unsigned int userid;
+    double       duetime;
+    EmoStateStub state;
+    unsigned int profilesize;
+    unsigned char profile[SIM_PROFILESIZE];
+} EventStub;
+
+typedef struct {
+    unsigned int  magic;
+    int           cogtrainingaction;
+    int           cogtraining;          /* action being trained, 0 if none */
+    unsigned long cogactiveactions;
+    unsigned long cogtrained;
+    int           cogactivationlevel;
+    int           cogsensitivity[4];
+    unsigned int  cogcaching;
+    unsigned int  cogcachesize;
+    int           exptrainingaction;
+    int           exptraining;
+    unsigned long exptrained;
+    int           expsigtype;
+    int           expthreshold[SIM_EXPRESSIVALGOS];
+    unsigned long sessions;
+} UserStub;
+
+typedef struct {
+    int          type;
+    int          subtype;
+    unsigned int userid;
+    double       duetime;
+} PendingStub;
+
+typedef struct {
+    unsigned int count;
+    double       samples[SIM_DATACHANNELS][SIM_DATAMAXSAMPLES];
+} DataStub;
+
+static double        simrate = 128.0;
+static unsigned int  simusers = 1;
+static int           simrealtime = 0;
+static unsigned long simmaxevents = 0;
+static unsigned long simcounter = 0;
+static unsigned int  simadded = 0;
+static double        simstart = 0.0;
+static double        simtrainingtime = 0.25;
+static unsigned int  simfailevery = 0;
+static unsigned long simsetcount = 0;
+static UserStub      simuser[SIM_MAXUSERS];
+static PendingStub   simpending[SIM_PENDING];
+static unsigned int  simpendinghead = 0, simpendingcount = 0;
+static int           simdataenabled[SIM_MAXUSERS];
+static unsigned long simdatanext[SIM_MAXUSERS];    /* index of the next sample to deliver */
+static int           simdatamarker[SIM_MAXUSERS];
+static unsigned int  simdatabuffer = SIM_SAMPLERATE; /* engine buffer size in samples */
+
+/* Monotonic clock in seconds, shared with callers for latency measurements. */
+double SIM_Now(void)
+{
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+}
+
+static void SimResetUser(unsigned int user)
+{
+    UserStub *u = &simuser[user];
+    int i;
+    memset(u, 0, sizeof(UserStub));
+    u->magic = SIM_PROFILEMAGIC;
+    u->cogtrainingaction = 0x0001;
+    u->cogactiveactions = 0x0002;
+    u->cogactivationlevel = 3;
+    for (i = 0; i < 4; i++)
+        u->cogsensitivity[i] = 5;
+    u->cogcaching = 1;
+    u->cogcachesize = 10;
+    u->exptrainingaction = 0x0001;
+    for (i = 0; i < SIM_EXPRESSIVALGOS; i++)
+        u->expthreshold[i] = 500;
+}
+
+void SIM_Configure(double rate, unsigned int users, int realtime, unsigned long maxevents)
+{
+    unsigned int i;
+    simrate = rate > 0.0 ? rate : 128.0;
+    simusers = users < 1 ? 1 : (users > SIM_MAXUSERS ? SIM_MAXUSERS : users);
+    simrealtime = realtime;
+    simmaxevents = maxevents;
+    simcounter = 0;
+    simadded = 0;
+    simpendinghead = simpendingcount = 0;
+    simsetcount = 0;
+    for (i = 0; i < SIM_MAXUSERS; i++) {
+        SimResetUser(i);
+        simdataenabled[i] = 0;
+        simdatanext[i] = 0;
+        simdatamarker[i] = 0;
+    }
+    simstart = SIM_Now();
+}
+
+void SIM_SetTraining(double seconds, unsigned int failevery)
+{
+    simtrainingtime = seconds;
+    simfailevery = failevery;
+}
+
+unsigned long SIM_GetEventCount(void) { return simcounter; }
+unsigned long SIM_GetSetCount(void) { return simsetcount; }
+
+double SIM_EventGetDueTime(void *event) { return ((EventStub *)event)->duetime; }
+
+static void SimFillState(EmoStateStub *s, unsigned long n, unsigned int user)
+{
+    unsigned long k = n / simusers; /* per-user state index */
+    unsigned long e = (k >> 2) + user, c = (k >> 3) + user, a = (k >> 4) + user;
+    int i;
+
+    s->status.time = (float)(k / simrate);
+    s->status.headseton = 1;
+    s->status.wireless = 2;
+    s->status.battery = 4;
+    s->status.maxbattery = 5;
+    for (i = 0; i < SIM_CHANNELS; i++)
+        s->status.contactquality[i] = (i < 2) ? 5 : (int)((a + i) % 6);
+
+    memset(&s->expressiv, 0, sizeof(ExpressivStub));
+    s->expressiv.blink = (e % 7) == 0;
+    s->expressiv.leftwink = (e % 11) == 0;
+    s->expressiv.rightwink = (e % 13) == 0;
+    s->expressiv.eyesopen = !s->expressiv.blink;
+    s->expressiv.lookingleft = (e % 5) == 1;
+    s->expressiv.lookingright = (e % 5) == 2;
+    s->expressiv.lookingup = (e % 5) == 3;
+    s->expressiv.lookingdown = (e % 5) == 4;
+    s->expressiv.lefteyelid = s->expressiv.blink || s->expressiv.leftwink ? 1.0f : 0.0f;
+    s->expressiv.righteyelid = s->expressiv.blink || s->expressiv.rightwink ? 1.0f : 0.0f;
+    s->expressiv.eyex = s->expressiv.lookingleft ? -1.0f : (s->expressiv.lookingright ? 1.0f : 0.0f);
+    s->expressiv.eyey = s->expressiv.lookingdown ? -1.0f : (s->expressiv.lookingup ? 1.0f : 0.0f);
+    s->expressiv.upperaction = (e & 1) ? 0x0020 : 0x0040;
+    s->expressiv.upperpower = (e % 10) / 10.0f;
+    s->expressiv.loweraction = 0x0080 << (e % 5);
+    s->expressiv.lowerpower = (e % 20) / 20.0f;
+    s->expressiv.eyebrow = s->expressiv.upperaction == 0x0020 ? s->expressiv.upperpower : 0.0f;
+    s->expressiv.smile = s->expressiv.loweraction == 0x0080 ? s->expressiv.lowerpower : 0.0f;
+    s->expressiv.clench = s->expressiv.loweraction == 0x0100 ? s->expressiv.lowerpower : 0.0f;
+    s->expressiv.active = 0x0fff;
+
+    s->affectiv.excitementshort = (a % 50) / 50.0f;
+    s->affectiv.excitementlong = (a % 200) / 200.0f;
+    s->affectiv.meditation = (a % 100) / 100.0f;
+    s->affectiv.frustration = (a % 25) / 25.0f;
+    s->affectiv.engagement = (a % 75) / 75.0f;
+    s->affectiv.active = 0x000f;
+
+    s->cognitiv.action = 0x0001 << (c % 14);
+    s->cognitiv.power = (c % 10) / 10.0f;
+    s->cognitiv.active = 1;
+}
+
+/* Queue a Cognitiv / Expressiv / profile event, kept in due time order. */
+static void SimPush(int type, int subtype, unsigned int userid, double delay)
+{
+    unsigned int i, slot;
+    double due = SIM_Now() + (simrealtime ? delay : 0.0);
+    if (simpendingcount == SIM_PENDING)
+        return;
+    /* insertion keeps the small queue sorted by due time */
+    for (i = simpendingcount; i > 0; i--) {
+        PendingStub *prev = &simpending[(simpendinghead + i - 1) % SIM_PENDING];
+        if (prev->duetime <= due)
+            break;
+        simpending[(simpendinghead + i) % SIM_PENDING] = *prev;
+    }
+    slot = (simpendinghead + i) % SIM_PENDING;
+    simpending[slot].type = type;
+    simpending[slot].subtype = subtype;
+    simpending[slot].userid = userid;
+    simpending[slot].duetime = due;
+    simpendingcount++;
+}
+
+static int SimTrainingControl(int eventtype, unsigned int userid, int control, int *training, int action, unsigned long *trained)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    simsetcount++;
+    switch (control) {
+    case CONTROL_START:
+        *training = action;
+        simuser[userid].sessions++;
+        SimPush(eventtype, TRAINING_STARTED, userid, 0.0);
+        if (simfailevery && simuser[userid].sessions % simfailevery == 0)
+            SimPush(eventtype, TRAINING_FAILED, userid, simtrainingtime);
+        else
+            SimPush(eventtype, TRAINING_SUCCEEDED, userid, simtrainingtime);
+        return EDK_OK;
+    case CONTROL_ACCEPT:
+        *trained |= (unsigned long)*training;
+        *training = 0;
+        SimPush(eventtype, TRAINING_COMPLETED, userid, 0.0);
+        return EDK_OK;
+    case CONTROL_REJECT:
+        *training = 0;
+        SimPush(eventtype, TRAINING_REJECTED, userid, 0.0);
+        return EDK_OK;
+    case CONTROL_ERASE:
+        *trained &= ~(unsigned long)action;
+        SimPush(eventtype, TRAINING_ERASED, userid, 0.0);
+        return EDK_OK;
+    case CONTROL_RESET:
+        *training = 0;
+        SimPush(eventtype, TRAINING_RESET, userid, 0.0);
+        return EDK_OK;
+    case 0:
+        return EDK_OK;
+    }
+    return EDK_INVALID_PARAMETER;
+}
+
+static void SimWriteProfile(unsigned int userid, unsigned char *buffer)
+{
+    unsigned int i;
+    for (i = sizeof(UserStub); i < SIM_PROFILESIZE; i++)
+        buffer[i] = (unsigned char)((i * 31u) ^ userid) & ((i % 7) ? 0xff : 0x00);
+    memcpy(buffer, &simuser[userid], sizeof(UserStub));
+}
+
+static int SimReadProfile(unsigned int userid, const unsigned char *buffer, unsigned int length)
+{
+    UserStub u;
+    if (length != SIM_PROFILESIZE)
+        return EDK_INVALID_PROFILE_ARCHIVE;
+    memcpy(&u, buffer, sizeof(UserStub));
+    if (u.magic != SIM_PROFILEMAGIC)
+        return EDK_INVALID_PROFILE_ARCHIVE;
+    u.cogtraining = u.exptraining = 0;
+    simuser[userid] = u;
+    simsetcount++;
+    return EDK_OK;
+}
+
+/* ----------------------------------------------------------------- EmoEngine */
+
+int EE_EngineConnect(void) { SIM_Configure(simrate, simusers, simrealtime, simmaxevents); return EDK_OK; }
+int EE_EngineRemoteConnect(const char *host, unsigned short port) { return EE_EngineConnect(); }
+int EE_EngineDisconnect(void) { return EDK_OK; }
+int EE_EnableDiagnostics(const char *filename, int enable, int reserved) { return EDK_OK; }
+
+void *EE_EmoEngineEventCreate(void) { return calloc(1, sizeof(EventStub)); }
+void *EE_ProfileEventCreate(void) { return calloc(1, sizeof(EventStub)); }
+void  EE_EmoEngineEventFree(void *event) { free(event); }
+void *EE_EmoStateCreate(void) { return calloc(1, sizeof(EmoStateStub)); }
+void  EE_EmoStateFree(void *state) { free(state); }
+
+int EE_EngineGetNextEvent(void *event)
+{
+    EventStub *e = (EventStub *)event;
+    double due;
+
+    if (simstart == 0.0)
+        simstart = SIM_Now();
+    if (simadded < simusers) {
+        e->type = EE_UserAdded;
+        e->subtype = 0;
+        e->userid = simadded++;
+        e->duetime = simstart;
+        return EDK_OK;
+    }
+    if (simpendingcount && simpending[simpendinghead].duetime <= SIM_Now()) {
+        PendingStub *p = &simpending[simpendinghead];
+        e->type = p->type;
+        e->subtype = p->subtype;
+        e->userid = p->userid;
+        e->duetime = p->duetime;
+        simpendinghead = (simpendinghead + 1) % SIM_PENDING;
+        simpendingcount--;
+        return EDK_OK;
+    }
+    if (simmaxevents && simcounter >= simmaxevents)
+        return EDK_NO_EVENT;
+    due = simstart + (simcounter / simusers) / simrate;
+    if (simrealtime && SIM_Now() < due)
+        return EDK_NO_EVENT;
+    e->type = EE_EmoStateUpdated;
+    e->subtype = 0;
+    e->userid = (unsigned int)(simcounter % simusers);
+    e->duetime = due;
+    SimFillState(&e->state, simcounter, e->userid);
+    simcounter++;
+    return EDK_OK;
+}
+
+int EE_EngineClearEventQueue(int eventtypes) { return EDK_OK; }
+
+int EE_EmoEngineEventGetType(void *event) { return ((EventStub *)event)->type; }
+int EE_CognitivEventGetType(void *event)
+{
+    EventStub *e = (EventStub *)event;
+    return e->type == EE_CognitivEvent ? e->subtype : 0;
+}
+
+int EE_ExpressivEventGetType(void *event)
+{
+    EventStub *e = (EventStub *)event;
+    return e->type == EE_ExpressivEvent ? e->subtype : 0;
+}
+
+int EE_EmoEngineEventGetUserId(void *event, unsigned int *userid)
+{
+    *userid = ((EventStub *)event)->userid;
+    return EDK_OK;
+}
+
+int EE_EmoEngineEventGetEmoState(void *event, void *state)
+{
+    memcpy(state, &((EventStub *)event)->state, sizeof(EmoStateStub));
+    return EDK_OK;
+}
+
+int EE_EngineGetNumUser(unsigned int *numusers)
+{
+    *numusers = simadded;
+    return EDK_OK;
+}
+
+int EE_SetHardwarePlayerDisplay(unsigned int userid, unsigned int playernum)
+{
+    return userid < simusers ? EDK_OK : EDK_INVALID_USER_ID;
+}
+
+int EE_HardwareGetVersion(unsigned int userid, unsigned long *version)
+{
+    *version = 0x06050203ul;
+    return userid < simusers ? EDK_OK : EDK_INVALID_USER_ID;
+}
+
+int EE_SoftwareGetVersion(char *version, unsigned int length, unsigned long *buildnr)
+{
+    strncpy(version, "1.0.0.5", length);
+    *buildnr = 0;
+    return EDK_OK;
+}
+
+int EE_HeadsetGetGyroDelta(unsigned int userid, int *x, int *y)
+{
+    *x = (int)(simcounter % 7) - 3;
+    *y = (int)(simcounter % 5) - 2;
+    return userid < simusers ? EDK_OK : EDK_INVALID_USER_ID;
+}
+
+int EE_HeadsetGyroRezero(unsigned int userid) { return userid < simusers ? EDK_OK : EDK_INVALID_USER_ID; }
+
+typedef struct {
+    int         channelid;
+    int         exist;
+    const char *label;
+    double      x, y, z;
+} SensorStub;
+
+static const SensorStub simsensors[SIM_CHANNELS] = {
+    { 0, 1, "CMS", -0.53,  0.68, 0.50}, { 1, 1, "DRL", -0.53, -0.68, 0.50},
+    { 2, 0, "FP1",  0.95,  0.31, 0.00}, { 3, 1, "AF3",  0.81,  0.41, 0.41},
+    { 4, 1, "F7",   0.59,  0.81, 0.00}, { 5, 1, "F3",   0.55,  0.41, 0.73},
+    { 6, 1, "FC5",  0.31,  0.88, 0.36}, { 7, 1, "T7",   0.00,  1.00, 0.00},
+    { 8, 1, "P7",  -0.59,  0.81, 0.00}, { 9, 1, "O1",  -0.95,  0.31, 0.00},
+    {10, 1, "O2",  -0.95, -0.31, 0.00}, {11, 1, "P8",  -0.59, -0.81, 0.00},
+    {12, 1, "T8",   0.00, -1.00, 0.00}, {13, 1, "FC6",  0.31, -0.88, 0.36},
+    {14, 1, "F4",   0.55, -0.41, 0.73}, {15, 1, "F8",   0.59, -0.81, 0.00},
+    {16, 1, "AF4",  0.81, -0.41, 0.41}, {17, 0, "FP2",  0.95, -0.31, 0.00}};
+
+int EE_HeadsetGetSensorDetails(int channelid, SensorStub *descriptor)
+{
+    if (channelid < 0 || channelid >= SIM_CHANNELS)
+        return EDK_OUT_OF_RANGE;
+    *descriptor = simsensors[channelid];
+    return EDK_OK;
+}
+
+/* ------------------------------------------------------------------ Profiles */
+
+int EE_GetUserProfile(unsigned int userid, void *event)
+{
+    EventStub *e = (EventStub *)event;
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    e->type = EE_ProfileEvent;
+    e->userid = userid;
+    e->profilesize = SIM_PROFILESIZE;
+    SimWriteProfile(userid, e->profile);
+    return EDK_OK;
+}
+
+int EE_GetBaseProfile(void *event)
+{
+    EventStub *e = (EventStub *)event;
+    UserStub saved = simuser[0];
+    SimResetUser(0);
+    e->type = EE_ProfileEvent;
+    e->userid = 0;
+    e->profilesize = SIM_PROFILESIZE;
+    SimWriteProfile(0, e->profile);
+    simuser[0] = saved;
+    return EDK_OK;
+}
+
+int EE_GetUserProfileSize(void *event, unsigned int *size)
+{
+    EventStub *e = (EventStub *)event;
+    if (e->type != EE_ProfileEvent)
+        return EDK_INVALID_PARAMETER;
+    *size = e->profilesize;
+    return EDK_OK;
+}
+
+int EE_GetUserProfileBytes(void *event, unsigned char *buffer, unsigned int length)
+{
+    EventStub *e = (EventStub *)event;
+    if (e->type != EE_ProfileEvent)
+        return EDK_INVALID_PARAMETER;
+    if (length < e->profilesize)
+        return EDK_BUFFER_TOO_SMALL;
+    memcpy(buffer, e->profile, e->profilesize);
+    return EDK_OK;
+}
+
+int EE_SetUserProfile(unsigned int userid, const unsigned char *buffer, unsigned int length)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    return SimReadProfile(userid, buffer, length);
+}
+
+int EE_SaveUserProfile(unsigned int userid, const char *filename)
+{
+    unsigned char buffer[SIM_PROFILESIZE];
+    FILE *file;
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    SimWriteProfile(userid, buffer);
+    if ((file = fopen(filename, "wb")) == NULL)
+        return EDK_FILESYSTEM_ERROR;
+    if (fwrite(buffer, 1, SIM_PROFILESIZE, file) != SIM_PROFILESIZE) {
+        fclose(file);
+        return EDK_FILESYSTEM_ERROR;
+    }
+    return fclose(file) ? EDK_FILESYSTEM_ERROR : EDK_OK;
+}
+
+int EE_LoadUserProfile(unsigned int userid, const char *filename)
+{
+    unsigned char buffer[SIM_PROFILESIZE];
+    size_t length;
+    FILE *file;
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    if ((file = fopen(filename, "rb")) == NULL)
+        return EDK_FILESYSTEM_ERROR;
+    length = fread(buffer, 1, SIM_PROFILESIZE, file);
+    fclose(file);
+    return SimReadProfile(userid, buffer, (unsigned int)length);
+}
+
+/* ------------------------------------------------------------------ Raw data */
+
+void *EE_DataCreate(void) { return calloc(1, sizeof(DataStub)); }
+void  EE_DataFree(void *data) { free(data); }
+
+int EE_DataSetBufferSizeInSec(float seconds)
+{
+    if (seconds <= 0.0f || seconds * SIM_SAMPLERATE > SIM_DATAMAXSAMPLES)
+        return EDK_INVALID_PARAMETER;
+    simdatabuffer = (unsigned int)(seconds * SIM_SAMPLERATE);
+    return EDK_OK;
+}
+
+int EE_DataGetBufferSizeInSec(float *seconds)
+{
+    *seconds = (float)simdatabuffer / SIM_SAMPLERATE;
+    return EDK_OK;
+}
+
+int EE_DataAcquisitionEnable(unsigned int userid, _Bool enable)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    if (enable && !simdataenabled[userid])
+        simdatanext[userid] = (unsigned long)(simcounter / simusers * SIM_SAMPLERATE / simrate);
+    simdataenabled[userid] = enable;
+    return EDK_OK;
+}
+
+int EE_DataAcquisitionIsEnabled(unsigned int userid, _Bool *enabled)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    *enabled = simdataenabled[userid];
+    return EDK_OK;
+}
+
+int EE_DataGetSamplingRate(unsigned int userid, unsigned int *rate)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    *rate = SIM_SAMPLERATE;
+    return EDK_OK;
+}
+
+int EE_DataSetMarker(unsigned int userid, int marker)
+{
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    simdatamarker[userid] = marker;
+    return EDK_OK;
+}
+
+/* Move the samples that became due since the last update into the handle. Samples older than the
+   engine buffer are lost, like on the headset. */
+int EE_DataUpdateHandle(unsigned int userid, void *data)
+{
+    DataStub *d = (DataStub *)data;
+    unsigned long due, k;
+    unsigned int i, c;
+    double t;
+
+    if (userid >= simusers)
+        return EDK_INVALID_USER_ID;
+    if (!simdataenabled[userid])
+        return EDK_CANNOT_ACQUIRE_DATA;
+    if (simrealtime)
+        due = (unsigned long)((SIM_Now() - simstart) * SIM_SAMPLERATE);
+    else
+        due = (unsigned long)(simcounter / simusers * SIM_SAMPLERATE / simrate);
+    if (due > simdatanext[userid] + simdatabuffer)
+        simdatanext[userid] = due - simdatabuffer;
+    d->count = (unsigned int)(due > simdatanext[userid] ? due - simdatanext[userid] : 0);
+    for (i = 0; i < d->count; i++) {
+        k = simdatanext[userid] + i;
+        t = (double)k / SIM_SAMPLERATE;
+        for (c = 0; c < SIM_DATACHANNELS; c++)
+            d->samples[c][i] = 0.0;
+        d->samples[ED_COUNTER][i] = (double)(k % 129);
+        for (c = ED_AF3; c <= ED_AF4; c++)
+            d->samples[c][i] = 4200.0 + 40.0 * sin(2.0 * M_PI * (6 + c - ED_AF3) * t + userid)
+                             + 5.0 * sin(2.0 * M_PI * 50.0 * t);
+        d->samples[ED_GYROX][i] = 1650.0;
+        d->samples[ED_GYROY][i] = 1650.0;
+        d->samples[ED_TIMESTAMP][i] = t;
+        d->samples[ED_ES_TIMESTAMP][i] = t;
+        d->samples[ED_MARKER][i] = i == 0 ? simdatamarker[userid] : 0;
+    }
+    if (d->count)
+        simdatamarker[userid] = 0;
+    simdatanext[userid] = due > simdatanext[userid] ? due : simdatanext[userid];
+    return EDK_OK;
+}
+
+int EE_DataGetNumberOfSample(void *data, unsigned int *samples)
+{
+    *samples = ((DataStub *)data)->count;
+    return EDK_OK;
+}
+
+int EE_DataGet(void *data, int channel, double *buffer, unsigned int length)
+{
+    DataStub *d = (DataStub *)data;
+    if (channel < 0 || channel >= SIM_DATACHANNELS)
+        return EDK_INVALID_PARAMETER;
+    memcpy(buffer, d->samples[channel], sizeof(double) * (length < d->count ? length : d->count));
+    return EDK_OK;
+}
+
+/* ------------------------------------------------------------------ Expressiv */
+
+#define USER(id) if ((id) >= simusers) return EDK_INVALID_USER_ID; else
+
+static int SimAlgoIndex(int algo)
+{
+    int i;
+    for (i = 0; i < SIM_EXPRESSIVALGOS; i++)
+        if (algo == (1 << i))
+            return i;
+    return -1;
+}
+
+int EE_ExpressivSetThreshold(unsigned int userid, int algo, int threshold, int value)
+{
+    int i = SimAlgoIndex(algo);
+    USER(userid) if (i < 0 || threshold != 0 || value < 0 || value > 1000) return EDK_INVALID_PARAMETER;
+    simuser[userid].expthreshold[i] = value;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_ExpressivGetThreshold(unsigned int userid, int algo, int threshold, int *value)
+{
+    int i = SimAlgoIndex(algo);
+    USER(userid) if (i < 0 || threshold != 0) return EDK_INVALID_PARAMETER;
+    *value = simuser[userid].expthreshold[i];
+    return EDK_OK;
+}
+
+int EE_ExpressivSetTrainingAction(unsigned int userid, int algo)
+{
+    USER(userid) if (SimAlgoIndex(algo) < 0) return EDK_INVALID_PARAMETER;
+    simuser[userid].exptrainingaction = algo;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_ExpressivSetTrainingControl(unsigned int userid, int control)
+{
+    USER(userid);
+    return SimTrainingControl(EE_ExpressivEvent, userid, control, &simuser[userid].exptraining,
+                              simuser[userid].exptrainingaction, &simuser[userid].exptrained);
+}
+
+int EE_ExpressivGetTrainingAction(unsigned int userid, int *algo) { USER(userid) *algo = simuser[userid].exptrainingaction; return EDK_OK; }
+int EE_ExpressivGetTrainingTime(unsigned int userid, int *ms) { USER(userid) *ms = (int)(simtrainingtime * 1000); return EDK_OK; }
+int EE_ExpressivGetTrainedSignatureActions(unsigned int userid, unsigned long *actions) { USER(userid) *actions = simuser[userid].exptrained; return EDK_OK; }
+
+int EE_ExpressivGetTrainedSignatureAvailable(unsigned int userid, int *available)
+{
+    unsigned long t;
+    USER(userid) t = simuser[userid].exptrained;
+    *available = (t & 0x0001) && (t & ~0x0001ul);
+    return EDK_OK;
+}
+
+int EE_ExpressivSetSignatureType(unsigned int userid, int type)
+{
+    int available;
+    USER(userid) EE_ExpressivGetTrainedSignatureAvailable(userid, &available);
+    if (type == 1 && !available)
+        return EDK_INVALID_PARAMETER;
+    simuser[userid].expsigtype = type;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_ExpressivGetSignatureType(unsigned int userid, int *type) { USER(userid) *type = simuser[userid].expsigtype; return EDK_OK; }
+
+/* ------------------------------------------------------------------- Cognitiv */
+
+int EE_CognitivSetActiveActions(unsigned int userid, unsigned long actions)
+{
+    USER(userid) simuser[userid].cogactiveactions = actions;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivGetActiveActions(unsigned int userid, unsigned long *actions) { USER(userid) *actions = simuser[userid].cogactiveactions; return EDK_OK; }
+int EE_CognitivGetTrainingTime(unsigned int userid, int *ms) { USER(userid) *ms = (int)(simtrainingtime * 1000); return EDK_OK; }
+
+int EE_CognitivSetTrainingAction(unsigned int userid, int action)
+{
+    USER(userid) if (action <= 0 || action > 0x2000 || (action & (action - 1))) return EDK_COG_INVALID_TRAINING_ACTION;
+    simuser[userid].cogtrainingaction = action;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivSetTrainingControl(unsigned int userid, int control)
+{
+    USER(userid);
+    return SimTrainingControl(EE_CognitivEvent, userid, control, &simuser[userid].cogtraining,
+                              simuser[userid].cogtrainingaction, &simuser[userid].cogtrained);
+}
+
+int EE_CognitivGetTrainingAction(unsigned int userid, int *action) { USER(userid) *action = simuser[userid].cogtrainingaction; return EDK_OK; }
+int EE_CognitivGetTrainedSignatureActions(unsigned int userid, unsigned long *actions) { USER(userid) *actions = simuser[userid].cogtrained; return EDK_OK; }
+int EE_CognitivGetOverallSkillRating(unsigned int userid, float *rating) { USER(userid) *rating = 0.7f; return EDK_OK; }
+int EE_CognitivGetActionSkillRating(unsigned int userid, int action, float *rating) { USER(userid) *rating = (simuser[userid].cogtrained & action) ? 0.8f : 0.0f; return EDK_OK; }
+
+int EE_CognitivSetActivationLevel(unsigned int userid, int level)
+{
+    USER(userid) if (level < 1 || level > 7) return EDK_OUT_OF_RANGE;
+    simuser[userid].cogactivationlevel = level;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivGetActivationLevel(unsigned int userid, int *level) { USER(userid) *level = simuser[userid].cogactivationlevel; return EDK_OK; }
+
+int EE_CognitivSetActionSensitivity(unsigned int userid, int s1, int s2, int s3, int s4)
+{
+    int *s;
+    USER(userid) s = simuser[userid].cogsensitivity;
+    s[0] = s1; s[1] = s2; s[2] = s3; s[3] = s4;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivGetActionSensitivity(unsigned int userid, int *s1, int *s2, int *s3, int *s4)
+{
+    int *s;
+    USER(userid) s = simuser[userid].cogsensitivity;
+    *s1 = s[0]; *s2 = s[1]; *s3 = s[2]; *s4 = s[3];
+    return EDK_OK;
+}
+
+int EE_CognitivStartSamplingNeutral(unsigned int userid) { USER(userid) return EDK_OK; }
+int EE_CognitivStopSamplingNeutral(unsigned int userid) { USER(userid) return EDK_OK; }
+
+int EE_CognitivSetSignatureCaching(unsigned int userid, unsigned int enable)
+{
+    USER(userid) simuser[userid].cogcaching = enable;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivGetSignatureCaching(unsigned int userid, unsigned int *enable) { USER(userid) *enable = simuser[userid].cogcaching; return EDK_OK; }
+
+int EE_CognitivSetSignatureCacheSize(unsigned int userid, unsigned int size)
+{
+    USER(userid) simuser[userid].cogcachesize = size;
+    simsetcount++;
+    return EDK_OK;
+}
+
+int EE_CognitivGetSignatureCacheSize(unsigned int userid, unsigned int *size) { USER(userid) *size = simuser[userid].cogcachesize; return EDK_OK; }
+
+int EE_ResetDetection(unsigned int userid, int suite, unsigned int detections)
+{
+    USER(userid) if (suite == 2) {
+        simuser[userid].cogtrained &= detections ? ~(unsigned long)detections : 0ul;
+    } else if (suite == 0) {
+        simuser[userid].exptrained &= detections ? ~(unsigned long)detections : 0ul;
+    }
+    simsetcount++;
+    return EDK_OK;
+}
+
+/* ------------------------------------------------------------------ EmoState */
+
+#define STATE(h) ((EmoStateStub *)(h))
+
+void  ES_Init(void *state) { memset(state, 0, sizeof(EmoStateStub)); }
+void  ES_Copy(void *dest, void *src) { memcpy(dest, src, sizeof(EmoStateStub)); }
+
+float ES_GetTimeFromStart(void *state) { return STATE(state)->status.time; }
+int   ES_GetHeadsetOn(void *state) { return STATE(state)->status.headseton; }
+int   ES_GetWirelessSignalStatus(void *state) { return STATE(state)->status.wireless; }
+int   ES_GetNumContactQualityChannels(void *state) { return SIM_CHANNELS; }
+
+int ES_GetContactQuality(void *state, int channel)
+{
+    if (channel < 0 || channel >= SIM_CHANNELS)
+        return 0;
+    return STATE(state)->status.contactquality[channel];
+}
+
+int ES_GetContactQualityFromAllChannels(void *state, int *quality, size_t size)
+{
+    size_t i;
+    for (i = 0; i < size && i < SIM_CHANNELS; i++)
+        quality[i] = STATE(state)->status.contactquality[i];
+    return (int)i;
+}
+
+void ES_GetBatteryChargeLevel(void *state, int *level, int *maxlevel)
+{
+    *level = STATE(state)->status.battery;
+    *maxlevel = STATE(state)->status.maxbattery;
+}
+
+int   ES_ExpressivIsBlink(void *state) { return STATE(state)->expressiv.blink; }
+int   ES_ExpressivIsLeftWink(void *state) { return STATE(state)->expressiv.leftwink; }
+int   ES_ExpressivIsRightWink(void *state) { return STATE(state)->expressiv.rightwink; }
+int   ES_ExpressivIsEyesOpen(void *state) { return STATE(state)->expressiv.eyesopen; }
+int   ES_ExpressivIsLookingUp(void *state) { return STATE(state)->expressiv.lookingup; }
+int   ES_ExpressivIsLookingDown(void *state) { return STATE(state)->expressiv.lookingdown; }
+int   ES_ExpressivIsLookingLeft(void *state) { return STATE(state)->expressiv.lookingleft; }
+int   ES_ExpressivIsLookingRight(void *state) { return STATE(state)->expressiv.lookingright; }
+float ES_ExpressivGetEyebrowExtent(void *state) { return STATE(state)->expressiv.eyebrow; }
+float ES_ExpressivGetSmileExtent(void *state) { return STATE(state)->expressiv.smile; }
+float ES_ExpressivGetClenchExtent(void *state) { return STATE(state)->expressiv.clench; }
+int   ES_ExpressivGetUpperFaceAction(void *state) { return STATE(state)->expressiv.upperaction; }
+float ES_ExpressivGetUpperFaceActionPower(void *state) { return STATE(state)->expressiv.upperpower; }
+int   ES_ExpressivGetLowerFaceAction(void *state) { return STATE(state)->expressiv.loweraction; }
+float ES_ExpressivGetLowerFaceActionPower(void *state) { return STATE(state)->expressiv.lowerpower; }
+int   ES_ExpressivIsActive(void *state, int type) { return (STATE(state)->expressiv.active & type) != 0; }
+
+void ES_ExpressivGetEyelidState(void *state, float *lefteye, float *righteye)
+{
+    *lefteye = STATE(state)->expressiv.lefteyelid;
+    *righteye = STATE(state)->expressiv.righteyelid;
+}
+
+void ES_ExpressivGetEyeLocation(void *state, float *x, float *y)
+{
+    *x = STATE(state)->expressiv.eyex;
+    *y = STATE(state)->expressiv.eyey;
+}
+
+float ES_AffectivGetExcitementShortTermScore(void *state) { return STATE(state)->affectiv.excitementshort; }
+float ES_AffectivGetExcitementLongTermScore(void *state) { return STATE(state)->affectiv.excitementlong; }
+float ES_AffectivGetMeditationScore(void *state) { return STATE(state)->affectiv.meditation; }
+float ES_AffectivGetFrustrationScore(void *state) { return STATE(state)->affectiv.frustration; }
+float ES_AffectivGetEngagementBoredomScore(void *state) { return STATE(state)->affectiv.engagement; }
+int   ES_AffectivIsActive(void *state, int type) { return (STATE(state)->affectiv.active & type) != 0; }
+
+int   ES_CognitivGetCurrentAction(void *state) { return STATE(state)->cognitiv.action; }
+float ES_CognitivGetCurrentActionPower(void *state) { return STATE(state)->cognitiv.power; }
+int   ES_CognitivIsActive(void *state) { return STATE(state)->cognitiv.active; }
+
+int ES_AffectivEqual(void *a, void *b) { return !memcmp(&STATE(a)->affectiv, &STATE(b)->affectiv, sizeof(AffectivStub)); }
+int ES_ExpressivEqual(void *a, void *b) { return !memcmp(&STATE(a)->expressiv, &STATE(b)->expressiv, sizeof(ExpressivStub)); }
+int ES_CognitivEqual(void *a, void *b) { return !memcmp(&STATE(a)->cognitiv, &STATE(b)->cognitiv, sizeof(CognitivStub)); }
+int ES_EmoEngineEqual(void *a, void *b) { return !memcmp(&STATE(a)->status, &STATE(b)->status, sizeof(StatusStub)); }
+int ES_Equal(void *a, void *b) { return !memcmp(a, b, sizeof(EmoStateStub)); }